@@ -0,0 +1,327 @@
+"""
+Encode-once alert media.
+
+Recorded clips are full-resolution mp4v, far too large to push over a slow
+uplink. When a clip is finished, an AlertMediaBuilder thread turns it into
+one compact artifact set for the incident:
+
+    snapshot  JPEG of the annotated peak-confidence frame
+    clip      H.264 copy at reduced resolution and frame rate, capped in size
+
+Every channel reuses the same files: email streams the compact clip as its
+attachment and Telegram sends the snapshot with sendPhoto. The clip is
+encoded with the ffmpeg CLI (libx264 at a bitrate derived from the size
+cap) when it is installed, otherwise with cv2.VideoWriter ("avc1", then
+"mp4v" for OpenCV builds without H.264), stepping the resolution down until
+the clip fits.
+
+The output directory keeps only the newest artifacts: older ones are
+deleted once they exceed max_total_bytes or max_age seconds.
+"""
+
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+
+import cv2
+
+from telemetry import telemetry
+
+# Names of the files build() writes, the only ones prune() deletes
+_ARTIFACT_SUFFIXES = ("_peak.jpg", "_alert.mp4")
+
+
+class AlertMedia:
+    """
+    Compact artifacts for one incident's clip.
+    """
+
+    def __init__(self, incident_id, camera, source_path, snapshot_path=None, clip_path=None, info=None):
+        self.incident_id = incident_id
+        self.camera = camera
+        self.source_path = source_path
+        self.snapshot_path = snapshot_path
+        self.clip_path = clip_path
+        self.info = info or {}
+
+    @property
+    def clip_size(self):
+        return os.path.getsize(self.clip_path) if self.clip_path and os.path.exists(self.clip_path) else 0
+
+    def __repr__(self):
+        return f"AlertMedia({self.incident_id!r}, snapshot={self.snapshot_path!r}, clip={self.clip_path!r})"
+
+
+class AlertMediaBuilder:
+    """
+    Builds AlertMedia for finished clips on a background thread.
+    """
+
+    def __init__(self, output_dir, max_width=640, max_fps=10.0, max_clip_bytes=8 * 1024 * 1024,
+                 snapshot_width=1280, jpeg_quality=85, min_width=160, queue_size=16, ffmpeg=None,
+                 max_total_bytes=512 * 1024 * 1024, max_age=7 * 24 * 3600.0):
+        self.output_dir = output_dir
+        self.max_width = max_width
+        self.max_fps = max_fps
+        self.max_clip_bytes = max_clip_bytes
+        self.snapshot_width = snapshot_width
+        self.jpeg_quality = jpeg_quality
+        self.min_width = min_width
+        self.ffmpeg = ffmpeg if ffmpeg is not None else shutil.which("ffmpeg")
+        # Retention of the output directory (0 = no limit)
+        self.max_total_bytes = max_total_bytes
+        self.max_age = max_age
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+
+        # Statistics
+        self.built = 0
+        self.failed = 0
+        self.dropped = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.build_time = 0.0
+        self.pruned = 0
+
+    def start(self):
+        if self._thread is None:
+            os.makedirs(self.output_dir, exist_ok=True)
+            self._thread = threading.Thread(target=self._run, name="alert-media", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, incident_id, camera, clip_path, info, on_ready=None):
+        """
+        Queue a finished clip; on_ready(media) is called on the builder
+        thread once its artifacts exist. Never blocks.
+        """
+        self.start()
+        try:
+            self._queue.put_nowait((incident_id, camera, clip_path, info, on_ready))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print(f"⚠️ [{camera}] Alert media queue full, skipping {clip_path}")
+            return False
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            incident_id, camera, clip_path, info, on_ready = item
+            try:
+                media = self.build(incident_id, camera, clip_path, info)
+            except Exception as e:
+                self.failed += 1
+                print(f"❌ [{camera}] Alert media failed: {str(e)}")
+                # Channels still get the original clip
+                media = AlertMedia(incident_id, camera, clip_path, clip_path=clip_path, info=info)
+            if on_ready is not None:
+                try:
+                    on_ready(media)
+                except Exception as e:
+                    print(f"❌ [{camera}] Alert media callback error: {str(e)}")
+
+    def build(self, incident_id, camera, clip_path, info):
+        """
+        Write the snapshot and compact clip for clip_path
+        """
+        start = time.perf_counter()
+        os.makedirs(self.output_dir, exist_ok=True)
+        stem = os.path.splitext(os.path.basename(clip_path))[0]
+        media = AlertMedia(incident_id, camera, clip_path, info=info)
+
+        frame = info.get("peak_frame")
+        if frame is None:
+            frame = _middle_frame(clip_path)
+        if frame is not None:
+            media.snapshot_path = os.path.join(self.output_dir, f"{stem}_peak.jpg")
+            self.write_snapshot(frame, media.snapshot_path)
+
+        compact_path = os.path.join(self.output_dir, f"{stem}_alert.mp4")
+        if self.transcode(clip_path, compact_path, info):
+            media.clip_path = compact_path
+        else:
+            print(f"⚠️ [{camera}] Could not build a compact clip, channels get the original")
+            media.clip_path = clip_path
+
+        elapsed = time.perf_counter() - start
+        telemetry.observe("alert_media", elapsed, camera=camera)
+        self.built += 1
+        self.build_time += elapsed
+        self.bytes_in += os.path.getsize(clip_path)
+        self.bytes_out += media.clip_size
+        self.prune(keep=(media.snapshot_path, media.clip_path))
+        print(f"🗜️ [{camera}] Alert media ready: clip {os.path.getsize(clip_path) / 1024:.0f}KB -> "
+              f"{media.clip_size / 1024:.0f}KB, snapshot {'yes' if media.snapshot_path else 'no'} "
+              f"({elapsed:.1f}s)")
+        return media
+
+    def prune(self, keep=()):
+        """
+        Delete the oldest snapshots and compact clips beyond max_total_bytes
+        or older than max_age, except the paths in keep. Returns the number
+        of files deleted.
+        """
+        keep = {os.path.abspath(path) for path in keep if path}
+        now = time.time()
+        artifacts = []
+        for entry in os.scandir(self.output_dir):
+            if entry.is_file() and entry.name.endswith(_ARTIFACT_SUFFIXES):
+                stat = entry.stat()
+                artifacts.append((stat.st_mtime, stat.st_size, entry.path))
+
+        removed = 0
+        total = 0
+        for mtime, size, path in sorted(artifacts, reverse=True):
+            total += size
+            if os.path.abspath(path) in keep:
+                continue
+            if ((self.max_total_bytes and total > self.max_total_bytes)
+                    or (self.max_age and now - mtime > self.max_age)):
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+        self.pruned += removed
+        return removed
+
+    def write_snapshot(self, frame, path):
+        height, width = frame.shape[:2]
+        if width > self.snapshot_width:
+            scale = self.snapshot_width / width
+            frame = cv2.resize(frame, (self.snapshot_width, int(height * scale)), interpolation=cv2.INTER_AREA)
+        ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            raise RuntimeError("JPEG encoding failed")
+        with open(path, "wb") as f:
+            f.write(jpeg.tobytes())
+        return path
+
+    def transcode(self, src, dst, info=None):
+        """
+        Write a reduced, size-capped copy of src to dst. Returns True when
+        dst was written (over the cap only if even min_width does not fit).
+        """
+        cap = cv2.VideoCapture(src)
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or (info or {}).get("fps") or 20.0
+            frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
+        finally:
+            cap.release()
+        if not width:
+            return False
+        duration = max(1.0, frames / fps)
+        out_fps = min(fps, self.max_fps)
+        out_width = min(width, self.max_width)
+
+        if self.ffmpeg and self._transcode_ffmpeg(src, dst, out_width, out_fps, duration):
+            return True
+
+        while True:
+            if not self._transcode_opencv(src, dst, out_width, fps, out_fps):
+                return False
+            if os.path.getsize(dst) <= self.max_clip_bytes or out_width <= self.min_width:
+                return True
+            out_width = max(self.min_width, int(out_width * 0.7))
+
+    def _transcode_ffmpeg(self, src, dst, width, fps, duration):
+        # Leave room for the container overhead
+        bitrate = max(50_000, int(self.max_clip_bytes * 8 * 0.9 / duration))
+        command = [self.ffmpeg, "-y", "-loglevel", "error", "-i", src, "-an",
+                   "-vf", f"scale={width - width % 2}:-2,fps={fps:g}",
+                   "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p",
+                   "-b:v", str(bitrate), "-maxrate", str(bitrate), "-bufsize", str(bitrate * 2),
+                   "-movflags", "+faststart", dst]
+        try:
+            subprocess.run(command, check=True, capture_output=True, timeout=max(60.0, duration * 4))
+            return os.path.exists(dst)
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"⚠️ ffmpeg transcode failed, using OpenCV: {str(e)}")
+            return False
+
+    def _transcode_opencv(self, src, dst, width, fps, out_fps):
+        cap = cv2.VideoCapture(src)
+        writer = None
+        try:
+            step = fps / out_fps
+            next_index = 0.0
+            index = 0
+            while True:
+                if index < int(next_index):
+                    # Dropped for the lower frame rate, never decoded
+                    if not cap.grab():
+                        break
+                    index += 1
+                    continue
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                index += 1
+                next_index += step
+                height = int(frame.shape[0] * width / frame.shape[1]) // 2 * 2
+                frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+                if writer is None:
+                    writer = _open_writer(dst, out_fps, (width, height))
+                    if writer is None:
+                        return False
+                writer.write(frame)
+            return writer is not None
+        finally:
+            cap.release()
+            if writer is not None:
+                writer.release()
+
+    def stats(self):
+        return {
+            "built": self.built,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "pruned": self.pruned,
+            "queue_depth": self._queue.qsize(),
+            "compression": self.bytes_in / self.bytes_out if self.bytes_out else 0.0,
+            "avg_build_s": self.build_time / self.built if self.built else 0.0,
+        }
+
+    def print_stats(self):
+        s = self.stats()
+        print(f"📊 Alert media: {s['built']} built, {s['failed']} failed, "
+              f"{s['compression']:.1f}x smaller clips, {s['avg_build_s']:.1f}s each, {s['pruned']} old files deleted")
+
+    def stop(self, timeout=30.0):
+        """
+        Finish queued clips and stop the builder thread
+        """
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+
+def _open_writer(path, fps, size):
+    for fourcc in ("avc1", "mp4v"):
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+        if writer.isOpened():
+            return writer
+        writer.release()
+    return None
+
+
+def _middle_frame(path):
+    cap = cv2.VideoCapture(path)
+    try:
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        if frames > 1:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frames // 2)
+        ret, frame = cap.read()
+        return frame if ret else None
+    finally:
+        cap.release()
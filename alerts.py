@@ -0,0 +1,341 @@
+"""
+Non-blocking alert dispatch.
+
+The detection loop only calls AlertDispatcher.submit(), which puts the alert
+on a bounded queue and returns immediately. A small pool of worker threads
+delivers alerts through channels that keep their HTTP session or Twilio
+client for the life of the process, with timeouts, retries with
+exponential backoff, per-channel rate limits and de-duplication of one
+incident per channel.
+
+Every channel takes a base URL so it can be pointed at local stub servers.
+"""
+
+import os
+import queue
+import random
+import threading
+import time
+
+import requests
+
+from telemetry import telemetry
+
+
+class Alert:
+    """
+    One alert for one incident, fanned out to one or more channels.
+    """
+
+    def __init__(self, incident_id, message, camera=None, created=None, kind="fire", photo=None, **extra):
+        self.incident_id = incident_id
+        self.message = message
+        self.camera = camera
+        # De-duplication is per incident, kind and channel, so a later
+        # "media" alert for the same incident is not dropped
+        self.kind = kind
+        # Path of an image to send with the message, on channels that can
+        self.photo = photo
+        self.created = time.time() if created is None else created
+        self.extra = extra
+
+    def __repr__(self):
+        return f"Alert({self.incident_id!r}, camera={self.camera!r})"
+
+
+class AlertChannel:
+    """
+    Base class for a delivery channel. Subclasses implement send(alert) and
+    raise on failure so the dispatcher can retry.
+    """
+
+    name = "channel"
+
+    def __init__(self, name=None, timeout=10.0, max_retries=3, backoff=1.0, min_interval=0.0):
+        if name is not None:
+            self.name = name
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.min_interval = min_interval
+
+    def send(self, alert):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class FunctionChannel(AlertChannel):
+    """
+    Wrap a plain function (alarm sound, WhatsApp, ...) as a channel.
+    """
+
+    def __init__(self, name, func, **kwargs):
+        super().__init__(name=name, **kwargs)
+        self.func = func
+
+    def send(self, alert):
+        self.func()
+
+
+class TelegramChannel(AlertChannel):
+    """
+    Telegram Bot API over one persistent requests.Session.
+    """
+
+    name = "telegram"
+
+    def __init__(self, bot_token, chat_id, base_url="https://api.telegram.org", **kwargs):
+        super().__init__(**kwargs)
+        self.bot_token = bot_token
+        self.chat_id = chat_id
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+
+    def url(self, method):
+        return f"{self.base_url}/bot{self.bot_token}/{method}"
+
+    def send(self, alert):
+        if alert.photo:
+            with open(alert.photo, "rb") as photo:
+                response = self.session.post(self.url("sendPhoto"),
+                                             data={"chat_id": self.chat_id, "caption": alert.message},
+                                             files={"photo": (os.path.basename(alert.photo), photo, "image/jpeg")},
+                                             timeout=self.timeout)
+        else:
+            response = self.session.post(self.url("sendMessage"),
+                                         data={"chat_id": self.chat_id, "text": alert.message},
+                                         timeout=self.timeout)
+        if response.status_code != 200:
+            raise RuntimeError(f"Telegram returned {response.status_code}: {response.text}")
+
+    def close(self):
+        self.session.close()
+
+
+class TwilioChannel(AlertChannel):
+    """
+    Shared Twilio client for SMS or voice calls.
+    """
+
+    def __init__(self, name, account_sid, auth_token, from_number, to_number, mode="sms",
+                 twiml=None, base_url=None, **kwargs):
+        super().__init__(name=name, **kwargs)
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number
+        self.to_number = to_number
+        self.mode = mode
+        self.twiml = twiml
+        self.base_url = base_url
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                from twilio.http.http_client import TwilioHttpClient
+                from twilio.rest import Client
+
+                self._client = Client(self.account_sid, self.auth_token,
+                                      http_client=TwilioHttpClient(timeout=self.timeout))
+                if self.base_url:
+                    # Point the REST domain at a local stub server
+                    self._client.api.base_url = self.base_url.rstrip("/")
+            return self._client
+
+    def send(self, alert):
+        if self.mode == "call":
+            twiml = self.twiml or f'<Response><Say language="en">{alert.message}</Say></Response>'
+            return self.client.calls.create(twiml=twiml, to=self.to_number, from_=self.from_number).sid
+        return self.client.messages.create(body=alert.message, from_=self.from_number,
+                                           to=self.to_number).sid
+
+
+class ChannelStats:
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.deduplicated = 0
+        self.rate_limited = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.last_error = None
+
+    def as_dict(self):
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "deduplicated": self.deduplicated,
+            "rate_limited": self.rate_limited,
+            "avg_latency_ms": self.latency_total / self.sent * 1000 if self.sent else 0.0,
+            "max_latency_ms": self.latency_max * 1000,
+            "last_error": self.last_error,
+        }
+
+
+class AlertDispatcher:
+    """
+    Bounded alert queue drained by a fixed pool of worker threads.
+    """
+
+    def __init__(self, workers=4, queue_size=100, dedupe_window=600.0, verbose=True, on_delivery=None):
+        self.workers = workers
+        self.dedupe_window = dedupe_window
+        self.verbose = verbose
+        # on_delivery(name, alert, ok, latency, attempts, error) after every delivery outcome
+        self.on_delivery = on_delivery
+        self.channels = {}
+        self.stats = {}
+        self.dropped = 0
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._seen = {}
+        self._last_pruned = 0.0
+        self._last_sent = {}
+        self._threads = []
+        self._running = False
+
+    def add_channel(self, channel):
+        self.channels[channel.name] = channel
+        self.stats[channel.name] = ChannelStats()
+        return channel
+
+    def start(self):
+        self._running = True
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"alert-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def submit(self, alert, channels=None):
+        """
+        Queue an alert for the given channels (all by default).
+        Never blocks; returns the list of channels actually queued.
+        """
+        now = time.time()
+        queued = []
+        for name in channels or list(self.channels):
+            if name not in self.channels:
+                continue
+            stats = self.stats[name]
+            key = (alert.incident_id, alert.kind, name)
+            with self._lock:
+                if now - self._last_pruned >= 1.0:
+                    self._seen = {k: t for k, t in self._seen.items() if now - t < self.dedupe_window}
+                    self._last_pruned = now
+                if key in self._seen:
+                    stats.deduplicated += 1
+                    continue
+                if now - self._last_sent.get(name, 0) < self.channels[name].min_interval:
+                    stats.rate_limited += 1
+                    continue
+                self._seen[key] = now
+                last_sent = self._last_sent.get(name)
+                self._last_sent[name] = now
+            try:
+                self._queue.put_nowait((name, alert))
+                queued.append(name)
+            except queue.Full:
+                with self._lock:
+                    self.dropped += 1
+                    self._seen.pop(key, None)
+                    # Not sent, so it must not hold back the channel's next alert
+                    if self._last_sent.get(name) == now:
+                        if last_sent is None:
+                            self._last_sent.pop(name, None)
+                        else:
+                            self._last_sent[name] = last_sent
+                print(f"⚠️ Alert queue full, dropped {name} alert for {alert.incident_id}")
+        return queued
+
+    def _deliver(self, name, alert):
+        channel = self.channels[name]
+        stats = self.stats[name]
+        for attempt in range(channel.max_retries + 1):
+            try:
+                channel.send(alert)
+                latency = time.time() - alert.created
+                telemetry.observe("alert_delivery", latency, channel=name)
+                with self._lock:
+                    stats.sent += 1
+                    stats.latency_total += latency
+                    stats.latency_max = max(stats.latency_max, latency)
+                if self.verbose:
+                    print(f"✅ {name} alert sent ({latency*1000:.0f}ms)")
+                self._report(name, alert, True, latency, attempt + 1, None)
+                return True
+            except Exception as e:
+                stats.last_error = str(e)
+                if attempt >= channel.max_retries:
+                    break
+                with self._lock:
+                    stats.retries += 1
+                delay = channel.backoff * (2 ** attempt)
+                time.sleep(delay + random.uniform(0, delay / 2))
+        with self._lock:
+            stats.failed += 1
+        print(f"❌ {name} alert failed after {channel.max_retries + 1} attempts: {stats.last_error}")
+        self._report(name, alert, False, None, channel.max_retries + 1, stats.last_error)
+        return False
+
+    def _report(self, name, alert, ok, latency, attempts, error):
+        if self.on_delivery is None:
+            return
+        try:
+            self.on_delivery(name, alert, ok, latency, attempts, error)
+        except Exception as e:
+            print(f"⚠️ Delivery callback error: {str(e)}")
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._deliver(*item)
+            finally:
+                self._queue.task_done()
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def get_stats(self):
+        return {
+            "queue_depth": self.queue_depth(),
+            "dropped": self.dropped,
+            "channels": {name: stats.as_dict() for name, stats in self.stats.items()},
+        }
+
+    def print_stats(self):
+        print(f"📊 Alerts: queue depth {self.queue_depth()}, dropped {self.dropped}")
+        for name, stats in self.get_stats()["channels"].items():
+            print(f"   {name}: sent {stats['sent']}, failed {stats['failed']}, retries {stats['retries']}, "
+                  f"avg latency {stats['avg_latency_ms']:.0f}ms")
+
+    def stop(self, timeout=10.0):
+        """
+        Let queued alerts finish (up to timeout) and stop the workers
+        """
+        if not self._running:
+            return
+        self._running = False
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.05)
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(timeout=max(0.0, deadline - time.time()))
+        self._threads = []
+        for channel in self.channels.values():
+            channel.close()
@@ -0,0 +1,69 @@
+"""
+Lightweight detection drawing.
+
+The live loop does not call result.plot() on every frame any more. It keeps
+only the detections as a small (N, 6) array of x1, y1, x2, y2, confidence,
+class, and the frames that are actually saved or previewed are drawn with
+draw_detections() on the recorder or preview thread.
+"""
+
+import cv2
+import numpy as np
+
+# BGR colours per class id; fire first, then smoke
+CLASS_COLORS = [(0, 69, 255), (160, 160, 160), (0, 215, 255), (255, 144, 30)]
+
+EMPTY_DETECTIONS = np.zeros((0, 6), dtype=np.float32)
+
+
+def detections_from_result(result):
+    """
+    Extract an (N, 6) float32 array from an ultralytics result
+    """
+    boxes = getattr(result, "boxes", None)
+    if boxes is None or len(boxes) == 0:
+        return EMPTY_DETECTIONS
+    return np.concatenate([
+        boxes.xyxy.cpu().numpy(),
+        boxes.conf.cpu().numpy()[:, None],
+        boxes.cls.cpu().numpy()[:, None],
+    ], axis=1).astype(np.float32)
+
+
+def draw_detections(frame, detections, names=None, scale=1.0):
+    """
+    Draw boxes and labels onto frame in place and return it.
+    scale maps detection coordinates onto a resized frame.
+    """
+    if detections is None or len(detections) == 0:
+        return frame
+    thickness = max(1, int(round(min(frame.shape[:2]) / 360)))
+    for x1, y1, x2, y2, conf, cls in detections:
+        cls = int(cls)
+        color = CLASS_COLORS[cls % len(CLASS_COLORS)]
+        p1 = (int(x1 * scale), int(y1 * scale))
+        p2 = (int(x2 * scale), int(y2 * scale))
+        cv2.rectangle(frame, p1, p2, color, thickness, cv2.LINE_AA)
+
+        name = names.get(cls, str(cls)) if isinstance(names, dict) else (
+            names[cls] if names and cls < len(names) else str(cls))
+        label = f"{name} {conf:.2f}"
+        font_scale = thickness / 3
+        (text_width, text_height), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, 1)
+        top = max(p1[1], text_height + baseline)
+        cv2.rectangle(frame, (p1[0], top - text_height - baseline), (p1[0] + text_width, top), color, -1)
+        cv2.putText(frame, label, (p1[0], top - baseline), cv2.FONT_HERSHEY_SIMPLEX, font_scale,
+                    (255, 255, 255), 1, cv2.LINE_AA)
+    return frame
+
+
+def result_from_detections(frame, detections, names, path=""):
+    """
+    Build an ultralytics result for frame from an (N, 6) detections array,
+    the inverse of detections_from_result()
+    """
+    import torch
+    from ultralytics.engine.results import Results
+
+    boxes = torch.from_numpy(np.ascontiguousarray(detections, dtype=np.float32).reshape(-1, 6))
+    return Results(frame, path=path, names=names, boxes=boxes)
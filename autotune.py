@@ -0,0 +1,238 @@
+"""
+CPU autotuner for inference threading, input size and batch size.
+
+Sweeps, on this machine and with real sample frames:
+
+    torch intra-op threads x torch inter-op threads x OpenCV threads
+        (at the largest imgsz, batch 1), then
+    imgsz x batch size with the fastest thread setting
+
+and stores the best configuration in .autotune.json under a key for the
+model weights, backend and hardware. main.py loads it at startup instead
+of the library defaults. torch only accepts the inter-op thread count once
+per process, so every inter-op setting is measured in its own spawned
+process.
+
+The objective is throughput (frames per second) or latency (p95 of a
+predict() call divided by its batch size, so batch sizes compare per
+frame). A smaller imgsz is always faster and always less accurate, so
+input sizes are only swept with --target-latency-ms: settings whose p95
+predict() call misses the target are dropped and the largest imgsz left
+wins. Without a target only the largest imgsz is measured:
+
+    python autotune.py --backend onnx --target-latency-ms 250
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+from datetime import datetime
+
+import cv2
+
+from benchmark import SAMPLE_IMAGES, benchmark_inference, load_sample_frames
+from model_cache import file_digest, hardware_fingerprint, load_cached, store_cached
+
+AUTOTUNE_PATH = ".autotune.json"
+OBJECTIVES = ("throughput", "latency")
+
+
+def autotune_key(model_path, backend="pytorch", int8=False):
+    """
+    Key for a model, backend and machine. Leaves out the current torch
+    thread count, which applying a tuned configuration changes.
+    """
+    hardware = {k: v for k, v in hardware_fingerprint().items() if k != "torch_threads"}
+    parts = {
+        "model": file_digest(model_path) if os.path.exists(model_path) else model_path,
+        "backend": backend,
+        "int8": bool(int8),
+        "hardware": hardware,
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:32]
+
+
+def apply_config(config):
+    """
+    Set the thread counts of a tuned configuration in this process. Call it
+    before the model is loaded: torch rejects a late inter-op change.
+    """
+    if config.get("opencv_threads") is not None:
+        cv2.setNumThreads(config["opencv_threads"])
+    try:
+        import torch
+    except ImportError:
+        return config
+    if config.get("intra_threads"):
+        torch.set_num_threads(config["intra_threads"])
+    if config.get("interop_threads"):
+        try:
+            torch.set_num_interop_threads(config["interop_threads"])
+        except RuntimeError:
+            print("⚠️ torch inter-op threads already fixed for this process, keeping them")
+    return config
+
+
+def load_tuned_config(model_path, backend="pytorch", int8=False, path=AUTOTUNE_PATH):
+    """
+    Return the stored configuration for this model and machine, or None
+    """
+    entry = load_cached(path, autotune_key(model_path, backend, int8))
+    return entry["config"] if entry else None
+
+
+def frame_latency(run):
+    """
+    p95 latency per frame of a run, in ms
+    """
+    return run["latency_ms"]["p95"] / run["batch"]
+
+
+def select_config(runs, objective="throughput", target_latency_ms=None):
+    """
+    Pick the best run. With a latency target, runs over it are ignored and
+    the largest imgsz left wins before the objective decides.
+    """
+    if not runs:
+        return None
+    candidates = runs
+    if target_latency_ms:
+        candidates = [run for run in runs if run["latency_ms"]["p95"] <= target_latency_ms]
+        if not candidates:
+            print(f"⚠️ No setting meets {target_latency_ms:.0f}ms, using the fastest", file=sys.stderr)
+            return min(runs, key=lambda run: run["latency_ms"]["p95"])
+    if objective == "latency":
+        return min(candidates, key=lambda run: (-run["imgsz"] if target_latency_ms else 0, frame_latency(run)))
+    return max(candidates, key=lambda run: (run["imgsz"] if target_latency_ms else 0, run["throughput_fps"]))
+
+
+def _measure(model_args, interop, configs, images, size, iterations, warmup, conf):
+    """
+    Benchmark configs in this (spawned) process with one inter-op setting
+    """
+    try:
+        import torch
+    except ImportError:
+        torch = None
+    if torch is not None and interop:
+        torch.set_num_interop_threads(interop)
+
+    from backends import load_model
+
+    frames = load_sample_frames(images, size=size)
+    models = {}
+    runs = []
+    for config in configs:
+        apply_config(config)
+        # Exports are built and INT8-calibrated per imgsz, PyTorch takes any
+        key = config["imgsz"] if model_args["backend"] != "pytorch" else None
+        if key not in models:
+            models[key] = load_model(imgsz=config["imgsz"], **model_args)
+        print(f"⏱️ intra={config['intra_threads'] or 'default'} interop={interop or 'default'} "
+              f"opencv={config['opencv_threads']} imgsz={config['imgsz']} batch={config['batch']}",
+              file=sys.stderr)
+        result = benchmark_inference(models[key], frames, imgsz=config["imgsz"], batch=config["batch"],
+                                     iterations=iterations, warmup=warmup, conf=conf)
+        runs.append(dict(config, interop_threads=interop, latency_ms=result["latency_ms"],
+                         throughput_fps=result["throughput_fps"]))
+    return runs
+
+
+def _run_isolated(*args):
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(_measure, args)
+
+
+def _thread_options(cores):
+    return sorted({1, max(1, cores // 2), cores})
+
+
+def autotune(model_path, backend="pytorch", int8=False, imgsz_list=(320, 480, 640), batch_list=(1, 2, 4),
+             intra_list=None, interop_list=None, opencv_list=None, objective="throughput",
+             target_latency_ms=None, images=SAMPLE_IMAGES, size=(1280, 720), iterations=20, warmup=3, conf=0.6):
+    """
+    Run the two-stage sweep and return a report with the selected config.
+    Without target_latency_ms only the largest of imgsz_list is measured.
+    """
+    cores = os.cpu_count() or 1
+    intra_list = intra_list or _thread_options(cores)
+    interop_list = interop_list or [1, 2]
+    opencv_list = opencv_list or [1, cores]
+    model_args = {"model_path": model_path, "backend": backend, "int8": int8}
+    measure_args = (images, size, iterations, warmup, conf)
+
+    # Stage 1: threads, at the largest input size and batch 1
+    base_imgsz = max(imgsz_list)
+    if not target_latency_ms:
+        # Nothing to hold speed against accuracy: keep the full input size
+        imgsz_list = [base_imgsz]
+    thread_runs = []
+    for interop in interop_list:
+        configs = [{"intra_threads": intra, "opencv_threads": opencv, "imgsz": base_imgsz, "batch": 1}
+                   for intra in intra_list for opencv in opencv_list]
+        thread_runs += _run_isolated(model_args, interop, configs, *measure_args)
+    # Ranked by the same objective as the final choice
+    best_threads = select_config(thread_runs, objective, target_latency_ms)
+
+    # Stage 2: input size and batch with those threads
+    configs = [{"intra_threads": best_threads["intra_threads"], "opencv_threads": best_threads["opencv_threads"],
+                "imgsz": imgsz, "batch": batch} for imgsz in imgsz_list for batch in batch_list]
+    size_runs = _run_isolated(model_args, best_threads["interop_threads"], configs, *measure_args)
+
+    best = select_config(size_runs, objective, target_latency_ms)
+    config = {k: best[k] for k in ("intra_threads", "interop_threads", "opencv_threads", "imgsz", "batch")}
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "objective": objective,
+        "target_latency_ms": target_latency_ms,
+        "config": config,
+        "latency_ms": best["latency_ms"],
+        "throughput_fps": best["throughput_fps"],
+        "runs": thread_runs + size_runs,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune inference threads, imgsz and batch size for this machine")
+    parser.add_argument("--model", default="best.pt")
+    parser.add_argument("--backend", choices=["pytorch", "onnx", "openvino"], default="pytorch")
+    parser.add_argument("--int8", action="store_true")
+    parser.add_argument("--objective", choices=OBJECTIVES, default="throughput")
+    parser.add_argument("--target-latency-ms", type=float, default=None,
+                        help="p95 per predict() call; the largest imgsz meeting it wins")
+    parser.add_argument("--imgsz", nargs="+", type=int, default=[320, 480, 640],
+                        help="input sizes swept with --target-latency-ms, else only the largest is used")
+    parser.add_argument("--batch", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--intra-threads", nargs="+", type=int, default=None)
+    parser.add_argument("--interop-threads", nargs="+", type=int, default=None)
+    parser.add_argument("--opencv-threads", nargs="+", type=int, default=None)
+    parser.add_argument("--images", nargs="*", default=SAMPLE_IMAGES)
+    parser.add_argument("--size", default="1280x720", help="sample frame size, WxH")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--output", default=AUTOTUNE_PATH, help="configuration store")
+    parser.add_argument("--dry-run", action="store_true", help="print the result without storing it")
+    args = parser.parse_args(argv)
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    report = autotune(args.model, args.backend, args.int8, args.imgsz, args.batch, args.intra_threads,
+                      args.interop_threads, args.opencv_threads, args.objective, args.target_latency_ms,
+                      args.images, (width, height), args.iterations, args.warmup)
+    config = report["config"]
+    print(f"✅ Best for {args.objective}: intra={config['intra_threads']} interop={config['interop_threads']} "
+          f"opencv={config['opencv_threads']} imgsz={config['imgsz']} batch={config['batch']} -> "
+          f"{report['throughput_fps']:.1f} fps, p95 {report['latency_ms']['p95']:.1f}ms", file=sys.stderr)
+    if args.dry_run:
+        print(json.dumps(report, indent=2))
+        return 0
+    store_cached(args.output, autotune_key(args.model, args.backend, args.int8), report)
+    print(f"💾 Stored in {args.output}; main.py applies it on the next start", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
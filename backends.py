@@ -0,0 +1,298 @@
+"""
+Pluggable inference backends for CPU-only hosts.
+
+best.pt can be exported once to ONNX (run with ONNX Runtime) or OpenVINO IR,
+optionally with a post-training INT8 variant calibrated on sample frames.
+Exported artifacts are cached under EXPORT_DIR, keyed by the weights hash,
+input size and precision, so the export only happens once per model.
+
+Every backend is loaded through ultralytics.YOLO, so the returned model is a
+drop-in replacement at the model.predict() / model.val() call sites.
+
+An accuracy parity check compares boxes and classes of a backend against
+the PyTorch model on sample images:
+
+    python backends.py export --backend onnx --int8
+    python backends.py parity --backend openvino --int8
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+
+import cv2
+import numpy as np
+
+from model_cache import file_digest
+
+BACKENDS = ("pytorch", "onnx", "openvino")
+EXPORT_DIR = ".model_exports"
+CALIBRATION_IMAGES = ["fire.33.png", "non_fire.png"]
+
+
+def letterbox(image, imgsz=640, color=(114, 114, 114)):
+    """
+    Resize keeping aspect ratio and pad to imgsz x imgsz, like YOLO does
+    """
+    height, width = image.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    new_width, new_height = int(round(width * scale)), int(round(height * scale))
+    resized = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    top = (imgsz - new_height) // 2
+    left = (imgsz - new_width) // 2
+    return cv2.copyMakeBorder(resized, top, imgsz - new_height - top, left, imgsz - new_width - left,
+                              cv2.BORDER_CONSTANT, value=color)
+
+
+def to_input_tensor(image, imgsz=640):
+    """
+    BGR uint8 frame -> 1x3xHxW float32 RGB tensor in [0, 1]
+    """
+    padded = letterbox(image, imgsz)
+    tensor = padded[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+    return np.ascontiguousarray(tensor[None])
+
+
+def load_calibration_frames(paths, augment=True):
+    """
+    Load calibration images. With augment, flipped and brightness-shifted
+    copies are added so two sample images still give a usable range.
+    """
+    frames = []
+    for path in paths:
+        if os.path.isdir(path):
+            frames.extend(load_calibration_frames(
+                [os.path.join(path, name) for name in sorted(os.listdir(path))], augment=False))
+            continue
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        frames.append(image)
+        if augment:
+            frames.append(cv2.flip(image, 1))
+            frames.append(cv2.convertScaleAbs(image, alpha=0.8, beta=-20))
+            frames.append(cv2.convertScaleAbs(image, alpha=1.2, beta=20))
+    if not frames:
+        raise FileNotFoundError(f"No calibration images found in {paths}")
+    return frames
+
+
+def export_path(model_path, backend, imgsz=640, int8=False, export_dir=EXPORT_DIR):
+    """
+    Cached artifact location for a model/backend/size/precision combination
+    """
+    digest = file_digest(model_path)[:16]
+    precision = "int8" if int8 else "fp32"
+    name = os.path.splitext(os.path.basename(model_path))[0]
+    suffix = ".onnx" if backend == "onnx" else "_openvino_model"
+    # Exports take any batch and input size; older static exports are not reused
+    return os.path.join(export_dir, f"{digest}_{imgsz}_{precision}_dynamic", f"{name}{suffix}")
+
+
+def _quantize_onnx(fp32_path, int8_path, frames, imgsz):
+    import onnx
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            session_input = onnx.load(fp32_path).graph.input[0].name
+            self._data = iter([{session_input: to_input_tensor(frame, imgsz)} for frame in frames])
+
+        def get_next(self):
+            return next(self._data, None)
+
+    quantize_static(fp32_path, int8_path, FrameReader(), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+
+    # Ultralytics reads class names and stride from the model metadata
+    original = onnx.load(fp32_path)
+    quantized = onnx.load(int8_path)
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(original.metadata_props)
+    onnx.save(quantized, int8_path)
+
+
+def _quantize_openvino(fp32_dir, int8_dir, frames, imgsz):
+    import nncf
+    import openvino as ov
+
+    xml_name = next(name for name in os.listdir(fp32_dir) if name.endswith(".xml"))
+    core = ov.Core()
+    fp32_model = core.read_model(os.path.join(fp32_dir, xml_name))
+    dataset = nncf.Dataset(frames, lambda frame: to_input_tensor(frame, imgsz))
+    quantized = nncf.quantize(fp32_model, dataset, preset=nncf.QuantizationPreset.MIXED,
+                              subset_size=len(frames))
+
+    os.makedirs(int8_dir, exist_ok=True)
+    ov.save_model(quantized, os.path.join(int8_dir, xml_name))
+    for name in os.listdir(fp32_dir):
+        if name.endswith((".yaml", ".json")):
+            shutil.copy(os.path.join(fp32_dir, name), int8_dir)
+
+
+def export_model(model_path, backend, imgsz=640, int8=False, calibration_images=CALIBRATION_IMAGES,
+                 export_dir=EXPORT_DIR):
+    """
+    Export best.pt for a backend once and return the cached artifact path
+    """
+    if backend == "pytorch":
+        return model_path
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+
+    target = export_path(model_path, backend, imgsz, int8, export_dir)
+    if os.path.exists(target):
+        return target
+
+    from ultralytics import YOLO
+
+    fp32_target = export_path(model_path, backend, imgsz, False, export_dir)
+    if not os.path.exists(fp32_target):
+        print(f"📦 Exporting {model_path} to {backend} ({imgsz}px)...")
+        # Export from a private copy so ultralytics' artifacts land in our cache
+        work_dir = os.path.dirname(fp32_target)
+        os.makedirs(work_dir, exist_ok=True)
+        work_model = os.path.join(work_dir, os.path.basename(model_path))
+        shutil.copy(model_path, work_model)
+        # Dynamic batch and input size: the engine batches cameras and
+        # predicts ROI crops and autotune candidates at other sizes
+        exported = YOLO(work_model).export(format=backend, imgsz=imgsz, dynamic=True)
+        if os.path.abspath(str(exported)) != os.path.abspath(fp32_target):
+            shutil.move(str(exported), fp32_target)
+        os.remove(work_model)
+        print(f"✅ Exported to {fp32_target}")
+
+    if not int8:
+        return fp32_target
+
+    print(f"🔢 Quantizing {backend} model to INT8 on calibration frames...")
+    frames = load_calibration_frames(calibration_images)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if backend == "onnx":
+        _quantize_onnx(fp32_target, target, frames, imgsz)
+    else:
+        _quantize_openvino(fp32_target, target, frames, imgsz)
+    print(f"✅ INT8 model saved to {target}")
+    return target
+
+
+def load_model(model_path, backend="pytorch", imgsz=640, int8=False, calibration_images=CALIBRATION_IMAGES):
+    """
+    Return a YOLO model running on the requested backend
+    """
+    from ultralytics import YOLO
+
+    artifact = export_model(model_path, backend, imgsz=imgsz, int8=int8, calibration_images=calibration_images)
+    return YOLO(artifact, task="detect")
+
+
+def _detections(model, image, conf, imgsz):
+    result = model.predict(source=image, conf=conf, imgsz=imgsz, verbose=False)[0]
+    if result.boxes is None or result.boxes.cls.numel() == 0:
+        return np.zeros((0, 4)), np.zeros(0, dtype=int), np.zeros(0)
+    boxes = result.boxes
+    return (boxes.xyxy.cpu().numpy(), boxes.cls.cpu().numpy().astype(int), boxes.conf.cpu().numpy())
+
+
+def _iou(box, boxes):
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+
+def parity_check(reference, candidate, images=CALIBRATION_IMAGES, conf=0.25, imgsz=640, iou_threshold=0.5,
+                 timing_runs=20):
+    """
+    Compare a backend against the PyTorch reference on sample images.
+    A reference box counts as matched when the candidate has a box of the
+    same class with IoU >= iou_threshold.
+    """
+    report = {"images": {}, "reference_boxes": 0, "matched_boxes": 0, "extra_boxes": 0}
+    for path in images:
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        ref_boxes, ref_cls, ref_conf = _detections(reference, image, conf, imgsz)
+        cand_boxes, cand_cls, cand_conf = _detections(candidate, image, conf, imgsz)
+
+        used = set()
+        ious, conf_deltas = [], []
+        for box, cls, score in zip(ref_boxes, ref_cls, ref_conf):
+            if len(cand_boxes) == 0:
+                break
+            overlaps = _iou(box, cand_boxes)
+            overlaps[cand_cls != cls] = 0
+            for index in used:
+                overlaps[index] = 0
+            best = int(np.argmax(overlaps))
+            if overlaps[best] >= iou_threshold:
+                used.add(best)
+                ious.append(float(overlaps[best]))
+                conf_deltas.append(float(abs(cand_conf[best] - score)))
+
+        entry = {
+            "reference_boxes": int(len(ref_boxes)),
+            "candidate_boxes": int(len(cand_boxes)),
+            "matched_boxes": len(ious),
+            "reference_classes": sorted(set(ref_cls.tolist())),
+            "candidate_classes": sorted(set(cand_cls.tolist())),
+            "mean_iou": float(np.mean(ious)) if ious else None,
+            "max_conf_delta": max(conf_deltas) if conf_deltas else None,
+        }
+        report["images"][path] = entry
+        report["reference_boxes"] += entry["reference_boxes"]
+        report["matched_boxes"] += entry["matched_boxes"]
+        report["extra_boxes"] += entry["candidate_boxes"] - entry["matched_boxes"]
+
+    report["box_recall"] = (report["matched_boxes"] / report["reference_boxes"]
+                            if report["reference_boxes"] else 1.0)
+    report["classes_match"] = all(e["reference_classes"] == e["candidate_classes"]
+                                  for e in report["images"].values())
+
+    frames = [cv2.imread(path) for path in images]
+    frames = [frame for frame in frames if frame is not None]
+    for name, model in (("reference", reference), ("candidate", candidate)):
+        for frame in frames:
+            model.predict(source=frame, imgsz=imgsz, verbose=False)
+        start = time.perf_counter()
+        for i in range(timing_runs):
+            model.predict(source=frames[i % len(frames)], imgsz=imgsz, verbose=False)
+        report[f"{name}_latency_ms"] = (time.perf_counter() - start) / timing_runs * 1000
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export and check CPU inference backends")
+    parser.add_argument("command", choices=["export", "parity"])
+    parser.add_argument("--model", default="best.pt")
+    parser.add_argument("--backend", choices=BACKENDS[1:], default="onnx")
+    parser.add_argument("--int8", action="store_true", help="post-training INT8 quantization")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--calibration", nargs="*", default=CALIBRATION_IMAGES,
+                        help="images or directories of frames used for INT8 calibration")
+    parser.add_argument("--images", nargs="*", default=CALIBRATION_IMAGES, help="parity check images")
+    parser.add_argument("--conf", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        print(export_model(args.model, args.backend, args.imgsz, args.int8, args.calibration))
+        return
+
+    from ultralytics import YOLO
+
+    reference = YOLO(args.model)
+    candidate = load_model(args.model, args.backend, args.imgsz, args.int8, args.calibration)
+    report = parity_check(reference, candidate, args.images, conf=args.conf, imgsz=args.imgsz)
+    report.update(backend=args.backend, int8=args.int8, imgsz=args.imgsz)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Offline batch processing of recorded video.
+
+Rescans archived footage or the clips under fire_recordings/ without the
+interactive menu. Videos are decoded in parallel by a pool of decoder
+threads (OpenCV releases the GIL while decoding); every stride-th frame is
+decoded and the rest are only grabbed. Frames from all videos are fed to
+the model in batches. Each video gets a detection timeline file:
+
+    JSONL  one line per inferred frame with detections:
+           {"frame", "timestamp", "max_confidence", "detections": [...]}
+    CSV    one row per detection:
+           frame,timestamp,class,name,confidence,x1,y1,x2,y2
+
+and a summary with throughput in frames of video processed per second:
+
+    python batch_process.py fire_recordings/ /archive/cam2 --stride 5 --batch 8 --format csv
+"""
+
+import argparse
+import csv
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+import cv2
+
+from annotation import detections_from_result
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".m4v", ".mjpeg", ".mjpg", ".ts")
+
+
+def collect_videos(paths, extensions=VIDEO_EXTENSIONS):
+    """
+    Expand files and directories (recursively) into a sorted list of videos
+    """
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                videos.extend(os.path.join(root, name) for name in files if name.lower().endswith(extensions))
+        elif os.path.isfile(path):
+            videos.append(path)
+        else:
+            print(f"⚠️ Not found: {path}", file=sys.stderr)
+    return sorted(set(videos))
+
+
+class TimelineWriter:
+    """
+    Writes one video's detection timeline as JSONL or CSV.
+    """
+
+    def __init__(self, path, fmt="jsonl", names=None, all_frames=False):
+        self.path = path
+        self.fmt = fmt
+        self.names = names or {}
+        self.all_frames = all_frames
+        self._file = open(path, "w", newline="")
+        self._csv = None
+        if fmt == "csv":
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(["frame", "timestamp", "class", "name", "confidence", "x1", "y1", "x2", "y2"])
+
+    def write(self, frame_index, timestamp, detections):
+        if not len(detections) and not self.all_frames:
+            return
+        if self._csv is not None:
+            if not len(detections):
+                self._csv.writerow([frame_index, f"{timestamp:.3f}"] + [""] * 7)
+            for x1, y1, x2, y2, conf, cls in detections:
+                self._csv.writerow([frame_index, f"{timestamp:.3f}", int(cls), self.names.get(int(cls), ""),
+                                    f"{conf:.4f}", int(x1), int(y1), int(x2), int(y2)])
+            return
+        entry = {
+            "frame": frame_index,
+            "timestamp": round(timestamp, 3),
+            "max_confidence": round(float(detections[:, 4].max()), 4) if len(detections) else 0.0,
+            "detections": [{"class": int(cls), "name": self.names.get(int(cls), ""),
+                            "confidence": round(float(conf), 4),
+                            "box": [round(float(v), 1) for v in (x1, y1, x2, y2)]}
+                           for x1, y1, x2, y2, conf, cls in detections],
+        }
+        self._file.write(json.dumps(entry) + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+class VideoJob:
+    """
+    Progress of one video through decode and inference.
+    """
+
+    def __init__(self, index, path):
+        self.index = index
+        self.path = path
+        self.fps = 0.0
+        self.total_frames = 0
+        self.frames_read = 0
+        self.frames_inferred = 0
+        self.frames_pending = 0
+        self.fire_frames = 0
+        self.first_fire = None
+        self.decoded_all = False
+        self.error = None
+        self.writer = None
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def summary(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        return {
+            "video": self.path,
+            "fps": self.fps,
+            "frames": self.frames_read,
+            "frames_inferred": self.frames_inferred,
+            "duration": self.frames_read / self.fps if self.fps else None,
+            "fire_frames": self.fire_frames,
+            "first_fire": self.first_fire,
+            "timeline": self.writer.path if self.writer else None,
+            "processing_fps": self.frames_read / elapsed if elapsed else 0.0,
+            "error": self.error,
+        }
+
+
+def _decode_worker(jobs, frames, stride):
+    while True:
+        try:
+            job = jobs.get_nowait()
+        except queue.Empty:
+            return
+        cap = cv2.VideoCapture(job.path)
+        try:
+            if not cap.isOpened():
+                job.error = "could not open video"
+                continue
+            job.fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+            job.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+            index = 0
+            while True:
+                if index % stride:
+                    # Skipped frames are demuxed but never decoded
+                    if not cap.grab():
+                        break
+                else:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    frames.put((job, index, index / job.fps, frame))
+                index += 1
+            job.frames_read = index
+        except Exception as e:
+            job.error = str(e)
+        finally:
+            cap.release()
+            frames.put((job, None, None, None))
+
+
+def _timeline_path(output_dir, video_path, fmt, used):
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    name, n = stem, 1
+    while name in used:
+        n += 1
+        name = f"{stem}_{n}"
+    used.add(name)
+    return os.path.join(output_dir, f"{name}.{fmt}")
+
+
+def process_videos(model, videos, output_dir="timelines", fmt="jsonl", stride=1, batch=8, decoders=None,
+                   conf=0.25, imgsz=640, all_frames=False, verbose=True):
+    """
+    Scan videos and write a timeline per video. Returns a summary dict.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    decoders = decoders or max(1, min(len(videos), (os.cpu_count() or 2) // 2))
+    names = dict(getattr(model, "names", {}) or {})
+
+    jobs = queue.Queue()
+    video_jobs = [VideoJob(i, path) for i, path in enumerate(videos)]
+    for job in video_jobs:
+        jobs.put(job)
+    frames = queue.Queue(maxsize=batch * decoders * 2)
+    threads = [threading.Thread(target=_decode_worker, args=(jobs, frames, stride), name=f"decoder-{i}",
+                                daemon=True) for i in range(decoders)]
+    for thread in threads:
+        thread.start()
+
+    used_names = set()
+    pending = []
+    finished = 0
+    start = time.perf_counter()
+
+    def run_batch():
+        results = model.predict(source=[item[3] for item in pending], conf=conf, imgsz=imgsz, verbose=False)
+        for (job, index, timestamp, _), result in zip(pending, results):
+            detections = detections_from_result(result)
+            if job.writer is None:
+                job.writer = TimelineWriter(_timeline_path(output_dir, job.path, fmt, used_names), fmt, names,
+                                            all_frames)
+            job.writer.write(index, timestamp, detections)
+            job.frames_inferred += 1
+            job.frames_pending -= 1
+            if len(detections) and (detections[:, 5] == 0).any():
+                job.fire_frames += 1
+                if job.first_fire is None:
+                    job.first_fire = timestamp
+        pending.clear()
+
+    def finish(job):
+        job.finished = time.perf_counter()
+        if job.writer is not None:
+            job.writer.close()
+        if verbose:
+            s = job.summary()
+            status = f"❌ {s['error']}" if s["error"] else (
+                f"🔥 fire in {s['fire_frames']} frames, first at {s['first_fire']:.1f}s" if s["fire_frames"]
+                else "✅ no fire")
+            print(f"[{finished}/{len(videos)}] {job.path}: {s['frames']} frames, {status}", file=sys.stderr)
+
+    while finished < len(video_jobs):
+        try:
+            job, index, timestamp, frame = frames.get(timeout=0.05 if pending else 1.0)
+        except queue.Empty:
+            if pending:
+                run_batch()
+            continue
+        if index is None:
+            job.decoded_all = True
+        else:
+            job.frames_pending += 1
+            pending.append((job, index, timestamp, frame))
+            if len(pending) >= batch:
+                run_batch()
+        # A video is done once decoded and all its frames were inferred
+        if job.decoded_all and job.frames_pending and pending:
+            run_batch()
+        if job.decoded_all and not job.frames_pending and job.finished is None:
+            finished += 1
+            finish(job)
+
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - start
+    summaries = [job.summary() for job in video_jobs]
+    frames_total = sum(s["frames"] for s in summaries)
+    video_seconds = sum(s["duration"] or 0.0 for s in summaries)
+    inferred = sum(s["frames_inferred"] for s in summaries)
+    return {
+        "videos": summaries,
+        "elapsed": elapsed,
+        "frames": frames_total,
+        "frames_inferred": inferred,
+        "video_seconds": video_seconds,
+        "throughput_fps": frames_total / elapsed if elapsed else 0.0,
+        "inference_fps": inferred / elapsed if elapsed else 0.0,
+        "realtime_factor": video_seconds / elapsed if elapsed else 0.0,
+        "stride": stride,
+        "batch": batch,
+        "decoders": decoders,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scan recorded videos for fire")
+    parser.add_argument("paths", nargs="+", help="video files or directories")
+    parser.add_argument("--model", default="best.pt")
+    parser.add_argument("--backend", choices=["pytorch", "onnx", "openvino"], default="pytorch")
+    parser.add_argument("--int8", action="store_true")
+    parser.add_argument("--output-dir", default="timelines")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("--stride", type=int, default=1, help="infer every Nth frame")
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--decoders", type=int, default=0, help="decoder threads, 0 = half the cores")
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--all-frames", action="store_true", help="also log inferred frames without detections")
+    args = parser.parse_args(argv)
+
+    videos = collect_videos(args.paths)
+    if not videos:
+        print("❌ No videos found", file=sys.stderr)
+        return 1
+
+    from backends import load_model
+
+    model = load_model(args.model, args.backend, imgsz=args.imgsz, int8=args.int8)
+    print(f"🎞️ Scanning {len(videos)} video(s), stride {args.stride}, batch {args.batch}", file=sys.stderr)
+    report = process_videos(model, videos, args.output_dir, args.format, stride=max(1, args.stride),
+                            batch=args.batch, decoders=args.decoders or None, conf=args.conf,
+                            imgsz=args.imgsz, all_frames=args.all_frames)
+
+    summary_path = os.path.join(args.output_dir, "summary.json")
+    with open(summary_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ {report['frames']} frames ({report['video_seconds']:.0f}s of video) in {report['elapsed']:.1f}s: "
+          f"{report['throughput_fps']:.1f} video fps, {report['inference_fps']:.1f} inferred fps, "
+          f"{report['realtime_factor']:.1f}x realtime. Summary: {summary_path}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,412 @@
+"""
+Benchmark suite for the fire detection pipeline.
+
+Runs headless from the command line, warms the model up, then times every
+stage of the real pipeline separately on real content (fire.33.png,
+non_fire.png and a synthetic video built from them):
+
+    decode -> preprocess -> inference -> postprocess -> plot -> encode -> alert enqueue
+
+for every combination of input size, batch size and CPU thread count, and
+reports p50/p95/p99 latency and throughput as JSON so runs can be compared
+across model and library versions:
+
+    python benchmark.py --imgsz 320 640 --batch 1 4 --threads 2 4 --output bench.json
+
+--tiling adds a comparison of full-frame and tiled inference on large
+scenes with small fire patches pasted at known positions, reporting the
+latency cost against the recall gain:
+
+    python benchmark.py --tiling --scene-size 2560x1440 --tile-size 640
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from alerts import Alert, AlertDispatcher, FunctionChannel
+from annotation import detections_from_result
+from model_cache import hardware_fingerprint
+from tiling import Tiler, predict_tiled
+
+SAMPLE_IMAGES = ["fire.33.png", "non_fire.png"]
+STAGES = ["decode", "preprocess", "inference", "postprocess", "plot", "encode", "alert_enqueue"]
+
+
+def latency_stats(samples):
+    """
+    Summarise a list of durations in seconds as milliseconds
+    """
+    if not samples:
+        return None
+    values = np.asarray(samples, dtype=np.float64) * 1000
+    return {
+        "n": int(values.size),
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "min": float(values.min()),
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "p99": float(np.percentile(values, 99)),
+        "max": float(values.max()),
+    }
+
+
+def load_sample_frames(paths=SAMPLE_IMAGES, size=None):
+    """
+    Load sample images, optionally resized to size=(width, height)
+    """
+    frames = []
+    for path in paths:
+        image = cv2.imread(path)
+        if image is None:
+            print(f"⚠️ Could not read sample image {path}")
+            continue
+        if size is not None:
+            image = cv2.resize(image, size, interpolation=cv2.INTER_LINEAR)
+        frames.append(image)
+    if not frames:
+        raise FileNotFoundError(f"No sample images found in {paths}")
+    return frames
+
+
+def make_synthetic_video(path, paths=SAMPLE_IMAGES, size=(1280, 720), num_frames=90, fps=15.0):
+    """
+    Write an MJPG clip of the fire image drifting across the non-fire scene
+    """
+    images = load_sample_frames(paths)
+    background = cv2.resize(images[-1], size)
+    fire = images[0]
+    patch_width = size[0] // 4
+    patch_height = max(1, int(fire.shape[0] * patch_width / fire.shape[1]))
+    patch_height = min(patch_height, size[1])
+    patch = cv2.resize(fire, (patch_width, patch_height))
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    for i in range(num_frames):
+        frame = background.copy()
+        x = int((size[0] - patch_width) * i / max(1, num_frames - 1))
+        y = (size[1] - patch_height) // 2
+        # Fire only appears in the second half of the clip
+        if i >= num_frames // 2:
+            frame[y:y + patch_height, x:x + patch_width] = patch
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+class FrameSource:
+    """
+    Endless source of encoded frames; read() times the decode stage.
+    Images are kept JPEG-encoded, as an MJPEG camera would deliver them.
+    """
+
+    def __init__(self, images=None, video_path=None):
+        self.encoded = []
+        for image in images or []:
+            ok, data = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+            if ok:
+                self.encoded.append(data)
+        self.video_path = video_path
+        self._cap = None
+        self._index = 0
+
+    def read(self):
+        if self.video_path:
+            if self._cap is None:
+                self._cap = cv2.VideoCapture(self.video_path)
+            ret, frame = self._cap.read()
+            if not ret:
+                self._cap.release()
+                self._cap = cv2.VideoCapture(self.video_path)
+                ret, frame = self._cap.read()
+            return frame
+        data = self.encoded[self._index % len(self.encoded)]
+        self._index += 1
+        return cv2.imdecode(data, cv2.IMREAD_COLOR)
+
+    def close(self):
+        if self._cap is not None:
+            self._cap.release()
+
+
+def benchmark_inference(model, frames, imgsz=640, batch=1, iterations=100, warmup=10, conf=0.6):
+    """
+    Time model.predict() alone on real frames after a warm-up.
+    Returns latency stats per call and throughput in frames per second.
+    """
+    batches = itertools.cycle([frames[i % len(frames)] for i in range(j, j + batch)]
+                              for j in range(len(frames)))
+    for _ in range(warmup):
+        model.predict(source=next(batches), imgsz=imgsz, conf=conf, verbose=False)
+
+    samples = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        model.predict(source=next(batches), imgsz=imgsz, conf=conf, verbose=False)
+        samples.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    return {
+        "imgsz": imgsz,
+        "batch": batch,
+        "latency_ms": latency_stats(samples),
+        "throughput_fps": iterations * batch / elapsed if elapsed else 0.0,
+    }
+
+
+def make_small_fire_scenes(paths=SAMPLE_IMAGES, size=(2560, 1440), patch_widths=(48, 64, 96, 128),
+                           per_scene=3, seed=0):
+    """
+    Paste downscaled copies of the fire image onto an upscaled non-fire
+    scene. Returns a list of (patch_width, frame, ground truth boxes).
+    """
+    rng = np.random.default_rng(seed)
+    images = load_sample_frames(paths)
+    background = cv2.resize(images[-1], size, interpolation=cv2.INTER_CUBIC)
+    fire = images[0]
+    scenes = []
+    for patch_width in patch_widths:
+        patch_height = max(1, int(fire.shape[0] * patch_width / fire.shape[1]))
+        patch = cv2.resize(fire, (patch_width, patch_height), interpolation=cv2.INTER_AREA)
+        frame = background.copy()
+        boxes = []
+        # One patch per column band so patches never overlap
+        band = size[0] // per_scene
+        for k in range(per_scene):
+            x = int(k * band + rng.integers(0, max(1, band - patch_width)))
+            y = int(rng.integers(0, max(1, size[1] - patch_height)))
+            frame[y:y + patch_height, x:x + patch_width] = patch
+            boxes.append([x, y, x + patch_width, y + patch_height])
+        scenes.append((patch_width, frame, np.array(boxes, dtype=np.float32)))
+    return scenes
+
+
+def _fire_recall(detections, boxes, fire_class=0):
+    """
+    Fraction of ground truth boxes containing the centre of a fire detection
+    """
+    fire = detections[detections[:, 5].astype(int) == fire_class]
+    if not len(boxes):
+        return 1.0
+    cx = (fire[:, 0] + fire[:, 2]) / 2
+    cy = (fire[:, 1] + fire[:, 3]) / 2
+    hits = 0
+    for x1, y1, x2, y2 in boxes:
+        if np.any((cx >= x1) & (cx <= x2) & (cy >= y1) & (cy <= y2)):
+            hits += 1
+    return hits / len(boxes)
+
+
+def benchmark_tiling(model, scenes, tiler, iterations=5, conf=0.25):
+    """
+    Compare full-frame and tiled inference on the same scenes: latency per
+    frame and recall of the pasted fire patches, overall and per patch size
+    """
+    report = {"tile_size": tiler.tile_size, "overlap": tiler.overlap, "full_frame": tiler.full_frame,
+              "tiles_per_frame": len(tiler.windows(scenes[0][1].shape)), "modes": {}}
+    modes = {
+        "full": lambda frame: model.predict(source=[frame], conf=conf, verbose=False),
+        "tiled": lambda frame: predict_tiled(model, [frame], tiler, conf=conf),
+    }
+    for name, predict in modes.items():
+        predict(scenes[0][1])  # warm-up, also for the tile input size
+        samples, recalls = [], {}
+        for patch_width, frame, boxes in scenes:
+            for _ in range(iterations):
+                t0 = time.perf_counter()
+                result = predict(frame)[0]
+                samples.append(time.perf_counter() - t0)
+            recalls[patch_width] = _fire_recall(detections_from_result(result), boxes)
+        report["modes"][name] = {
+            "latency_ms": latency_stats(samples),
+            "recall": float(np.mean(list(recalls.values()))),
+            "recall_by_patch_width": recalls,
+        }
+    full, tiled = report["modes"]["full"], report["modes"]["tiled"]
+    report["latency_cost"] = tiled["latency_ms"]["mean"] / full["latency_ms"]["mean"]
+    report["recall_gain"] = tiled["recall"] - full["recall"]
+    return report
+
+
+def benchmark_pipeline(model, source, imgsz=640, batch=1, iterations=50, warmup=5, conf=0.6,
+                       dispatcher=None, work_dir=None):
+    """
+    Time every pipeline stage separately for one configuration
+    """
+    timings = {stage: [] for stage in STAGES}
+    end_to_end = []
+    writer = None
+    video_path = os.path.join(work_dir or tempfile.gettempdir(), f"bench_encode_{os.getpid()}.mp4")
+
+    try:
+        for iteration in range(warmup + iterations):
+            measured = iteration >= warmup
+            t_start = time.perf_counter()
+
+            frames = []
+            for _ in range(batch):
+                t0 = time.perf_counter()
+                frames.append(source.read())
+                if measured:
+                    timings["decode"].append(time.perf_counter() - t0)
+
+            results = model.predict(source=frames, imgsz=imgsz, conf=conf, verbose=False)
+
+            for i, result in enumerate(results):
+                if measured:
+                    # Ultralytics reports per-image stage times in milliseconds
+                    for stage in ("preprocess", "inference", "postprocess"):
+                        timings[stage].append(result.speed.get(stage, 0.0) / 1000)
+
+                t0 = time.perf_counter()
+                annotated = result.plot()
+                if measured:
+                    timings["plot"].append(time.perf_counter() - t0)
+
+                if writer is None:
+                    height, width = annotated.shape[:2]
+                    writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*"mp4v"), 15.0, (width, height))
+                t0 = time.perf_counter()
+                writer.write(annotated)
+                if measured:
+                    timings["encode"].append(time.perf_counter() - t0)
+
+                if dispatcher is not None:
+                    t0 = time.perf_counter()
+                    dispatcher.submit(Alert(f"bench-{iteration}-{i}", "benchmark"), channels=["noop"])
+                    if measured:
+                        timings["alert_enqueue"].append(time.perf_counter() - t0)
+
+            if measured:
+                end_to_end.append(time.perf_counter() - t_start)
+    finally:
+        if writer is not None:
+            writer.release()
+        if os.path.exists(video_path):
+            os.remove(video_path)
+
+    total = sum(end_to_end)
+    return {
+        "imgsz": imgsz,
+        "batch": batch,
+        "iterations": iterations,
+        "stages_ms": {stage: latency_stats(samples) for stage, samples in timings.items()},
+        "batch_latency_ms": latency_stats(end_to_end),
+        "throughput_fps": iterations * batch / total if total else 0.0,
+    }
+
+
+def run_suite(model, imgsz_list=(640,), batch_list=(1,), thread_list=(None,), sources=None,
+              iterations=50, warmup=5, conf=0.6, model_name=None):
+    """
+    Run benchmark_pipeline for every imgsz x batch x threads x source
+    combination and return a JSON-serialisable report
+    """
+    try:
+        import torch
+    except ImportError:
+        torch = None
+
+    dispatcher = AlertDispatcher(workers=1, queue_size=10000, verbose=False)
+    dispatcher.add_channel(FunctionChannel("noop", lambda: None, max_retries=0))
+    dispatcher.start()
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "model": model_name,
+        "hardware": hardware_fingerprint(),
+        "opencv": cv2.__version__,
+        "runs": [],
+    }
+    original_threads = torch.get_num_threads() if torch is not None else None
+    try:
+        for threads, imgsz, batch in itertools.product(thread_list, imgsz_list, batch_list):
+            if threads and torch is not None:
+                torch.set_num_threads(threads)
+            for source_name, source in (sources or {}).items():
+                print(f"⏱️ {source_name}: imgsz={imgsz} batch={batch} threads={threads or 'default'}",
+                      file=sys.stderr)
+                run = benchmark_pipeline(model, source, imgsz=imgsz, batch=batch, iterations=iterations,
+                                         warmup=warmup, conf=conf, dispatcher=dispatcher)
+                run["source"] = source_name
+                run["threads"] = threads or original_threads
+                report["runs"].append(run)
+    finally:
+        if torch is not None and original_threads:
+            torch.set_num_threads(original_threads)
+        dispatcher.stop(timeout=2.0)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the fire detection pipeline")
+    parser.add_argument("--model", default="best.pt")
+    parser.add_argument("--backend", choices=["pytorch", "onnx", "openvino"], default="pytorch")
+    parser.add_argument("--int8", action="store_true", help="INT8 quantized export (onnx/openvino)")
+    parser.add_argument("--images", nargs="*", default=SAMPLE_IMAGES)
+    parser.add_argument("--size", default="1280x720", help="frame size for the image source, WxH")
+    parser.add_argument("--video", default=None, help="video file to decode (default: synthetic clip)")
+    parser.add_argument("--no-video", action="store_true", help="skip the video source")
+    parser.add_argument("--imgsz", nargs="+", type=int, default=[640])
+    parser.add_argument("--batch", nargs="+", type=int, default=[1])
+    parser.add_argument("--threads", nargs="+", type=int, default=[0], help="torch threads, 0 = default")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--conf", type=float, default=0.6)
+    parser.add_argument("--tiling", action="store_true", help="also compare full-frame and tiled inference")
+    parser.add_argument("--scene-size", default="2560x1440", help="scene size for --tiling, WxH")
+    parser.add_argument("--tile-size", type=int, default=640)
+    parser.add_argument("--overlap", type=float, default=0.2)
+    parser.add_argument("--output", default=None, help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    from backends import load_model
+
+    model = load_model(args.model, args.backend, imgsz=max(args.imgsz), int8=args.int8)
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    sources = {"images": FrameSource(images=load_sample_frames(args.images, size=(width, height)))}
+
+    synthetic_path = None
+    if not args.no_video:
+        video_path = args.video
+        if video_path is None:
+            synthetic_path = os.path.join(tempfile.gettempdir(), f"bench_synthetic_{os.getpid()}.avi")
+            video_path = make_synthetic_video(synthetic_path, args.images, size=(width, height))
+        sources["video"] = FrameSource(video_path=video_path)
+
+    try:
+        report = run_suite(model, args.imgsz, args.batch, [t or None for t in args.threads], sources,
+                           iterations=args.iterations, warmup=args.warmup, conf=args.conf,
+                           model_name=f"{args.model} ({args.backend}{' int8' if args.int8 else ''})")
+        if args.tiling:
+            scene_width, scene_height = (int(v) for v in args.scene_size.lower().split("x"))
+            print(f"⏱️ tiling: {args.scene_size} scenes, {args.tile_size}px tiles", file=sys.stderr)
+            report["tiling"] = benchmark_tiling(
+                model, make_small_fire_scenes(args.images, size=(scene_width, scene_height)),
+                Tiler(tile_size=args.tile_size, overlap=args.overlap), iterations=max(1, args.iterations // 10))
+    finally:
+        for source in sources.values():
+            source.close()
+        if synthetic_path and os.path.exists(synthetic_path):
+            os.remove(synthetic_path)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+        print(f"✅ Benchmark written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
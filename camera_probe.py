@@ -0,0 +1,217 @@
+"""
+IP camera probing and non-interactive reconnects.
+
+cv2.VideoCapture() on an unreachable host can block for a long time, so
+candidate URLs are opened concurrently, each with FFmpeg open/read timeouts
+and an overall hard deadline; the first candidate that delivers a frame
+wins. The last URL that worked for a device (ip:port) is remembered on disk
+and tried on its own first next time.
+
+make_opener() returns the callable FrameGrabber uses to reconnect a lost
+camera from its own thread, without prompting and without holding up the
+other cameras.
+
+HTTP MJPEG streams are read with MjpegCapture rather than FFmpeg, so frames
+the grabber skips are never decoded. capture_args (native_mjpeg,
+mjpeg_reduce) are passed through to open_capture().
+"""
+
+import queue
+import threading
+import time
+
+import cv2
+
+from mjpeg_stream import MjpegCapture
+from model_cache import load_cached, store_cached
+
+CAMERA_CACHE_PATH = ".camera_cache.json"
+
+# Seconds a single candidate URL may take to open and deliver a frame
+PROBE_TIMEOUT = 5.0
+
+
+def candidate_urls(url, ip=None, port=None):
+    """
+    (url, description) pairs to try for a camera, without duplicates
+    """
+    candidates = [
+        (url, "Default URL"),
+        (url.replace("video", "videofeed"), "Video feed URL"),
+        (url.replace("video", "mjpegfeed"), "MJPEG feed URL"),
+        (f"{url}?640x480", "640x480 resolution"),
+        (f"{url}?1280x720", "720p resolution"),
+    ]
+    if ip:
+        candidates += [
+            (f"http://{ip}:{port}/video", "Basic video URL"),
+            (f"http://{ip}:{port}/videofeed", "Basic feed URL"),
+        ]
+    seen = set()
+    unique = []
+    for candidate, description in candidates:
+        if candidate not in seen:
+            seen.add(candidate)
+            unique.append((candidate, description))
+    return unique
+
+
+def open_capture(source, timeout=None, native_mjpeg=True, mjpeg_reduce=1):
+    """
+    Open a webcam index or stream URL, returning None if it cannot be opened.
+    HTTP MJPEG streams are opened with MjpegCapture when native_mjpeg is
+    set; other stream URLs get FFmpeg open/read timeouts so a dead host
+    fails fast.
+    """
+    try:
+        if native_mjpeg and isinstance(source, str) and source.lower().startswith(("http://", "https://")):
+            cap = MjpegCapture(source, timeout=timeout or PROBE_TIMEOUT, reduce=mjpeg_reduce)
+            if cap.isOpened():
+                return cap
+            if cap.connect_error:
+                # Unreachable; FFmpeg would only wait out the same timeout again
+                return None
+        if isinstance(source, str) and timeout and hasattr(cv2, "CAP_PROP_OPEN_TIMEOUT_MSEC"):
+            msec = int(timeout * 1000)
+            cap = cv2.VideoCapture(source, cv2.CAP_FFMPEG,
+                                   [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, msec, cv2.CAP_PROP_READ_TIMEOUT_MSEC, msec])
+        else:
+            cap = cv2.VideoCapture(source)
+        if cap.isOpened():
+            return cap
+        cap.release()
+    except Exception as e:
+        print(f"⚠️ Could not open {source}: {str(e)}")
+    return None
+
+
+def _probe(url, timeout, capture_args):
+    cap = open_capture(url, timeout, **capture_args)
+    if cap is None:
+        return None, None
+    try:
+        ret, frame = cap.read()
+    except Exception:
+        ret, frame = False, None
+    if not ret or frame is None or frame.size == 0:
+        cap.release()
+        return None, None
+    return cap, frame.shape
+
+
+def probe_urls(candidates, timeout=PROBE_TIMEOUT, capture_args=None):
+    """
+    Try (url, description) candidates concurrently. Returns
+    (cap, url, description, frame_shape) for the first one that delivers a
+    frame, or None once every candidate failed or timeout has passed.
+    Probes still blocked at the deadline release their capture when they
+    finish.
+    """
+    if not candidates:
+        return None
+    capture_args = capture_args or {}
+    results = queue.Queue()
+    lock = threading.Lock()
+    state = {"done": False}
+
+    def worker(url, description):
+        cap, shape = _probe(url, timeout, capture_args)
+        with lock:
+            if not state["done"]:
+                results.put((cap, url, description, shape))
+                return
+        if cap is not None:
+            cap.release()
+
+    for url, description in candidates:
+        threading.Thread(target=worker, args=(url, description), name="camera-probe", daemon=True).start()
+
+    deadline = time.time() + timeout
+    pending = len(candidates)
+    winner = None
+    while pending and winner is None:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        try:
+            cap, url, description, shape = results.get(timeout=remaining)
+        except queue.Empty:
+            break
+        pending -= 1
+        if cap is not None:
+            winner = (cap, url, description, shape)
+
+    with lock:
+        state["done"] = True
+    # Successful probes that finished after the winner
+    while True:
+        try:
+            cap = results.get_nowait()[0]
+        except queue.Empty:
+            break
+        if cap is not None:
+            cap.release()
+    return winner
+
+
+def last_good_url(device, cache_path=CAMERA_CACHE_PATH):
+    entry = load_cached(cache_path, device)
+    return entry.get("url") if entry else None
+
+
+def remember_url(device, url, cache_path=CAMERA_CACHE_PATH):
+    try:
+        store_cached(cache_path, device, {"url": url})
+    except OSError as e:
+        print(f"⚠️ Could not save camera URL: {str(e)}")
+
+
+def probe_camera(device, candidates, timeout=PROBE_TIMEOUT, cache_path=CAMERA_CACHE_PATH, capture_args=None,
+                 verbose=True):
+    """
+    Connect to device (an "ip:port" key): the last known good URL first,
+    then all candidates concurrently. Returns (cap, url) or (None, None).
+    """
+    cached = last_good_url(device, cache_path)
+    found = None
+    if cached:
+        if verbose:
+            print(f"🔁 Trying last known good URL {cached}...")
+        found = probe_urls([(cached, "Last known good URL")], timeout, capture_args)
+    if found is None:
+        if verbose:
+            print(f"🔍 Probing {len(candidates)} URLs (timeout {timeout:.0f}s)...")
+        found = probe_urls([c for c in candidates if c[0] != cached], timeout, capture_args)
+    if found is None:
+        return None, None
+
+    cap, url, description, shape = found
+    if verbose:
+        print(f"✅ Successfully connected using {description}")
+        print(f"📊 Frame size: {shape[1]}x{shape[0]}")
+    if url != cached:
+        remember_url(device, url, cache_path)
+    return cap, url
+
+
+def make_opener(source, candidates=None, device=None, timeout=PROBE_TIMEOUT, cache_path=CAMERA_CACHE_PATH,
+                capture_args=None):
+    """
+    Non-interactive opener for FrameGrabber reconnects. Tries source, and
+    with candidates the other URLs concurrently, returning a capture or None.
+    """
+    capture_args = capture_args or {}
+
+    def opener():
+        if not candidates or not isinstance(source, str):
+            return open_capture(source, timeout, **capture_args)
+        others = [c for c in candidates if c[0] != source]
+        found = probe_urls([(source, "Current URL")] + others, timeout, capture_args)
+        if found is None:
+            return None
+        cap, url = found[0], found[1]
+        if device and url != source:
+            remember_url(device, url, cache_path)
+        return cap
+
+    return opener
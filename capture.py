@@ -0,0 +1,293 @@
+"""
+Threaded frame capture for the fire detection loop.
+
+Each camera is read on its own thread. The thread keeps calling grab() so the
+OpenCV/FFmpeg buffer never backs up while YOLO is busy, and only decodes
+(retrieve()) the frame that the detector actually asked for. Frames nobody
+asked for are counted as dropped and never decoded.
+
+Decoded frames land directly in a FramePool slot, so capture does not
+allocate a new ndarray per frame.
+
+Given an opener, a grabber whose camera stops delivering frames reconnects
+on its own thread with exponential backoff and jitter; readers see it as
+reconnecting instead of blocking on it.
+"""
+
+import random
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from frame_pool import FramePool
+
+# Consecutive grab() failures before the grabber reports the camera as lost
+MAX_GRAB_FAILURES = 50
+
+# Default number of pooled frame buffers per camera
+FRAME_POOL_SIZE = 24
+
+
+class FrameGrabber:
+    """
+    Read a cv2.VideoCapture on a background thread, latest frame wins.
+
+    read() hands out FrameSlot references; the caller must release() them.
+    """
+
+    def __init__(self, cap, name="camera", pool=None, opener=None, backoff=1.0, max_backoff=60.0):
+        self.cap = cap
+        self.name = name
+        self.pool = pool if pool is not None else FramePool(size=FRAME_POOL_SIZE, name=name)
+        # opener() returns a new capture or None; cap may be None to open it on the thread
+        self.opener = opener
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        if cap is not None:
+            self._configure()
+
+        self._cond = threading.Condition()
+        self._wanted = False
+        self._frame = None
+        self._frame_time = 0.0
+        self._seq = 0
+        self._read_seq = 0
+        self._running = False
+        self._failed = False
+        self._reconnecting = cap is None
+        self._wake = threading.Event()
+        self._thread = None
+
+        # Statistics
+        self.frames_grabbed = 0
+        self.frames_decoded = 0
+        self.frames_dropped = 0
+        self.grab_failures = 0
+        self.reconnects = 0
+        self.reconnect_attempts = 0
+        self.last_frame_age = 0.0
+        self._age_total = 0.0
+        self._frames_read = 0
+
+    def start(self):
+        """
+        Start the capture thread
+        """
+        self._running = True
+        self._failed = False
+        self._wake.clear()
+        self._thread = threading.Thread(target=self._run, name=f"grabber-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def _configure(self):
+        # Ask the backend to keep as few frames buffered as it can
+        try:
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        except Exception:
+            pass
+
+    def _reopen(self):
+        """
+        Call the opener until it returns a capture, sleeping with exponential
+        backoff and jitter in between. Returns False if stopped meanwhile.
+        """
+        delay = self.backoff
+        while self._running:
+            self.reconnect_attempts += 1
+            try:
+                cap = self.opener()
+            except Exception as e:
+                print(f"⚠️ [{self.name}] reconnect error: {str(e)}")
+                cap = None
+            if cap is not None:
+                if not self._running:
+                    cap.release()
+                    return False
+                with self._cond:
+                    self.cap = cap
+                    self._reconnecting = False
+                self._configure()
+                if self.frames_grabbed:
+                    self.reconnects += 1
+                print(f"✅ [{self.name}] Camera connected")
+                return True
+            wait = delay + random.uniform(0, delay / 2)
+            print(f"⚠️ [{self.name}] Camera not available, retrying in {wait:.1f}s")
+            self._wake.wait(wait)
+            delay = min(self.max_backoff, delay * 2)
+        return False
+
+    def _run(self):
+        consecutive_failures = 0
+        while self._running:
+            if self.cap is None:
+                if not self._reopen():
+                    return
+                consecutive_failures = 0
+            try:
+                ok = self.cap.grab()
+            except Exception as e:
+                print(f"⚠️ [{self.name}] grab error: {str(e)}")
+                ok = False
+
+            if not ok:
+                self.grab_failures += 1
+                consecutive_failures += 1
+                if consecutive_failures >= MAX_GRAB_FAILURES:
+                    if self.opener is not None:
+                        print(f"🔄 [{self.name}] Camera stopped delivering frames, reconnecting...")
+                        with self._cond:
+                            self._reconnecting = True
+                            self._cond.notify_all()
+                        self.cap.release()
+                        self.cap = None
+                        continue
+                    print(f"❌ [{self.name}] Camera stopped delivering frames")
+                    with self._cond:
+                        self._failed = True
+                        self._cond.notify_all()
+                    return
+                time.sleep(0.01)
+                continue
+
+            consecutive_failures = 0
+            grabbed_at = time.time()
+            self.frames_grabbed += 1
+
+            with self._cond:
+                wanted = self._wanted
+            if not wanted:
+                # Nobody is waiting for this frame, skip the decode
+                self.frames_dropped += 1
+                continue
+
+            slot = self._retrieve()
+            if slot is None:
+                self.grab_failures += 1
+                continue
+            slot.timestamp = grabbed_at
+            self.frames_decoded += 1
+
+            with self._cond:
+                if self._frame is not None:
+                    self._frame.release()
+                self._frame = slot
+                self._frame_time = grabbed_at
+                self._seq += 1
+                self._wanted = False
+                self._cond.notify_all()
+
+    def _retrieve(self):
+        """
+        Decode the grabbed frame straight into a pool slot
+        """
+        if self.pool.shape is None:
+            ok, frame = self.cap.retrieve()
+            if not ok or frame is None:
+                return None
+            return self.pool.from_array(frame)
+
+        slot = self.pool.get()
+        ok, frame = self.cap.retrieve(image=slot.array)
+        if not ok or frame is None:
+            slot.release()
+            return None
+        if frame is not slot.array and not np.may_share_memory(frame, slot.array):
+            # Resolution changed, OpenCV allocated a new buffer
+            slot.release()
+            return self.pool.from_array(frame)
+        return slot
+
+    def request(self):
+        """
+        Ask the capture thread to decode the next frame it grabs.
+        Lets a caller with several cameras request them all before waiting.
+        """
+        with self._cond:
+            if self._read_seq == self._seq:
+                self._wanted = True
+
+    def read(self, timeout=2.0):
+        """
+        Return (ret, slot, timestamp) for the freshest frame.
+        slot.array holds the image; call slot.release() when done with it.
+        """
+        self.request()
+        deadline = time.time() + timeout
+        with self._cond:
+            while self._seq == self._read_seq:
+                if self._failed or self._reconnecting or not self._running:
+                    return False, None, None
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False, None, None
+                self._cond.wait(remaining)
+            frame = self._frame
+            frame_time = self._frame_time
+            self._read_seq = self._seq
+            self._frame = None
+
+        self.last_frame_age = time.time() - frame_time
+        self._age_total += self.last_frame_age
+        self._frames_read += 1
+        return True, frame, frame_time
+
+    @property
+    def failed(self):
+        return self._failed
+
+    @property
+    def reconnecting(self):
+        return self._reconnecting
+
+    @property
+    def live(self):
+        """
+        True while the camera is delivering frames
+        """
+        return self._running and not self._failed and not self._reconnecting
+
+    def stats(self):
+        """
+        Return capture statistics for this camera
+        """
+        return {
+            "camera": self.name,
+            "frames_grabbed": self.frames_grabbed,
+            "frames_decoded": self.frames_decoded,
+            "frames_dropped": self.frames_dropped,
+            "grab_failures": self.grab_failures,
+            "reconnects": self.reconnects,
+            "reconnecting": self._reconnecting,
+            "last_frame_age_ms": self.last_frame_age * 1000,
+            "avg_frame_age_ms": (self._age_total / self._frames_read * 1000) if self._frames_read else 0.0,
+        }
+
+    def print_stats(self):
+        s = self.stats()
+        print(f"📊 [{s['camera']}] grabbed: {s['frames_grabbed']}, decoded: {s['frames_decoded']}, "
+              f"dropped: {s['frames_dropped']}, frame age: {s['last_frame_age_ms']:.1f}ms "
+              f"(avg {s['avg_frame_age_ms']:.1f}ms)"
+              + (f", reconnects: {s['reconnects']}" if s["reconnects"] else ""))
+        self.pool.print_stats()
+
+    def stop(self, release=True):
+        """
+        Stop the capture thread and optionally release the camera
+        """
+        self._running = False
+        self._wake.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        with self._cond:
+            if self._frame is not None:
+                self._frame.release()
+                self._frame = None
+        if release and self.cap is not None:
+            self.cap.release()
@@ -0,0 +1,297 @@
+"""
+Background SMTP email transport.
+
+All email goes through one EmailTransport. Callers only enqueue an
+EmailJob; a single sender thread owns an authenticated SMTP connection,
+reuses it between messages and reconnects when the server has dropped it
+or it has been idle too long. Attachments are base64-encoded and streamed
+to the server in chunks instead of being read into memory whole.
+"""
+
+import base64
+import os
+import queue
+import smtplib
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from email.header import Header
+from email.utils import formatdate, make_msgid
+
+from telemetry import telemetry
+
+# Raw bytes per base64 line (57 bytes -> 76 characters)
+_LINE_BYTES = 57
+# Raw bytes read from an attachment per chunk
+_CHUNK_BYTES = _LINE_BYTES * 1024
+
+
+def _permanent(error):
+    """
+    True for SMTP errors a retry would only repeat: 5xx replies
+    """
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return False
+
+
+class EmailJob:
+    """
+    One email to send. prepare, if given, runs on the sender thread before
+    sending and returns the attachment path (e.g. to write the video).
+    """
+
+    def __init__(self, to, subject, body, attachment_path=None, attachment_type="application/mp4",
+                 prepare=None, max_retries=2):
+        self.to = to
+        self.subject = subject
+        self.body = body
+        self.attachment_path = attachment_path
+        self.attachment_type = attachment_type
+        self.prepare = prepare
+        self.max_retries = max_retries
+        self.created = time.time()
+        self.future = Future()
+
+
+def _base64_lines(data):
+    encoded = base64.encodebytes(data)
+    return encoded.replace(b"\n", b"\r\n")
+
+
+def iter_message_chunks(sender, job):
+    """
+    Yield the MIME message for job as CRLF-terminated byte chunks.
+    Every body part is base64 encoded, so no line needs dot-stuffing.
+    """
+    boundary = f"=={uuid.uuid4().hex}=="
+    headers = [
+        f"From: {sender}",
+        f"To: {job.to}",
+        f"Subject: {Header(job.subject, 'utf-8').encode()}",
+        f"Date: {formatdate(localtime=True)}",
+        f"Message-ID: {make_msgid()}",
+        "MIME-Version: 1.0",
+        f'Content-Type: multipart/mixed; boundary="{boundary}"',
+        "",
+        f"--{boundary}",
+        'Content-Type: text/plain; charset="utf-8"',
+        "Content-Transfer-Encoding: base64",
+        "",
+        "",
+    ]
+    yield "\r\n".join(headers).encode("ascii")
+    yield _base64_lines(job.body.encode("utf-8"))
+
+    if job.attachment_path:
+        filename = os.path.basename(job.attachment_path)
+        part = [
+            f"--{boundary}",
+            f"Content-Type: {job.attachment_type}",
+            "Content-Transfer-Encoding: base64",
+            f'Content-Disposition: attachment; filename="{filename}"',
+            "",
+            "",
+        ]
+        yield "\r\n".join(part).encode("ascii")
+        with open(job.attachment_path, "rb") as f:
+            while True:
+                data = f.read(_CHUNK_BYTES)
+                if not data:
+                    break
+                yield _base64_lines(data)
+
+    yield f"--{boundary}--\r\n".encode("ascii")
+
+
+class EmailTransport:
+    """
+    Queue of email jobs sent over one reusable SMTP connection.
+    """
+
+    def __init__(self, host, port, sender, password, use_tls=True, timeout=30, idle_timeout=240,
+                 queue_size=20):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._server = None
+        self._last_used = 0.0
+        self._thread = None
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.sent = 0
+        self.failed = 0
+        self.connections = 0
+        self.dropped = 0
+        self.latency_total = 0.0
+        self.last_error = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="email-sender", daemon=True)
+                self._thread.start()
+        return self
+
+    def submit(self, job):
+        """
+        Queue a job without blocking. Returns the job's Future; on a full
+        queue the Future fails immediately.
+        """
+        self.start()
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self.dropped += 1
+            job.future.set_exception(RuntimeError("Email queue is full"))
+        return job.future
+
+    def send(self, job, timeout=None):
+        """
+        Queue a job and wait for it; raises whatever the send raised
+        """
+        return self.submit(job).result(timeout=timeout)
+
+    def verify(self, timeout=None):
+        """
+        Connect and log in on the sender thread, raising on failure
+        """
+        return self.send(EmailJob(None, None, None, max_retries=0), timeout=timeout)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def _connect(self):
+        self._disconnect()
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.password:
+                server.login(self.sender, self.password)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+        self._last_used = time.time()
+        self.connections += 1
+        return server
+
+    def _disconnect(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                self._server.close()
+            self._server = None
+
+    def _connection(self):
+        if self._server is not None and time.time() - self._last_used > self.idle_timeout:
+            # The server has most likely dropped an idle session by now
+            self._disconnect()
+        if self._server is None:
+            return self._connect()
+        return self._server
+
+    def _transmit(self, server, job):
+        server.ehlo_or_helo_if_needed()
+        code, resp = server.mail(self.sender)
+        if code != 250:
+            raise smtplib.SMTPSenderRefused(code, resp, self.sender)
+        code, resp = server.rcpt(job.to)
+        if code not in (250, 251):
+            raise smtplib.SMTPRecipientsRefused({job.to: (code, resp)})
+        code, resp = server.docmd("DATA")
+        if code != 354:
+            raise smtplib.SMTPDataError(code, resp)
+        for chunk in iter_message_chunks(self.sender, job):
+            server.send(chunk)
+        server.send(b".\r\n")
+        code, resp = server.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, resp)
+
+    def _reset(self, server):
+        try:
+            server.rset()
+        except (smtplib.SMTPException, OSError):
+            self._disconnect()
+
+    def _process(self, job):
+        if job.prepare is not None:
+            job.attachment_path = job.prepare()
+            if job.attachment_path is None:
+                raise RuntimeError("Attachment could not be prepared")
+
+        for attempt in range(job.max_retries + 1):
+            try:
+                server = self._connection()
+                if job.to is not None:
+                    self._transmit(server, job)
+                self._last_used = time.time()
+                return True
+            except smtplib.SMTPAuthenticationError:
+                self._disconnect()
+                raise
+            except OSError as e:
+                # SMTPException is an OSError too: disconnects, network errors
+                # and 4xx replies are retried on a fresh connection
+                if _permanent(e):
+                    # The server refused this message, keep the session for the next
+                    if self._server is not None:
+                        self._reset(self._server)
+                    raise
+                self._disconnect()
+                if attempt >= job.max_retries:
+                    raise
+                time.sleep(2 ** attempt)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                self._disconnect()
+                return
+            try:
+                start = time.perf_counter()
+                result = self._process(job)
+                if job.to is not None:
+                    telemetry.observe("email_send", time.perf_counter() - start)
+                    self.sent += 1
+                    self.latency_total += time.time() - job.created
+                job.future.set_result(result)
+            except Exception as e:
+                self.failed += 1
+                self.last_error = str(e)
+                job.future.set_exception(e)
+
+    def stats(self):
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "connections": self.connections,
+            "queue_depth": self.queue_depth(),
+            "avg_latency_ms": self.latency_total / self.sent * 1000 if self.sent else 0.0,
+            "last_error": self.last_error,
+        }
+
+    def stop(self, timeout=30.0):
+        """
+        Send what is queued, then close the connection
+        """
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
+        self._thread = None
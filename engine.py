@@ -0,0 +1,394 @@
+"""
+Multi-camera detection engine.
+
+One loaded YOLO model is shared by every camera. Each step gathers the
+freshest frame from every camera's FrameGrabber, runs a single batched
+model.predict() call over all of them and hands each result back to the
+camera it came from, together with that camera's own detection state.
+
+A camera may carry a MotionGate; frames it rejects skip the model and are
+handed to the handler with result=None. While a camera has fire detected
+its gate is bypassed.
+
+A camera may also carry a RoiTracker. While it is following fire, the
+camera's frames are inferred as padded crops at the tracker's smaller input
+size in a separate batch, with a full-frame pass at a lower rate; crop
+results are mapped back to full-frame coordinates before the handler sees
+them.
+
+A camera with a Tiler has its full-frame passes split into overlapping
+tiles inferred at native resolution in one batch and merged with cross-tile
+NMS, so small, distant fires are not lost to letterboxing.
+
+A camera with a RegionMask is inferred on the bounding box of its active
+region only, with excluded pixels zeroed; results are mapped back to
+full-frame coordinates the same way.
+
+A camera with an InferenceScheduler is only inferred on when it is due at
+its current rate; frames in between are handed on with result=None. When
+schedulers watch for sub-threshold fire confidence, the model runs at their
+lower watch_conf and results are filtered back to conf for the handler.
+
+Cameras that are unavailable or lost are reopened by their grabber's own
+thread with backoff; the engine keeps stepping the other cameras meanwhile.
+
+Frames travel as FrameSlot references from the camera's FramePool; the
+engine releases its reference once the camera's handler has returned.
+"""
+
+import time
+
+from annotation import detections_from_result
+from camera_probe import PROBE_TIMEOUT, open_capture
+from capture import FrameGrabber
+from roi_tracker import offset_result
+from telemetry import telemetry
+from tiling import predict_tiled
+
+
+class CameraState:
+    """
+    Per-camera detection, recording and alert state.
+    """
+
+    def __init__(self, name, source, grabber=None, camera_type="Camera", gate=None, recorder=None,
+                 tracker=None, scheduler=None, tiler=None, region=None):
+        self.name = name
+        self.source = source
+        self.camera_type = camera_type
+        self.grabber = grabber
+        self.gate = gate
+        self.recorder = recorder
+        self.tracker = tracker
+        self.scheduler = scheduler
+        self.tiler = tiler
+        self.region = region
+
+        self.fire_detected = False
+        self.last_email_time = 0
+        self.incident_id = None
+        self.peak_confidence = 0.0
+
+        self.frames_inferred = 0
+        self.frames_gated = 0
+        self.frames_cropped = 0
+        self.frames_throttled = 0
+
+    @property
+    def recording(self):
+        return self.recorder is not None and self.recorder.recording
+
+    def __repr__(self):
+        return f"CameraState({self.name!r}, fire_detected={self.fire_detected})"
+
+
+def open_camera(source, timeout=PROBE_TIMEOUT, **capture_args):
+    """
+    Open a webcam index or stream URL, returning None if it cannot be opened
+    """
+    return open_capture(source, timeout, **capture_args)
+
+
+def filter_result(result, conf):
+    """
+    Drop boxes below conf from a YOLO result
+    """
+    if result.boxes is None or not len(result.boxes):
+        return result
+    return result[result.boxes.conf >= conf]
+
+
+def fire_in_result(result, fire_class=0):
+    """
+    Return True if a YOLO result contains a box of the fire class
+    """
+    if result.boxes is not None and result.boxes.cls.numel() > 0:
+        classes = result.boxes.cls.cpu().numpy().astype(int)
+        return fire_class in classes
+    return False
+
+
+def fire_confidence(detections, fire_class=0):
+    """
+    Highest fire-class confidence in an (N, 6) detections array
+    """
+    if detections is None or not len(detections):
+        return 0.0
+    fire = detections[detections[:, 5].astype(int) == fire_class]
+    return float(fire[:, 4].max()) if len(fire) else 0.0
+
+
+def update_incident(state, fire_found, frame_time, confidence=0.0):
+    """
+    Track the start and end of a camera's fire incident from an inferred
+    frame. Returns "started" or "ended" when the incident changed, else None.
+    """
+    if fire_found:
+        state.peak_confidence = max(state.peak_confidence, confidence)
+        if not state.fire_detected:
+            state.fire_detected = True
+            state.incident_id = f"{state.name}-{int(frame_time)}"
+            state.peak_confidence = confidence
+            return "started"
+    elif state.fire_detected:
+        state.fire_detected = False
+        return "ended"
+    return None
+
+
+def process_result(state, result, slot, frame_time):
+    """
+    Feed a camera's frame to its recorder and update its incident from the
+    result. Returns (detections, change) with change from update_incident().
+    """
+    # result is None when the motion gate or the scheduler skipped the model
+    # for this frame: no new evidence, the camera's fire state is kept
+    fire_found = result is not None and fire_in_result(result)
+    detections = detections_from_result(result) if result is not None else None
+
+    # The recorder keeps the pre-roll and writes clips on its own thread,
+    # drawing the detections only on frames that end up in a clip
+    if state.recorder is not None:
+        state.recorder.add_frame(slot, frame_time, fire_found, detections)
+
+    if result is None:
+        return None, None
+    return detections, update_incident(state, fire_found, frame_time, fire_confidence(detections))
+
+
+class DetectionEngine:
+    """
+    Run one batched model.predict() per step across all cameras.
+
+    on_result(state, result, slot, frame_time) is called for every camera
+    that delivered a frame in the step; result is None when the camera's
+    gate skipped the model for that frame. The handler must acquire() the slot
+    if it keeps it beyond the call.
+    """
+
+    def __init__(self, model, cameras, on_result, conf=0.6, read_timeout=1.0, reconnect_backoff=1.0,
+                 max_reconnect_backoff=60.0, capture_args=None, imgsz=None, max_batch=None):
+        self.model = model
+        self.cameras = list(cameras)
+        self.on_result = on_result
+        self.conf = conf
+        self.read_timeout = read_timeout
+        self.reconnect_backoff = reconnect_backoff
+        self.max_reconnect_backoff = max_reconnect_backoff
+        self.capture_args = capture_args or {}
+        # Full-frame input size and frames per predict() call (None: model default, all at once)
+        self.imgsz = imgsz
+        self.max_batch = max_batch
+        # Confidence the model runs at; lower when schedulers watch for rising fire
+        self.predict_conf = min([conf] + [state.scheduler.watch_conf for state in self.cameras
+                                          if state.scheduler is not None])
+
+        self.batches = 0
+        self.frames_inferred = 0
+        self.frames_gated = 0
+        self.frames_cropped = 0
+        self.frames_throttled = 0
+        # Rolling per-frame inference cost, used to credit gate skips
+        self.avg_frame_time = 0.0
+
+    def start(self):
+        """
+        Start a grabber for every camera. Cameras that are not available yet
+        are opened, and lost cameras reopened, on their grabber's thread.
+        """
+        for state in self.cameras:
+            if state.recorder is not None:
+                state.recorder.start()
+            if state.grabber is None:
+                state.grabber = FrameGrabber(None, name=state.name)
+            grabber = state.grabber
+            if grabber.opener is None:
+                grabber.opener = lambda source=state.source: open_camera(source, **self.capture_args)
+            grabber.backoff = self.reconnect_backoff
+            grabber.max_backoff = self.max_reconnect_backoff
+            grabber.start()
+        return self
+
+    def gather(self):
+        """
+        Collect the latest frame from every live camera.
+        Returns a list of (state, slot, frame_time).
+        """
+        live = []
+        for state in self.cameras:
+            # Reconnecting cameras are skipped, not waited for
+            if state.grabber is not None and state.grabber.live:
+                state.grabber.request()
+                live.append(state)
+
+        batch = []
+        for state in live:
+            ret, slot, frame_time = state.grabber.read(timeout=self.read_timeout)
+            if ret:
+                batch.append((state, slot, frame_time))
+        return batch
+
+    def _should_infer(self, state, slot, frame_time):
+        if state.scheduler is not None and not state.scheduler.due(frame_time):
+            state.frames_throttled += 1
+            self.frames_throttled += 1
+            return False
+        if state.gate is None:
+            return True
+        if state.fire_detected:
+            state.gate.mark_inference()
+            return True
+        with telemetry.timer("gate", camera=state.name):
+            run = state.gate.check(slot.array)
+        if run:
+            return True
+        state.gate.credit_skip(self.avg_frame_time)
+        state.frames_gated += 1
+        self.frames_gated += 1
+        return False
+
+    def step(self):
+        """
+        Run one batched inference over all cameras and route the results.
+        Returns the number of frames inferred.
+        """
+        start = time.perf_counter()
+        batch = self.gather()
+        telemetry.observe("capture_wait", time.perf_counter() - start)
+        if not batch:
+            time.sleep(0.01)
+            return 0
+
+        try:
+            to_infer = []
+            for item in batch:
+                if self._should_infer(*item):
+                    to_infer.append(item)
+                else:
+                    self._dispatch(item, None)
+
+            full, tiled, crops = [], {}, {}
+            for item in to_infer:
+                state, slot, frame_time = item
+                roi = state.tracker.plan(slot.shape, frame_time) if state.tracker is not None else None
+                image, offset = self._input(state, slot, roi)
+                if roi is None:
+                    if state.tiler is not None and state.tiler.applies(image.shape):
+                        tiled.setdefault(state.tiler, []).append((item, image, offset))
+                    else:
+                        full.append((item, image, offset))
+                else:
+                    crops.setdefault(state.tracker.crop_imgsz, []).append((item, image, offset, roi))
+
+            if full:
+                results, elapsed = self._predict([image for _, image, _ in full], mode="full")
+                for (item, _, offset), result in zip(full, results):
+                    self._finish(item, self._to_frame(item, result, offset), elapsed)
+
+            for tiler, group in tiled.items():
+                start = time.perf_counter()
+                results = predict_tiled(self.model, [image for _, image, _ in group], tiler,
+                                        conf=self.predict_conf)
+                elapsed = time.perf_counter() - start
+                telemetry.observe("inference", elapsed, mode="tiled")
+                self.batches += 1
+                self.frames_inferred += len(group)
+                for (item, _, offset), result in zip(group, results):
+                    self._finish(item, self._to_frame(item, result, offset), elapsed)
+
+            for imgsz, group in crops.items():
+                results, elapsed = self._predict([image for _, image, _, _ in group], mode="roi", imgsz=imgsz)
+                for (item, _, offset, roi), result in zip(group, results):
+                    self._finish(item, self._to_frame(item, result, offset), elapsed, roi)
+        finally:
+            for _, slot, _ in batch:
+                slot.release()
+        return len(to_infer)
+
+    def _input(self, state, slot, roi=None):
+        """
+        Image to infer on for a camera's frame and its (x, y) offset in the
+        frame, or None when it is the whole frame
+        """
+        if state.region is not None:
+            with telemetry.timer("region", camera=state.name):
+                return state.region.apply(slot.array, roi)
+        if roi is None:
+            return slot.array, None
+        x1, y1, x2, y2 = roi
+        return slot.array[y1:y2, x1:x2], (x1, y1)
+
+    def _to_frame(self, item, result, offset):
+        # Results on a crop or masked copy are rebuilt on the full frame
+        return result if offset is None else offset_result(result, item[1].array, offset)
+
+    def _predict(self, frames, mode="full", imgsz=None):
+        imgsz = imgsz or self.imgsz
+        kwargs = {"imgsz": imgsz} if imgsz else {}
+        size = self.max_batch or len(frames)
+        start = time.perf_counter()
+        results = []
+        for i in range(0, len(frames), size):
+            results.extend(self.model.predict(source=frames[i:i + size], conf=self.predict_conf, verbose=False,
+                                              **kwargs))
+        elapsed = time.perf_counter() - start
+        telemetry.observe("inference", elapsed, mode=mode)
+        if mode == "full":
+            # Only full-frame passes set the cost credited to gate skips
+            per_frame = elapsed / len(frames)
+            self.avg_frame_time = per_frame if not self.avg_frame_time else 0.9 * self.avg_frame_time + 0.1 * per_frame
+        self.batches += -(-len(frames) // size)
+        self.frames_inferred += len(frames)
+        return results, elapsed
+
+    def _finish(self, item, result, elapsed, roi=None):
+        state, _, frame_time = item
+        state.frames_inferred += 1
+        if roi is not None:
+            state.frames_cropped += 1
+            self.frames_cropped += 1
+        if state.scheduler is not None:
+            state.scheduler.observe(frame_time, elapsed, detections_from_result(result), state.fire_detected)
+        if self.predict_conf < self.conf:
+            result = filter_result(result, self.conf)
+        if state.tracker is not None:
+            state.tracker.update(detections_from_result(result), frame_time, roi)
+        self._dispatch(item, result)
+
+    def _dispatch(self, item, result):
+        state, slot, frame_time = item
+        try:
+            with telemetry.timer("handle", camera=state.name):
+                self.on_result(state, result, slot, frame_time)
+        except Exception as e:
+            print(f"❌ [{state.name}] Error processing frame: {str(e)}")
+
+    def print_stats(self):
+        avg_batch = self.frames_inferred / self.batches if self.batches else 0.0
+        print(f"📊 Engine: {self.batches} batches, {self.frames_inferred} frames inferred "
+              f"(avg batch {avg_batch:.1f}, {self.frames_cropped} as crops), "
+              f"{self.frames_gated} frames skipped by gates, {self.frames_throttled} throttled")
+        for state in self.cameras:
+            if state.grabber is not None:
+                state.grabber.print_stats()
+            if state.gate is not None:
+                state.gate.print_stats(state.name)
+            if state.region is not None:
+                state.region.print_stats(state.name)
+            if state.tracker is not None:
+                state.tracker.print_stats(state.name)
+            if state.scheduler is not None:
+                state.scheduler.print_stats(state.name)
+            if state.recorder is not None:
+                r = state.recorder.stats()
+                print(f"📊 [{state.name}] recorder: {r['clips_written']} clips, {r['frames_written']} frames "
+                      f"written at {r['fps']:.1f} fps, {r['frames_dropped']} dropped, pre-roll "
+                      f"{r['pre_roll_seconds']:.0f}s in {r['pre_roll_bytes'] / 1024 / 1024:.1f}MB")
+
+    def stop(self):
+        for state in self.cameras:
+            if state.grabber is not None:
+                state.grabber.stop()
+                state.grabber = None
+            if state.recorder is not None:
+                state.recorder.stop()
@@ -0,0 +1,305 @@
+"""
+Persistent fire incident log.
+
+Incidents and alert deliveries are kept in a SQLite database in WAL mode.
+The detection loop only puts small records on a queue; a writer thread
+applies them in batches, one transaction per batch, so a slow disk never
+stalls inference. Queries open their own connection and, thanks to WAL,
+read concurrently with the writer.
+
+    incidents   id, camera, start, end, peak_confidence, clip_paths
+    deliveries  incident_id, channel, sent_at, ok, latency, attempts, error
+
+Incidents older than retention_days (and beyond max_incidents) are pruned
+hourly and the freed pages are returned to the file system, so the
+database does not grow without bound on a long-running device.
+
+    python event_store.py --camera camera_1 --since 24
+"""
+
+import argparse
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS incidents (
+    id TEXT PRIMARY KEY,
+    camera TEXT NOT NULL,
+    start REAL NOT NULL,
+    end REAL,
+    peak_confidence REAL NOT NULL DEFAULT 0,
+    clip_paths TEXT
+);
+CREATE INDEX IF NOT EXISTS incidents_camera_start ON incidents (camera, start);
+CREATE INDEX IF NOT EXISTS incidents_start ON incidents (start);
+CREATE TABLE IF NOT EXISTS deliveries (
+    incident_id TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    sent_at REAL NOT NULL,
+    ok INTEGER NOT NULL,
+    latency REAL,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS deliveries_incident ON deliveries (incident_id);
+"""
+
+_INCIDENT_QUERY = """
+SELECT i.id, i.camera, i.start, i.end, i.peak_confidence, i.clip_paths,
+       (SELECT GROUP_CONCAT(DISTINCT d.channel) FROM deliveries d WHERE d.incident_id = i.id AND d.ok),
+       (SELECT MIN(d.latency) FROM deliveries d WHERE d.incident_id = i.id AND d.ok),
+       (SELECT COUNT(*) FROM deliveries d WHERE d.incident_id = i.id AND NOT d.ok)
+FROM incidents i
+"""
+
+
+class EventStore:
+    """
+    SQLite incident store with a background batch writer.
+    """
+
+    def __init__(self, path="fire_events.db", retention_days=90, max_incidents=100000, flush_interval=1.0,
+                 batch_size=200, prune_interval=3600.0, queue_size=10000):
+        self.path = path
+        self.retention_days = retention_days
+        self.max_incidents = max_incidents
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.prune_interval = prune_interval
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._running = False
+        self._init_db()
+
+        # Statistics
+        self.records_written = 0
+        self.batches_written = 0
+        self.records_dropped = 0
+        self.incidents_pruned = 0
+        self.write_errors = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_db(self):
+        conn = sqlite3.connect(self.path, timeout=10.0)
+        try:
+            # Must be set before the first table exists to take effect
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="event-store", daemon=True)
+        self._thread.start()
+        return self
+
+    def _put(self, sql, params):
+        try:
+            self._queue.put_nowait((sql, params))
+        except queue.Full:
+            self.records_dropped += 1
+
+    # Recording (non-blocking, safe to call from any thread)
+
+    def incident_started(self, incident_id, camera, start, confidence=0.0):
+        self._put("INSERT OR IGNORE INTO incidents (id, camera, start, peak_confidence) VALUES (?, ?, ?, ?)",
+                  (incident_id, camera, start, confidence))
+
+    def incident_ended(self, incident_id, end, peak_confidence):
+        self._put("UPDATE incidents SET end = ?, peak_confidence = MAX(peak_confidence, ?) WHERE id = ?",
+                  (end, peak_confidence, incident_id))
+
+    def clip_recorded(self, camera, fire_start, path):
+        """
+        Attach a clip to the camera's incident that was active at fire_start
+        """
+        self._put("UPDATE incidents SET clip_paths = COALESCE(clip_paths || char(10), '') || ? WHERE id = "
+                  "(SELECT id FROM incidents WHERE camera = ? AND start <= ? ORDER BY start DESC LIMIT 1)",
+                  (path, camera, fire_start + 1.0))
+
+    def delivery(self, incident_id, channel, ok, latency=None, attempts=1, error=None, sent_at=None):
+        self._put("INSERT INTO deliveries (incident_id, channel, sent_at, ok, latency, attempts, error) "
+                  "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                  (incident_id, channel, time.time() if sent_at is None else sent_at, int(bool(ok)), latency,
+                   attempts, error))
+
+    # Writer thread
+
+    def _run(self):
+        conn = self._connect()
+        last_prune = 0.0
+        try:
+            while self._running or not self._queue.empty():
+                try:
+                    batch = [self._queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    batch = []
+                while batch and len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if batch:
+                    self._write(conn, batch)
+                if time.time() - last_prune >= self.prune_interval:
+                    self.prune(conn)
+                    last_prune = time.time()
+        finally:
+            conn.close()
+
+    def _write(self, conn, batch):
+        try:
+            with conn:
+                for sql, params in batch:
+                    conn.execute(sql, params)
+            self.records_written += len(batch)
+            self.batches_written += 1
+        except sqlite3.Error as e:
+            self.write_errors += 1
+            print(f"⚠️ Event store write failed ({len(batch)} records): {str(e)}")
+
+    def prune(self, conn=None, now=None):
+        """
+        Drop incidents past retention or beyond max_incidents, then give the
+        freed pages back and truncate the WAL
+        """
+        own = conn is None
+        conn = conn or self._connect()
+        cutoff = (now or time.time()) - self.retention_days * 86400
+        try:
+            with conn:
+                deleted = conn.execute("DELETE FROM incidents WHERE start < ?", (cutoff,)).rowcount
+                deleted += conn.execute(
+                    "DELETE FROM incidents WHERE id IN (SELECT id FROM incidents ORDER BY start DESC "
+                    "LIMIT -1 OFFSET ?)", (self.max_incidents,)).rowcount
+                conn.execute("DELETE FROM deliveries WHERE incident_id NOT IN (SELECT id FROM incidents)")
+            if deleted:
+                self.incidents_pruned += deleted
+                conn.execute("PRAGMA incremental_vacuum")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return deleted
+        except sqlite3.Error as e:
+            print(f"⚠️ Event store pruning failed: {str(e)}")
+            return 0
+        finally:
+            if own:
+                conn.close()
+
+    # Queries
+
+    def incidents(self, camera=None, since=None, until=None, limit=100):
+        """
+        Incidents, newest first, optionally for one camera and a start time
+        range, with the channels notified and the first delivery latency
+        """
+        where, params = [], []
+        if camera is not None:
+            where.append("i.camera = ?")
+            params.append(camera)
+        if since is not None:
+            where.append("i.start >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("i.start < ?")
+            params.append(until)
+        sql = _INCIDENT_QUERY + (" WHERE " + " AND ".join(where) if where else "")
+        sql += " ORDER BY i.start DESC LIMIT ?"
+        params.append(limit)
+
+        conn = sqlite3.connect(self.path, timeout=10.0)
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        return [{
+            "id": row[0],
+            "camera": row[1],
+            "start": row[2],
+            "end": row[3],
+            "peak_confidence": row[4],
+            "clips": row[5].split("\n") if row[5] else [],
+            "channels": sorted(row[6].split(",")) if row[6] else [],
+            "first_alert_latency": row[7],
+            "failed_deliveries": row[8],
+        } for row in rows]
+
+    def deliveries(self, incident_id):
+        conn = sqlite3.connect(self.path, timeout=10.0)
+        try:
+            rows = conn.execute("SELECT channel, sent_at, ok, latency, attempts, error FROM deliveries "
+                                "WHERE incident_id = ? ORDER BY sent_at", (incident_id,)).fetchall()
+        finally:
+            conn.close()
+        return [{"channel": row[0], "sent_at": row[1], "ok": bool(row[2]), "latency": row[3],
+                 "attempts": row[4], "error": row[5]} for row in rows]
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "records_written": self.records_written,
+            "batches_written": self.batches_written,
+            "records_dropped": self.records_dropped,
+            "incidents_pruned": self.incidents_pruned,
+            "write_errors": self.write_errors,
+        }
+
+    def print_stats(self):
+        s = self.stats()
+        print(f"📊 Event store: {s['records_written']} records in {s['batches_written']} batches, "
+              f"queue {s['queue_depth']}, dropped {s['records_dropped']}, pruned {s['incidents_pruned']}")
+
+    def stop(self, timeout=5.0):
+        """
+        Flush queued records and stop the writer
+        """
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+
+def _format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S") if timestamp else "-"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List recorded fire incidents")
+    parser.add_argument("--db", default="fire_events.db")
+    parser.add_argument("--camera")
+    parser.add_argument("--since", type=float, help="hours back from now")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--prune", action="store_true", help="apply retention and compact the database")
+    parser.add_argument("--retention-days", type=float, default=90)
+    args = parser.parse_args(argv)
+
+    store = EventStore(args.db, retention_days=args.retention_days)
+    if args.prune:
+        print(f"🧹 Pruned {store.prune()} incident(s)")
+    since = time.time() - args.since * 3600 if args.since else None
+    for incident in store.incidents(args.camera, since=since, limit=args.limit):
+        duration = incident["end"] - incident["start"] if incident["end"] else None
+        latency = incident["first_alert_latency"]
+        print(f"🔥 {_format_time(incident['start'])} [{incident['camera']}] "
+              f"{f'{duration:.0f}s' if duration is not None else 'ongoing'}, "
+              f"peak {incident['peak_confidence']:.2f}, "
+              f"alerts: {', '.join(incident['channels']) or 'none'}"
+              + (f" (first after {latency:.1f}s)" if latency is not None else "")
+              + (f", {incident['failed_deliveries']} failed" if incident["failed_deliveries"] else "")
+              + "".join(f"\n   🎞️ {path}" for path in incident["clips"]))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
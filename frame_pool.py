@@ -0,0 +1,165 @@
+"""
+Preallocated frame buffers for the capture -> detect -> record path.
+
+A FramePool owns one contiguous NumPy block split into fixed-size frame
+slots. Cameras decode straight into a free slot (cap.retrieve(image=...)),
+and the detector, the annotator and the recorder share that slot by
+reference count instead of copying the frame. A slot goes back to the pool
+when its last reference is released.
+"""
+
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class FrameSlot:
+    """
+    One frame buffer borrowed from a FramePool.
+    """
+
+    __slots__ = ("pool", "index", "array", "timestamp", "refcount")
+
+    def __init__(self, pool, index, array):
+        self.pool = pool
+        self.index = index
+        self.array = array
+        self.timestamp = 0.0
+        self.refcount = 0
+
+    @property
+    def shape(self):
+        return self.array.shape
+
+    def acquire(self):
+        """
+        Take another reference to this slot and return it
+        """
+        self.pool._acquire(self)
+        return self
+
+    def release(self):
+        """
+        Drop one reference, returning the slot to the pool at zero
+        """
+        self.pool._release(self)
+
+    def __repr__(self):
+        return f"FrameSlot(index={self.index}, refcount={self.refcount})"
+
+
+class FramePool:
+    """
+    Fixed-size ring of reusable frame buffers.
+
+    The frame shape is taken from the first frame unless given up front. If
+    a camera changes resolution the pool reallocates; slots still held from
+    the old block stay valid until they are released.
+    """
+
+    def __init__(self, size=32, shape=None, dtype=np.uint8, name="pool"):
+        self.size = size
+        self.dtype = dtype
+        self.name = name
+        self.shape = None
+
+        self._lock = threading.Lock()
+        self._storage = None
+        self._slots = []
+        self._free = deque()
+
+        # Statistics
+        self.frames_acquired = 0
+        self.copies = 0
+        self.overflow_allocations = 0
+        self.reallocations = 0
+
+        if shape is not None:
+            self.configure(shape)
+
+    def configure(self, shape):
+        """
+        (Re)allocate the pool for frames of the given shape
+        """
+        shape = tuple(shape)
+        with self._lock:
+            if shape == self.shape:
+                return
+            if self.shape is not None:
+                self.reallocations += 1
+            self.shape = shape
+            self._storage = np.empty((self.size,) + shape, dtype=self.dtype)
+            self._slots = [FrameSlot(self, i, self._storage[i]) for i in range(self.size)]
+            self._free = deque(self._slots)
+
+    def get(self):
+        """
+        Borrow a free slot with a reference count of one.
+        When every slot is in use a one-off buffer is allocated instead, so a
+        slow consumer never stalls capture.
+        """
+        if self.shape is None:
+            raise ValueError("FramePool shape is not configured yet")
+        with self._lock:
+            if self._free:
+                slot = self._free.popleft()
+            else:
+                self.overflow_allocations += 1
+                slot = FrameSlot(self, -1, np.empty(self.shape, dtype=self.dtype))
+            slot.refcount = 1
+            self.frames_acquired += 1
+        return slot
+
+    def from_array(self, frame, timestamp=0.0):
+        """
+        Copy an externally allocated frame into a slot
+        """
+        if self.shape != frame.shape:
+            self.configure(frame.shape)
+        slot = self.get()
+        np.copyto(slot.array, frame)
+        slot.timestamp = timestamp
+        with self._lock:
+            self.copies += 1
+        return slot
+
+    def _acquire(self, slot):
+        with self._lock:
+            slot.refcount += 1
+
+    def _release(self, slot):
+        with self._lock:
+            slot.refcount -= 1
+            if slot.refcount > 0:
+                return
+            slot.refcount = 0
+            # Only slots of the current block go back; overflow and
+            # pre-reallocation buffers are left to the garbage collector
+            if 0 <= slot.index < len(self._slots) and self._slots[slot.index] is slot:
+                self._free.append(slot)
+
+    def stats(self):
+        """
+        Return occupancy and copy statistics
+        """
+        with self._lock:
+            in_use = len(self._slots) - len(self._free)
+            return {
+                "pool": self.name,
+                "size": self.size,
+                "in_use": in_use,
+                "occupancy": in_use / self.size if self.size else 0.0,
+                "frames_acquired": self.frames_acquired,
+                "copies": self.copies,
+                "overflow_allocations": self.overflow_allocations,
+                "reallocations": self.reallocations,
+                "bytes": self._storage.nbytes if self._storage is not None else 0,
+            }
+
+    def print_stats(self):
+        s = self.stats()
+        print(f"📊 [{s['pool']}] slots in use: {s['in_use']}/{s['size']} ({s['occupancy']*100:.0f}%), "
+              f"copies: {s['copies']}, overflow allocations: {s['overflow_allocations']}, "
+              f"memory: {s['bytes']/1024/1024:.1f}MB")
+
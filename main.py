@@ -1,18 +1,35 @@
-from ultralytics import YOLO
+import argparse
 import cv2
-import threading
+import signal
+import sys
 import time
-import requests
 import pywhatkit as pwk
 from datetime import datetime
-from twilio.rest import Client
 import os
 import numpy as np
 from pathlib import Path
 import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.application import MIMEApplication
+from capture import FrameGrabber
+from camera_probe import candidate_urls, make_opener, probe_camera
+from engine import CameraState, DetectionEngine, fire_confidence, process_result, update_incident
+from motion_gate import MotionGate
+from alerts import Alert, AlertDispatcher, FunctionChannel, TelegramChannel, TwilioChannel
+from alert_media import AlertMediaBuilder
+from email_transport import EmailJob, EmailTransport
+from event_store import EventStore
+from recorder import ClipRecorder
+from model_cache import load_cached, run_in_background, startup_cache_key, store_cached
+from benchmark import benchmark_inference, load_sample_frames
+from telemetry import telemetry
+from backends import load_model
+from autotune import apply_config, load_tuned_config
+from preview import PreviewServer
+from region_mask import RegionMask
+from roi_tracker import RoiTracker
+from scheduler import InferenceScheduler
+from tiling import Tiler
+from batch_process import collect_videos, process_videos
+from sharding import SHARD_CHILD_ENV, ShardSupervisor
 
 """
 Why Roboflow for Fire Detection?
@@ -50,14 +67,201 @@ EMAIL_PASSWORD = ""
 EMAIL_RECEIVER = ""
 EMAIL_SUBJECT = "🚨 Fire Detection Alert!"
 
+EMAIL_COOLDOWN = 60  # minimum seconds between email alerts per camera
+SMTP_HOST = "smtp.gmail.com"
+SMTP_PORT = 587
+SMTP_USE_TLS = True
+SMTP_IDLE_TIMEOUT = 240  # reconnect when the connection sat idle longer than this
+
 # Video Recording Configuration
-RECORD_DURATION = 10  # seconds to record after fire detection
+RECORD_DURATION = 10  # seconds to keep recording after the last fire detection
+PRE_ROLL_SECONDS = 30  # seconds of footage kept from before the fire was detected
+PRE_ROLL_MAX_MB = 64  # per camera cap on the compressed pre-roll
+PRE_ROLL_FPS = 5  # pre-roll frames kept per second
+PRE_ROLL_QUALITY = 80  # JPEG quality of pre-roll frames
+MAX_CLIP_DURATION = 60  # long incidents are split into clips of this many seconds of fire
 VIDEO_OUTPUT_DIR = "fire_recordings"
+BATCH_SCAN_STRIDE = 5  # batch mode infers every Nth frame of recorded videos
+BATCH_SCAN_SIZE = 8
 if not os.path.exists(VIDEO_OUTPUT_DIR):
     os.makedirs(VIDEO_OUTPUT_DIR)
 
-# Load your trained model
-model = YOLO("best.pt")
+# Camera Configuration
+# Webcam indexes and stream URLs used by "Multiple cameras" mode, e.g.
+# [0, "http://192.168.1.21:8080/video"]. Asked for at startup when empty.
+CAMERA_SOURCES = []
+# Unattended start (systemd, no terminal): RUN_MODE starts "webcam",
+# "cameras" (CAMERA_SOURCES) or "scan" (batch mode on VIDEO_OUTPUT_DIR)
+# without the menu. No prompt is shown then and a failed email check is
+# only a warning. The same from the command line, e.g.
+#     python main.py --headless --cameras 0,http://192.168.1.21:8080/video
+RUN_MODE = None
+RUN_MODES = {"webcam": "1", "cameras": "7", "scan": "8"}
+STATS_INTERVAL = 30  # seconds between capture/engine statistics reports
+CAMERA_PROBE_TIMEOUT = 5.0  # seconds each IP camera URL may take to deliver a frame
+
+# HTTP MJPEG cameras (IP Webcam, DroidCam) are read natively so frames the
+# detector skips are never decoded; MJPEG_DECODE_REDUCE = 2, 4 or 8 decodes
+# at 1/2, 1/4 or 1/8 scale in the JPEG decoder itself
+NATIVE_MJPEG = True
+MJPEG_DECODE_REDUCE = 1
+CAPTURE_ARGS = {"native_mjpeg": NATIVE_MJPEG, "mjpeg_reduce": MJPEG_DECODE_REDUCE}
+
+# Process sharding for "Multiple cameras" mode on many-core hosts: each
+# camera is captured in its own process, cameras are split across
+# SHARD_WORKERS inference processes (0 = one per SHARD_THREADS_PER_WORKER
+# cores) and clips are recorded in a separate process. Frames move through
+# shared memory rings of SHARD_RING_SLOTS frames of at most SHARD_MAX_FRAME_SIZE.
+SHARDING_ENABLED = False
+SHARD_WORKERS = 0
+SHARD_THREADS_PER_WORKER = 2
+SHARD_RING_SLOTS = 32
+SHARD_MAX_FRAME_SIZE = (1280, 720)
+
+# Motion/colour pre-filter: only run the model when something moving and
+# fire- or smoke-coloured is in view, plus a forced pass every
+# force_interval seconds. Per-camera overrides are keyed by camera name,
+# e.g. {"camera_2": {"enabled": False}, "webcam": {"force_interval": 2}}.
+MOTION_GATE_SETTINGS = {
+    "enabled": False,
+    "scale_width": 160,
+    "motion_threshold": 25,
+    "force_interval": 5.0,
+}
+MOTION_GATE_OVERRIDES = {}
+
+# Static inference regions per camera name: the model only sees the
+# bounding box of the region, with excluded areas (sky, road, sun glare)
+# blacked out. Coordinates are frame pixels, or fractions of the frame size
+# with "normalized": True, e.g.
+# {"camera_1": {"crop": (0, 180, 1280, 720),
+#               "exclude": [[(1000, 180), (1280, 180), (1280, 400)]]},
+#  "webcam": {"include": [[(0.1, 0.3), (0.9, 0.3), (0.9, 1.0), (0.1, 1.0)]], "normalized": True}}
+REGION_MASKS = {}
+
+# ROI tracking: after a fire detection, follow the fire boxes and run the
+# model on a padded crop around them at crop_imgsz, with a full-frame pass
+# every full_frame_interval seconds to catch new ignition points.
+ROI_TRACKING_SETTINGS = {
+    "enabled": False,
+    "padding": 0.5,  # crop margin as a fraction of the tracked region size
+    "min_size": 256,
+    "crop_imgsz": 320,
+    "full_frame_interval": 1.0,
+}
+
+# Tiled inference for high-resolution feeds: frames larger than tile_size
+# are split into overlapping tiles inferred at native resolution in one
+# batch (plus a coarse full-frame pass if full_frame) and merged with NMS.
+# Catches small, distant fires at several times the inference cost; see
+# python benchmark.py --tiling for the trade-off on your model.
+TILING_SETTINGS = {
+    "enabled": False,
+    "tile_size": 640,
+    "overlap": 0.2,
+    "full_frame": True,
+}
+
+# Adaptive inference rate per camera: idle_rate inferences per second when
+# no fire was seen for idle_after seconds, active_rate while fire is detected
+# or its confidence is rising above watch_conf, backing off automatically
+# when measured inference latency exceeds the frame budget.
+SCHEDULER_SETTINGS = {
+    "enabled": False,
+    "idle_rate": 1.0,
+    "active_rate": 10.0,
+    "idle_after": 30.0,
+    "watch_conf": 0.25,
+}
+
+# Metrics: per-stage latency histograms, per-camera frame counters and
+# queue depths. Served in Prometheus text format on METRICS_HOST:METRICS_PORT
+# and/or printed as a JSON line every METRICS_LOG_INTERVAL seconds (0 = off).
+METRICS_ENABLED = False
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+METRICS_LOG_INTERVAL = 0
+
+# Display Configuration
+# HEADLESS runs without any OpenCV window or per-frame annotation (stop with
+# Ctrl+C); boxes are then only drawn on frames saved to alert clips. The
+# optional preview serves a downscaled MJPEG stream of every camera on
+# http://PREVIEW_HOST:PREVIEW_PORT/, rendered PREVIEW_FPS times per second.
+HEADLESS = False
+PREVIEW_ENABLED = False
+PREVIEW_HOST = "127.0.0.1"
+PREVIEW_PORT = 8090
+PREVIEW_FPS = 2
+PREVIEW_WIDTH = 480
+
+# Model Configuration
+MODEL_PATH = "best.pt"
+DATA_PATH = "data.yaml"  # optional, enables mAP/precision/recall evaluation
+
+# Startup evaluation and speed benchmark results are cached in this file,
+# keyed by the model, dataset and hardware. On a cache miss they are rerun
+# either "foreground" (before detection starts) or "background" (in a
+# separate low-priority process after detection has started).
+MODEL_CACHE_PATH = ".model_cache.json"
+BENCHMARK_IMAGES = ["fire.33.png", "non_fire.png"]  # real content for the speed check
+STARTUP_CHECKS_MODE = "background"
+
+# Inference backend: "pytorch" runs best.pt directly; "onnx" (ONNX Runtime)
+# and "openvino" export it once to .model_exports/ and are usually much
+# faster on CPU-only hosts. MODEL_INT8 adds post-training INT8 quantization
+# calibrated on MODEL_CALIBRATION_IMAGES. Check the accuracy cost first with
+#   python backends.py parity --backend onnx --int8
+INFERENCE_BACKEND = "pytorch"
+MODEL_INT8 = False
+MODEL_IMGSZ = 640
+MODEL_CALIBRATION_IMAGES = ["fire.33.png", "non_fire.png"]
+INFERENCE_BATCH = 0  # max frames per predict() call, 0 = all cameras in one call
+
+# CPU autotuning: python autotune.py sweeps torch/OpenCV threads, imgsz and
+# batch size on this machine and stores the best configuration under the
+# model hash and hardware. When one is found it replaces the defaults above.
+AUTOTUNE_ENABLED = True
+AUTOTUNE_PATH = ".autotune.json"
+
+def apply_autotune():
+    """
+    Apply the stored autotune configuration for this model and machine
+    """
+    global MODEL_IMGSZ, INFERENCE_BATCH
+    config = load_tuned_config(MODEL_PATH, INFERENCE_BACKEND, MODEL_INT8, AUTOTUNE_PATH)
+    if config is None:
+        print("ℹ️ No autotune configuration for this model and machine (python autotune.py)")
+        return None
+    apply_config(config)
+    MODEL_IMGSZ = config["imgsz"]
+    INFERENCE_BATCH = config["batch"]
+    print(f"⚙️ Autotuned: imgsz {config['imgsz']}, batch {config['batch']}, "
+          f"threads {config['intra_threads']}/{config['interop_threads']}, opencv {config['opencv_threads']}")
+    return config
+
+def load_inference_model():
+    """
+    Load the model on INFERENCE_BACKEND, falling back to PyTorch if the
+    export or the backend runtime is not available
+    """
+    try:
+        return load_model(MODEL_PATH, INFERENCE_BACKEND, imgsz=MODEL_IMGSZ, int8=MODEL_INT8,
+                          calibration_images=MODEL_CALIBRATION_IMAGES)
+    except Exception as e:
+        if INFERENCE_BACKEND == "pytorch":
+            raise
+        print(f"⚠️ {INFERENCE_BACKEND} backend unavailable ({str(e)}), using PyTorch")
+        return load_model(MODEL_PATH)
+
+def backend_name():
+    if INFERENCE_BACKEND == "pytorch":
+        return "pytorch"
+    return f"{INFERENCE_BACKEND}-{'int8' if MODEL_INT8 else 'fp32'}-{MODEL_IMGSZ}"
+
+# Load your trained model (shard processes load their own when they need one)
+if AUTOTUNE_ENABLED and not os.environ.get(SHARD_CHILD_ENV):
+    apply_autotune()
+model = None if os.environ.get(SHARD_CHILD_ENV) else load_inference_model()
 
 # WhatsApp Configuration
 WHATSAPP_NUMBER = ""  
@@ -65,6 +269,43 @@ WHATSAPP_NUMBER = ""
 
 TELEGRAM_BOT_TOKEN = ""
 TELEGRAM_CHAT_ID = ""
+TELEGRAM_API_URL = "https://api.telegram.org"
+
+# Twilio Configuration (voice call and SMS)
+TWILIO_ACCOUNT_SID = ""
+TWILIO_AUTH_TOKEN = ""
+TWILIO_PHONE_NUMBER = ""
+TWILIO_API_URL = None  # override to point at a local stub server
+
+# Alert Dispatch Configuration
+FIRE_ALERT_MESSAGE = "🚨🔥 Fire detected! Immediate action required!"
+ALERT_CHANNELS_ON_FIRE = ["alarm", "telegram"]  # channels notified when a fire starts
+ALERT_WORKERS = 4
+ALERT_QUEUE_SIZE = 100
+ALERT_TIMEOUT = 10  # seconds per delivery attempt
+ALERT_RETRIES = 3
+ALERT_BACKOFF = 1.0  # seconds, doubled on every retry
+ALERT_MIN_INTERVAL = {"call": 300, "sms": 60, "whatsapp": 120}  # per-channel rate limits
+
+# Alert media: every finished clip is turned once into a size-capped H.264
+# clip at reduced resolution and a JPEG snapshot of the peak-confidence
+# frame; email attaches the clip, these channels get the snapshot
+ALERT_MEDIA_DIR = os.path.join(VIDEO_OUTPUT_DIR, "alerts")
+ALERT_MEDIA_MAX_WIDTH = 640
+ALERT_MEDIA_MAX_FPS = 10
+ALERT_MEDIA_MAX_CLIP_MB = 8
+ALERT_MEDIA_RETENTION_MB = 512  # newest alert media kept in ALERT_MEDIA_DIR (0 = no limit)
+ALERT_MEDIA_RETENTION_DAYS = 7  # older alert media is deleted (0 = no limit)
+ALERT_CHANNELS_WITH_MEDIA = ["telegram"]
+
+# Incident log: SQLite database of incidents and alert deliveries
+# (python event_store.py lists them)
+EVENT_DB_PATH = "fire_events.db"
+EVENT_RETENTION_DAYS = 90
+EVENT_MAX_INCIDENTS = 100000
+# pywhatkit appends every WhatsApp message to this text file; deliveries are
+# in the incident log instead, so it is removed after each send
+PYWHATKIT_LOG = "PyWhatKit_DB.txt"
 
 # Alarm file path (must be a short .wav file)
 ALARM_PATH = "alarm.wav"
@@ -76,17 +317,18 @@ def evaluate_model_metrics():
     Evaluate the model's performance metrics if data.yaml is available
     """
     try:
-        if os.path.exists("data.yaml"):
-            results = model.val(data="data.yaml", 
+        if os.path.exists(DATA_PATH):
+            results = model.val(data=DATA_PATH, 
                               conf=0.6,
                               iou=0.5)
             
+            # Precision/recall/F1 are per class, report their mean
             metrics = {
-                "mAP50": results.box.map50,
-                "mAP50-95": results.box.map,
-                "Precision": results.box.p,
-                "Recall": results.box.r,
-                "F1-Score": results.box.f1
+                "mAP50": float(results.box.map50),
+                "mAP50-95": float(results.box.map),
+                "Precision": float(np.mean(results.box.p)),
+                "Recall": float(np.mean(results.box.r)),
+                "F1-Score": float(np.mean(results.box.f1))
             }
             
             print("\n=== Model Performance Metrics ===")
@@ -95,7 +337,7 @@ def evaluate_model_metrics():
                 
             return metrics
         else:
-            print("ℹ️ Skipping model evaluation - data.yaml not found")
+            print(f"ℹ️ Skipping model evaluation - {DATA_PATH} not found")
             return None
             
     except Exception as e:
@@ -105,65 +347,85 @@ def evaluate_model_metrics():
 def analyze_detection_speed():
     """
     Analyze the model's detection speed on the current hardware.
+    Uses the sample images with a warm-up; run benchmark.py for the full
+    per-stage suite.
     """
     try:
-        # Initialize timing list
-        inference_times = []
         num_trials = 100
         
-        # Create a dummy image for testing
-        test_image = np.zeros((640, 640, 3), dtype=np.uint8)
-        
         print("\n=== Speed Analysis ===")
         print(f"Running {num_trials} inference trials...")
         
-        # Run multiple trials
-        for _ in range(num_trials):
-            start_time = time.time()
-            model.predict(source=test_image, conf=0.6, verbose=False)
-            inference_times.append(time.time() - start_time)
+        frames = load_sample_frames(BENCHMARK_IMAGES)
+        report = benchmark_inference(model, frames, iterations=num_trials, warmup=10, conf=0.6)
+        latency = report["latency_ms"]
         
-        # Calculate statistics
-        avg_time = np.mean(inference_times)
-        std_time = np.std(inference_times)
-        fps = 1.0 / avg_time
-        
-        print(f"Average inference time: {avg_time*1000:.2f}ms (±{std_time*1000:.2f}ms)")
-        print(f"Frames per second: {fps:.2f}")
+        print(f"Average inference time: {latency['mean']:.2f}ms (±{latency['std']:.2f}ms)")
+        print(f"Latency p50/p95/p99: {latency['p50']:.2f}/{latency['p95']:.2f}/{latency['p99']:.2f}ms")
+        print(f"Frames per second: {report['throughput_fps']:.2f}")
         
         return {
-            "avg_inference_time": avg_time,
-            "std_inference_time": std_time,
-            "fps": fps
+            "avg_inference_time": latency["mean"] / 1000,
+            "std_inference_time": latency["std"] / 1000,
+            "p50_inference_time": latency["p50"] / 1000,
+            "p95_inference_time": latency["p95"] / 1000,
+            "p99_inference_time": latency["p99"] / 1000,
+            "fps": report["throughput_fps"]
         }
         
     except Exception as e:
         print(f"❌ Error during speed analysis: {str(e)}")
         return None
 
+def refresh_model_cache(cache_key):
+    """
+    Run the evaluation and speed benchmark and store them under cache_key
+    """
+    metrics = evaluate_model_metrics()
+    speed_metrics = analyze_detection_speed()
+    store_cached(MODEL_CACHE_PATH, cache_key, {"metrics": metrics, "speed": speed_metrics})
+    print("✅ Model evaluation cache updated")
+    return metrics, speed_metrics
+
+def run_startup_checks():
+    """
+    Load cached evaluation/speed results, or compute them if the model,
+    dataset or hardware changed. Returns (metrics, speed_metrics, pending_key)
+    where pending_key is the cache key still to be computed in the
+    background, or None.
+    """
+    cache_key = startup_cache_key(MODEL_PATH, DATA_PATH, backend=backend_name())
+    cached = load_cached(MODEL_CACHE_PATH, cache_key)
+    if cached is not None:
+        print(f"\n📦 Using cached model evaluation from "
+              f"{datetime.fromtimestamp(cached['created']).strftime('%Y-%m-%d %H:%M:%S')}")
+        for metric_name, value in (cached.get("metrics") or {}).items():
+            print(f"{metric_name}: {value:.4f}")
+        speed_metrics = cached.get("speed")
+        if speed_metrics:
+            print(f"Average inference time: {speed_metrics['avg_inference_time']*1000:.2f}ms "
+                  f"(±{speed_metrics['std_inference_time']*1000:.2f}ms), {speed_metrics['fps']:.2f} FPS")
+        return cached.get("metrics"), speed_metrics, None
+
+    if STARTUP_CHECKS_MODE == "foreground":
+        metrics, speed_metrics = refresh_model_cache(cache_key)
+        return metrics, speed_metrics, None
+
+    print("\nℹ️ Model evaluation not cached, it will run in the background")
+    return None, None, cache_key
+
 def make_voice_call():
     try:
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        
-        call = client.calls.create(
-            twiml='<Response><Say language="en">Emergency! Fire has been detected in your area. This is an automated alert. Please check immediately!</Say></Response>',
-            to=WHATSAPP_NUMBER,
-            from_=TWILIO_PHONE_NUMBER
-        )
-        print(f"✅ Emergency voice call initiated: {call.sid}")
+        sid = get_alert_dispatcher().channels["call"].send(Alert("manual", FIRE_ALERT_MESSAGE))
+        print(f"✅ Emergency voice call initiated: {sid}")
     except Exception as e:
         print(f"❌ Failed to make voice call: {str(e)}")
 
 def send_sms_alert():
     try:
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        
-        message = client.messages.create(
-            body="🚨 ALERT: Fire detected in your area! Please check immediately! 🔥",
-            from_=TWILIO_PHONE_NUMBER,
-            to=WHATSAPP_NUMBER
-        )
-        print(f"✅ Emergency SMS sent: {message.sid}")
+        sid = get_alert_dispatcher().channels["sms"].send(
+            Alert("manual", "🚨 ALERT: Fire detected in your area! Please check immediately! 🔥"))
+        print(f"✅ Emergency SMS sent: {sid}")
     except Exception as e:
         print(f"❌ Failed to send SMS: {str(e)}")
 
@@ -175,14 +437,9 @@ def play_alarm():
         print("🔇 Alarm Error:", str(e))
 
 def send_telegram_alert():
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    message = {"chat_id": TELEGRAM_CHAT_ID, "text": "🚨🔥 Fire detected! Immediate action required!"}
     try:
-        response = requests.post(url, data=message)
-        if response.status_code == 200:
-            print("✅ Telegram alert sent.")
-        else:
-            print("❌ Telegram failed:", response.text)
+        get_alert_dispatcher().channels["telegram"].send(Alert("manual", FIRE_ALERT_MESSAGE))
+        print("✅ Telegram alert sent.")
     except Exception as e:
         print("❌ Telegram exception:", e)
 
@@ -201,13 +458,119 @@ def send_whatsapp_alert():
                         message_time_min,
                         wait_time=15,
                         tab_close=True)
+        if os.path.exists(PYWHATKIT_LOG):
+            os.remove(PYWHATKIT_LOG)
         print("✅ WhatsApp alert scheduled.")
     except Exception as e:
         print("❌ WhatsApp alert error:", e)
 
+def build_alert_dispatcher():
+    """
+    Create the alert dispatcher with one persistent channel per service
+    """
+    def channel_options(name):
+        return {"timeout": ALERT_TIMEOUT, "max_retries": ALERT_RETRIES, "backoff": ALERT_BACKOFF,
+                "min_interval": ALERT_MIN_INTERVAL.get(name, 0)}
+
+    dispatcher = AlertDispatcher(workers=ALERT_WORKERS, queue_size=ALERT_QUEUE_SIZE,
+                                 on_delivery=record_alert_delivery)
+    # The alarm is local, a retry would only replay the sound
+    dispatcher.add_channel(FunctionChannel("alarm", play_alarm, max_retries=0))
+    dispatcher.add_channel(TelegramChannel(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, base_url=TELEGRAM_API_URL,
+                                           **channel_options("telegram")))
+    dispatcher.add_channel(TwilioChannel("sms", TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN,
+                                         TWILIO_PHONE_NUMBER, WHATSAPP_NUMBER, mode="sms",
+                                         base_url=TWILIO_API_URL, **channel_options("sms")))
+    dispatcher.add_channel(TwilioChannel("call", TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN,
+                                         TWILIO_PHONE_NUMBER, WHATSAPP_NUMBER, mode="call",
+                                         twiml='<Response><Say language="en">Emergency! Fire has been detected in your area. This is an automated alert. Please check immediately!</Say></Response>',
+                                         base_url=TWILIO_API_URL, **channel_options("call")))
+    dispatcher.add_channel(FunctionChannel("whatsapp", send_whatsapp_alert, max_retries=0,
+                                           min_interval=ALERT_MIN_INTERVAL.get("whatsapp", 0)))
+    return dispatcher
+
+def record_alert_delivery(name, alert, ok, latency, attempts, error):
+    """
+    Log an alert delivery outcome (runs on the alert workers)
+    """
+    get_event_store().delivery(alert.incident_id, name, ok, latency, attempts, error)
+
+_alert_dispatcher = None
+
+def get_alert_dispatcher():
+    """
+    Return the shared alert dispatcher, creating it on first use
+    """
+    global _alert_dispatcher
+    if _alert_dispatcher is None:
+        _alert_dispatcher = build_alert_dispatcher()
+    return _alert_dispatcher
+
+def build_email_transport():
+    """
+    Create the background email sender for the configured SMTP account
+    """
+    return EmailTransport(SMTP_HOST, SMTP_PORT, EMAIL_SENDER, EMAIL_PASSWORD,
+                          use_tls=SMTP_USE_TLS, idle_timeout=SMTP_IDLE_TIMEOUT)
+
+_email_transport = None
+
+def get_email_transport():
+    """
+    Return the shared email transport, starting it on first use
+    """
+    global _email_transport
+    if _email_transport is None:
+        _email_transport = build_email_transport().start()
+    return _email_transport
+
+_alert_media = None
+
+def get_alert_media():
+    """
+    Return the shared alert media builder, creating it on first use
+    """
+    global _alert_media
+    if _alert_media is None:
+        _alert_media = AlertMediaBuilder(ALERT_MEDIA_DIR, max_width=ALERT_MEDIA_MAX_WIDTH,
+                                         max_fps=ALERT_MEDIA_MAX_FPS,
+                                         max_clip_bytes=ALERT_MEDIA_MAX_CLIP_MB * 1024 * 1024,
+                                         max_total_bytes=ALERT_MEDIA_RETENTION_MB * 1024 * 1024,
+                                         max_age=ALERT_MEDIA_RETENTION_DAYS * 24 * 3600)
+    return _alert_media
+
+_event_store = None
+
+def get_event_store():
+    """
+    Return the shared incident log, starting its writer on first use
+    """
+    global _event_store
+    if _event_store is None:
+        _event_store = EventStore(EVENT_DB_PATH, retention_days=EVENT_RETENTION_DAYS,
+                                  max_incidents=EVENT_MAX_INCIDENTS).start()
+    return _event_store
+
+def report_email_result(camera_name, future, incident_id=None, created=None):
+    """
+    Print the outcome of a queued alert email (runs on the email thread)
+    """
+    error = future.exception()
+    if incident_id is not None:
+        latency = time.time() - created if error is None and created else None
+        get_event_store().delivery(incident_id, "email", error is None, latency,
+                                   error=str(error) if error is not None else None)
+    if error is None:
+        print(f"✅ [{camera_name}] Email alert sent successfully")
+    elif isinstance(error, smtplib.SMTPAuthenticationError):
+        print(f"❌ [{camera_name}] Gmail authentication failed: {str(error)}")
+    else:
+        print(f"❌ [{camera_name}] Error sending email: {str(error)}")
+
 def record_video(frame_queue, duration=RECORD_DURATION):
     """
-    Record video from the frame queue for specified duration
+    Record video from the frame queue for specified duration.
+    The queue may hold plain frames or pooled FrameSlots.
     """
     try:
         if not frame_queue:
@@ -219,7 +582,7 @@ def record_video(frame_queue, duration=RECORD_DURATION):
         output_path = os.path.join(VIDEO_OUTPUT_DIR, f"fire_detection_{timestamp}.mp4")
         
         # Get the first frame to determine video properties
-        first_frame = frame_queue[0]
+        first_frame = getattr(frame_queue[0], "array", frame_queue[0])
         height, width = first_frame.shape[:2]
         print(f"🎥 Frame size: {width}x{height}")
         
@@ -238,7 +601,7 @@ def record_video(frame_queue, duration=RECORD_DURATION):
                 print(f"⚠️ Skipping None frame at position {frames_written}")
                 continue
             try:
-                out.write(frame)
+                out.write(getattr(frame, "array", frame))
                 frames_written += 1
             except Exception as e:
                 print(f"❌ Error writing frame {frames_written}: {str(e)}")
@@ -276,12 +639,6 @@ def send_email_alert(video_path):
             print(f"❌ Video file not found: {video_path}")
             return
             
-        # Create message
-        msg = MIMEMultipart()
-        msg['From'] = EMAIL_SENDER
-        msg['To'] = EMAIL_RECEIVER
-        msg['Subject'] = EMAIL_SUBJECT
-        
         # Add body
         body = """
         🚨 FIRE DETECTION ALERT! 🔥
@@ -294,25 +651,10 @@ def send_email_alert(video_path):
         This is an automated message. Please take necessary action.
         """.format(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
         
-        msg.attach(MIMEText(body, 'plain'))
-        
-        print("📎 Attaching video file...")
-        # Attach video
-        with open(video_path, 'rb') as f:
-            video_attachment = MIMEApplication(f.read(), _subtype="mp4")
-            video_attachment.add_header('Content-Disposition', 'attachment', 
-                                     filename=os.path.basename(video_path))
-            msg.attach(video_attachment)
-        
-        print("🔒 Connecting to Gmail SMTP server...")
-        # Send email using Gmail's SMTP server
-        with smtplib.SMTP('smtp.gmail.com', 587) as server:
-            print("🔐 Starting TLS connection...")
-            server.starttls()
-            print("🔑 Attempting login...")
-            server.login(EMAIL_SENDER, EMAIL_PASSWORD)
-            print("📤 Sending email...")
-            server.send_message(msg)
+        print("📤 Sending email...")
+        # The video is base64-encoded and streamed to the server in chunks
+        get_email_transport().send(EmailJob(EMAIL_RECEIVER, EMAIL_SUBJECT, body,
+                                            attachment_path=video_path))
             
         print("✅ Email alert sent successfully")
         
@@ -361,12 +703,6 @@ def test_email_functionality():
     print(f"To: {EMAIL_RECEIVER}")
     
     try:
-        # Create message
-        msg = MIMEMultipart()
-        msg['From'] = EMAIL_SENDER
-        msg['To'] = EMAIL_RECEIVER
-        msg['Subject'] = "Test Email - Fire Detection System"
-        
         body = """
         This is a test email from your Fire Detection System.
         If you receive this email and can view the attached video, the email functionality is working correctly.
@@ -374,25 +710,10 @@ def test_email_functionality():
         Time of test: {}
         """.format(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
         
-        msg.attach(MIMEText(body, 'plain'))
-        
-        # Attach test video
-        print("📎 Attaching test video...")
-        with open(test_video_path, 'rb') as f:
-            video_attachment = MIMEApplication(f.read(), _subtype="mp4")
-            video_attachment.add_header('Content-Disposition', 'attachment', 
-                                     filename=os.path.basename(test_video_path))
-            msg.attach(video_attachment)
-        
-        # Send email
-        print("🔒 Connecting to Gmail SMTP server...")
-        with smtplib.SMTP('smtp.gmail.com', 587) as server:
-            print("🔐 Starting TLS connection...")
-            server.starttls()
-            print("🔑 Attempting login with provided credentials...")
-            server.login(EMAIL_SENDER, EMAIL_PASSWORD)
-            print("📤 Sending test email...")
-            server.send_message(msg)
+        # Send email with the test video attached
+        print("📤 Sending test email...")
+        get_email_transport().send(EmailJob(EMAIL_RECEIVER, "Test Email - Fire Detection System", body,
+                                            attachment_path=test_video_path))
             
         print("\n✅ Test email sent successfully!")
         print("Please check your inbox at:", EMAIL_RECEIVER)
@@ -432,14 +753,11 @@ def verify_email_settings():
     
     # Test SMTP connection
     try:
-        print("🔒 Testing SMTP connection...")
-        with smtplib.SMTP('smtp.gmail.com', 587, timeout=10) as server:
-            print("🔐 Starting TLS...")
-            server.starttls()
-            print("🔑 Testing login...")
-            server.login(EMAIL_SENDER, EMAIL_PASSWORD)
-            print("✅ SMTP connection and login successful!")
-            return True
+        print("🔒 Testing SMTP connection and login...")
+        # The verified connection is kept open for the first alert
+        get_email_transport().verify(timeout=30)
+        print("✅ SMTP connection and login successful!")
+        return True
     except smtplib.SMTPAuthenticationError as e:
         print("❌ Authentication failed!")
         print("Error:", str(e))
@@ -459,18 +777,8 @@ def send_test_email():
     """
     try:
         print("\n📧 Sending test email...")
-        msg = MIMEMultipart()
-        msg['From'] = EMAIL_SENDER
-        msg['To'] = EMAIL_RECEIVER
-        msg['Subject'] = "Test Email - Fire Detection System"
-        
         body = "This is a test email from your Fire Detection System."
-        msg.attach(MIMEText(body, 'plain'))
-        
-        with smtplib.SMTP('smtp.gmail.com', 587) as server:
-            server.starttls()
-            server.login(EMAIL_SENDER, EMAIL_PASSWORD)
-            server.send_message(msg)
+        get_email_transport().send(EmailJob(EMAIL_RECEIVER, "Test Email - Fire Detection System", body))
             
         print("✅ Test email sent successfully!")
         return True
@@ -552,42 +860,19 @@ def connect_to_ip_camera():
     else:
         # Custom URL
         url = input("Enter complete camera URL: ")
+        ip = port = None
     
     print(f"\n🎥 Attempting to connect to {url}...")
-    
-    # Try different connection methods for the selected URL
-    methods = [
-        (url, "Default URL"),
-        (url.replace("video", "videofeed"), "Video feed URL"),
-        (url.replace("video", "mjpegfeed"), "MJPEG feed URL"),
-        (f"{url}?640x480", "640x480 resolution"),
-        (f"{url}?1280x720", "720p resolution"),
-        (f"http://{ip}:{port}/video", "Basic video URL"),
-        (f"http://{ip}:{port}/videofeed", "Basic feed URL")
-    ]
-    
-    for method_url, method_name in methods:
-        print(f"\nTrying {method_name}...")
-        try:
-            cap = cv2.VideoCapture(method_url)
-            
-            # Test if connection is working
-            if cap.isOpened():
-                ret, frame = cap.read()
-                if ret and frame is not None and frame.size > 0:
-                    print(f"✅ Successfully connected using {method_name}")
-                    print(f"📊 Frame size: {frame.shape[1]}x{frame.shape[0]}")
-                    return cap, method_url
-                else:
-                    print("⚠️ Connection opened but no valid frame received")
-            else:
-                print("⚠️ Could not open connection")
-            
-            cap.release()
-        except Exception as e:
-            print(f"⚠️ Error: {str(e)}")
-            continue
-    
+
+    # Try the alternative URLs for the camera concurrently, last good one first
+    candidates = candidate_urls(url, ip, port)
+    device = f"{ip}:{port}" if ip else url
+    cap, method_url = probe_camera(device, candidates, timeout=CAMERA_PROBE_TIMEOUT, capture_args=CAPTURE_ARGS)
+    if cap is not None:
+        # Reconnects reuse the candidates without prompting
+        return cap, method_url, make_opener(method_url, candidates, device, timeout=CAMERA_PROBE_TIMEOUT,
+                                            capture_args=CAPTURE_ARGS)
+
     print("\n❌ Failed to connect. Please verify:")
     print("1. DroidCam app is running and screen is on")
     print("2. Both PC and iPhone are on the same WiFi network")
@@ -599,23 +884,334 @@ def connect_to_ip_camera():
     print("- Make sure DroidCam is allowed")
     print("- Try restarting the DroidCam app")
     print("- Check if iOS camera permissions are granted")
-    return None, None
+    return None, None, None
+
+def report_incident(state, change, frame_time):
+    """
+    Log a camera's incident change from engine.update_incident() and queue
+    the immediate alerts when one starts
+    """
+    if change == "started":
+        print(f"🔥 [{state.name}] Fire detected! Starting video recording and preparing alerts...")
+        get_event_store().incident_started(state.incident_id, state.name, frame_time, state.peak_confidence)
+
+        # Queue immediate alerts, delivery happens on the alert workers
+        get_alert_dispatcher().submit(
+            Alert(state.incident_id, FIRE_ALERT_MESSAGE, camera=state.name, created=frame_time),
+            channels=ALERT_CHANNELS_ON_FIRE)
+        telemetry.observe("frame_to_alert", time.time() - frame_time, camera=state.name)
+
+    elif change == "ended":
+        print(f"✅ [{state.name}] Fire no longer detected")
+        get_event_store().incident_ended(state.incident_id, frame_time, state.peak_confidence)
+
+def handle_detection(state, result, slot, frame_time):
+    """
+    Update one camera's detection state from its inference result and
+    trigger alerts and recording for that camera
+    """
+    detections, change = process_result(state, result, slot, frame_time)
+    report_incident(state, change, frame_time)
+
+    if preview_server is not None:
+        preview_server.publish(state.name, slot, detections)
+
+    # Show camera feed
+    if not HEADLESS:
+        with telemetry.timer("plot", camera=state.name):
+            annotated_frame = result.plot() if result is not None else slot.array
+        cv2.imshow(f"Live Fire Detection - {state.name}", annotated_frame)
+
+def send_clip_email(state, video_path, info):
+    """
+    Log a finished clip and queue its alert media, which is sent once built,
+    the email subject to the per-camera cooldown (runs on the recorder thread)
+    """
+    get_event_store().clip_recorded(state.name, info["fire_start"], video_path)
+    email = info["end"] - state.last_email_time >= EMAIL_COOLDOWN
+    if email:
+        state.last_email_time = info["end"]
+    else:
+        print(f"⏳ [{state.name}] Email cooldown active, skipping email alert")
+    get_alert_media().submit(state.incident_id, state.name, video_path, info,
+                             on_ready=lambda media: send_alert_media(state, media, email))
+
+def send_alert_media(state, media, email):
+    """
+    Send an incident's snapshot and compact clip to the channels
+    (runs on the alert media thread)
+    """
+    info = media.info
+    detected_at = datetime.fromtimestamp(info["fire_start"]).strftime("%Y-%m-%d %H:%M:%S")
+    if media.snapshot_path:
+        caption = (f"{FIRE_ALERT_MESSAGE}\nCamera: {state.name}, {detected_at}, "
+                   f"peak confidence {info.get('peak_confidence', 0):.0%}")
+        get_alert_dispatcher().submit(Alert(media.incident_id, caption, camera=state.name, kind="media",
+                                            photo=media.snapshot_path),
+                                      channels=ALERT_CHANNELS_WITH_MEDIA)
+    if not email:
+        return
+
+    body = f"""
+    🚨 FIRE DETECTION ALERT! 🔥
+
+    A fire has been detected by the monitoring system.
+    Camera: {state.camera_type} ({state.name})
+    Please check the attached video recording immediately.
+
+    Time of detection: {detected_at}
+    """
+    print(f"📧 [{state.name}] Queueing email with video...")
+    future = get_email_transport().submit(EmailJob(EMAIL_RECEIVER, EMAIL_SUBJECT, body,
+                                                   attachment_path=media.clip_path,
+                                                   attachment_type="video/mp4"))
+    future.add_done_callback(lambda f: report_email_result(state.name, f, media.incident_id, info["fire_start"]))
+
+def build_camera(name, source, camera_type, grabber=None):
+    """
+    Create a camera's state with its motion gate, trackers and region
+    """
+    return CameraState(name, source, grabber=grabber, camera_type=camera_type,
+                       gate=build_motion_gate(name), tracker=build_roi_tracker(),
+                       scheduler=build_scheduler(), tiler=build_tiler(), region=build_region_mask(name))
+
+def build_recorder(state):
+    """
+    Create the clip recorder for a camera run by the in-process engine
+    (sharded runs record in their own recorder process)
+    """
+    return ClipRecorder(state.name, VIDEO_OUTPUT_DIR, pre_roll=PRE_ROLL_SECONDS,
+                        post_roll=RECORD_DURATION, max_duration=MAX_CLIP_DURATION,
+                        pre_roll_bytes=PRE_ROLL_MAX_MB * 1024 * 1024, pre_roll_fps=PRE_ROLL_FPS,
+                        pre_roll_quality=PRE_ROLL_QUALITY,
+                        on_clip=lambda path, info: send_clip_email(state, path, info),
+                        labels=model.names)
+
+def build_motion_gate(camera_name):
+    """
+    Create the motion gate for a camera, or None if gating is disabled for it
+    """
+    settings = dict(MOTION_GATE_SETTINGS)
+    settings.update(MOTION_GATE_OVERRIDES.get(camera_name, {}))
+    if not settings.pop("enabled", False):
+        return None
+    return MotionGate(**settings)
+
+def build_region_mask(camera_name):
+    """
+    Create a camera's region mask, or None if it has none configured
+    """
+    settings = REGION_MASKS.get(camera_name)
+    if not settings:
+        return None
+    return RegionMask(**settings)
+
+def build_roi_tracker():
+    """
+    Create a camera's ROI tracker, or None if tracking is disabled
+    """
+    settings = dict(ROI_TRACKING_SETTINGS)
+    if not settings.pop("enabled", False):
+        return None
+    return RoiTracker(**settings)
+
+tiler = None
+
+def build_tiler():
+    """
+    Return the tiler shared by all cameras, or None if tiling is disabled
+    """
+    global tiler
+    settings = dict(TILING_SETTINGS)
+    if not settings.pop("enabled", False):
+        return None
+    if tiler is None:
+        tiler = Tiler(**settings)
+    return tiler
+
+def build_scheduler():
+    """
+    Create a camera's inference scheduler, or None if it is disabled
+    """
+    settings = dict(SCHEDULER_SETTINGS)
+    if not settings.pop("enabled", False):
+        return None
+    return InferenceScheduler(**settings)
+
+def collect_pipeline_metrics(engine):
+    """
+    Scrape-time counters and queue depths for the metrics endpoint
+    """
+    samples = []
+    for state in engine.cameras:
+        labels = {"camera": state.name}
+        samples.append(("fire_frames_inferred_total", "counter", labels, state.frames_inferred))
+        samples.append(("fire_frames_gated_total", "counter", labels, state.frames_gated))
+        samples.append(("fire_frames_cropped_total", "counter", labels, state.frames_cropped))
+        if state.scheduler is not None:
+            samples.append(("fire_frames_throttled_total", "counter", labels, state.frames_throttled))
+            samples.append(("fire_inference_rate", "gauge", labels, state.scheduler.rate))
+            samples.append(("fire_inference_target_rate", "gauge", labels, state.scheduler.target_rate))
+        samples.append(("fire_detected", "gauge", labels, int(state.fire_detected)))
+        if state.grabber is not None:
+            capture = state.grabber.stats()
+            samples.append(("fire_frames_captured_total", "counter", labels, capture["frames_grabbed"]))
+            samples.append(("fire_frames_dropped_total", "counter", labels, capture["frames_dropped"]))
+            samples.append(("fire_frame_age_seconds", "gauge", labels, capture["last_frame_age_ms"] / 1000))
+            pool = state.grabber.pool.stats()
+            samples.append(("fire_frame_pool_in_use", "gauge", labels, pool["in_use"]))
+            samples.append(("fire_frame_pool_copies_total", "counter", labels, pool["copies"]))
+        if state.recorder is not None:
+            recorder = state.recorder.stats()
+            samples.append(("fire_queue_depth", "gauge", {"queue": f"recorder_{state.name}"}, recorder["queue_depth"]))
+            samples.append(("fire_recorder_frames_dropped_total", "counter", labels, recorder["frames_dropped"]))
+
+    dispatcher = get_alert_dispatcher()
+    samples.append(("fire_queue_depth", "gauge", {"queue": "alerts"}, dispatcher.queue_depth()))
+    for channel, stats in dispatcher.get_stats()["channels"].items():
+        samples.append(("fire_alerts_sent_total", "counter", {"channel": channel}, stats["sent"]))
+        samples.append(("fire_alerts_failed_total", "counter", {"channel": channel}, stats["failed"]))
+
+    email = get_email_transport().stats()
+    samples.append(("fire_queue_depth", "gauge", {"queue": "email"}, email["queue_depth"]))
+    samples.append(("fire_emails_sent_total", "counter", {}, email["sent"]))
+    samples.append(("fire_emails_failed_total", "counter", {}, email["failed"]))
+    return samples
+
+def start_metrics(engine):
+    """
+    Turn on instrumentation and start the configured metrics outputs
+    """
+    if not METRICS_ENABLED:
+        return
+    telemetry.enable()
+    telemetry.add_collector(lambda: collect_pipeline_metrics(engine))
+    try:
+        telemetry.start_http_server(METRICS_HOST, METRICS_PORT)
+    except OSError as e:
+        print(f"⚠️ Could not start metrics endpoint: {str(e)}")
+    if METRICS_LOG_INTERVAL:
+        telemetry.start_log(METRICS_LOG_INTERVAL)
+
+preview_server = None
+
+def start_preview():
+    """
+    Start the MJPEG preview server if enabled
+    """
+    global preview_server
+    if not PREVIEW_ENABLED:
+        return None
+    try:
+        preview_server = PreviewServer(PREVIEW_HOST, PREVIEW_PORT, fps=PREVIEW_FPS, width=PREVIEW_WIDTH,
+                                       labels=model.names).start()
+    except OSError as e:
+        print(f"⚠️ Could not start preview server: {str(e)}")
+    return preview_server
+
+def run_sharded(cameras):
+    """
+    Run the cameras on a ShardSupervisor until Ctrl+C; alerts and emails
+    are still sent from this process
+    """
+    states = {state.name: state for state in cameras}
+
+    def on_detection(name, seq, frame_time, detections):
+        state = states[name]
+        state.frames_inferred += 1
+        confidence = fire_confidence(detections)
+        report_incident(state, update_incident(state, confidence > 0, frame_time, confidence), frame_time)
+
+    supervisor = ShardSupervisor(
+        [(state.name, state.source) for state in cameras], MODEL_PATH,
+        workers=SHARD_WORKERS or None, threads_per_worker=SHARD_THREADS_PER_WORKER,
+        backend=INFERENCE_BACKEND, int8=MODEL_INT8, conf=0.6, ring_slots=SHARD_RING_SLOTS,
+        max_frame_size=SHARD_MAX_FRAME_SIZE, output_dir=VIDEO_OUTPUT_DIR,
+        recorder_args={"pre_roll": PRE_ROLL_SECONDS, "post_roll": RECORD_DURATION,
+                       "max_duration": MAX_CLIP_DURATION, "pre_roll_bytes": PRE_ROLL_MAX_MB * 1024 * 1024,
+                       "pre_roll_fps": PRE_ROLL_FPS, "pre_roll_quality": PRE_ROLL_QUALITY},
+        labels=model.names, on_detection=on_detection,
+        on_clip=lambda name, path, info: send_clip_email(states[name], path, info),
+        regions={state.name: REGION_MASKS[state.name] for state in cameras if REGION_MASKS.get(state.name)})
+    supervisor.start()
+    last_stats_time = time.time()
+    print("Press Ctrl+C to quit")
+    try:
+        while True:
+            supervisor.poll(timeout=0.1)
+            if time.time() - last_stats_time >= STATS_INTERVAL:
+                supervisor.print_stats()
+                get_alert_dispatcher().print_stats()
+                last_stats_time = time.time()
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping...")
+    supervisor.stop()
+    supervisor.print_stats()
+    get_alert_media().stop()
+
+def parse_args(argv=None):
+    """
+    Command line options for unattended runs; with none the menu is shown
+    """
+    parser = argparse.ArgumentParser(description="Fire detection system")
+    parser.add_argument("--mode", choices=list(RUN_MODES), default=RUN_MODE,
+                        help="start this mode without the menu")
+    parser.add_argument("--cameras", help="webcam indexes and stream URLs, comma separated (--mode cameras)")
+    parser.add_argument("--videos", help="video files or folders to scan, comma separated (--mode scan)")
+    parser.add_argument("--headless", action="store_true",
+                        help="no windows and no prompts; stop with Ctrl+C or SIGTERM")
+    args = parser.parse_args(argv)
+    if args.mode is None and args.cameras:
+        args.mode = "cameras"
+    elif args.mode is None and args.videos:
+        args.mode = "scan"
+    # Never prompt without someone at a terminal to answer
+    args.interactive = args.mode is None and not args.headless and sys.stdin.isatty()
+    if args.mode is None and not args.interactive:
+        args.mode = "cameras" if CAMERA_SOURCES else "webcam"
+    return args
+
+def parse_camera_sources(text):
+    """
+    Parse a comma separated list of webcam indexes and stream URLs
+    """
+    sources = []
+    for item in text.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        sources.append(int(item) if item.isdigit() else item)
+    return sources
 
 if __name__ == "__main__":
-    print("\n🚀 Fire Detection System")
-    print("1. Start fire detection (Local Webcam)")
-    print("2. Start fire detection (IP Camera)")
-    print("3. Test email functionality")
-    print("4. Verify email settings")
-    print("5. Send test email (no attachment)")
-    print("6. Test video recording")
-    choice = input("Enter your choice (1-6): ")
+    args = parse_args()
+    HEADLESS = HEADLESS or args.headless
+    if not args.interactive:
+        # systemd stops services with SIGTERM: shut down like on Ctrl+C
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+    if args.interactive:
+        print("\n🚀 Fire Detection System")
+        print("1. Start fire detection (Local Webcam)")
+        print("2. Start fire detection (IP Camera)")
+        print("3. Test email functionality")
+        print("4. Verify email settings")
+        print("5. Send test email (no attachment)")
+        print("6. Test video recording")
+        print("7. Start fire detection (Multiple cameras)")
+        print("8. Scan recorded videos (batch mode)")
+        choice = input("Enter your choice (1-8): ")
+    else:
+        choice = RUN_MODES[args.mode]
+        print(f"\n🚀 Fire Detection System ({args.mode} mode)")
     
+    cameras = []
     if choice == "2":
-        cap, ip_address = connect_to_ip_camera()
+        cap, ip_address, opener = connect_to_ip_camera()
         if not cap:
             print("Exiting...")
             exit()
+        cameras.append(build_camera("ip_camera", ip_address, "IP Camera",
+                                    grabber=FrameGrabber(cap, name="ip_camera", opener=opener)))
     elif choice == "3":
         test_email_functionality()
         exit()
@@ -640,6 +1236,33 @@ if __name__ == "__main__":
         else:
             print("❌ Test recording failed!")
         exit()
+    elif choice == "7":
+        sources = parse_camera_sources(args.cameras) if args.cameras else CAMERA_SOURCES
+        if not sources and args.interactive:
+            sources = parse_camera_sources(input("Enter camera sources (webcam index or URL, comma separated): "))
+        if not sources:
+            print("❌ No camera sources given.")
+            exit()
+        for i, source in enumerate(sources):
+            camera_type = "Local Webcam" if isinstance(source, int) else "IP Camera"
+            name = f"camera_{i + 1}"
+            cameras.append(build_camera(name, source, camera_type))
+        print(f"✅ {len(cameras)} camera(s) configured")
+    elif choice == "8":
+        # Non-interactive equivalent: python batch_process.py <paths> --stride N
+        paths = args.videos or ""
+        if args.interactive:
+            paths = input(f"Enter video files or folders (default {VIDEO_OUTPUT_DIR}): ").strip()
+        # Plain split: digit-only file or folder names stay paths
+        paths = [p.strip() for p in paths.split(",") if p.strip()]
+        videos = collect_videos(paths or [VIDEO_OUTPUT_DIR])
+        if not videos:
+            print("❌ No videos found.")
+            exit()
+        report = process_videos(model, videos, stride=BATCH_SCAN_STRIDE, batch=BATCH_SCAN_SIZE)
+        print(f"✅ Scanned {len(videos)} video(s): {report['throughput_fps']:.1f} video frames/s, "
+              f"{report['realtime_factor']:.1f}x realtime")
+        exit()
     else:
         print("\n📷 Using local webcam...")
         cap = cv2.VideoCapture(0)
@@ -647,138 +1270,78 @@ if __name__ == "__main__":
             print("❌ Failed to open local webcam.")
             exit()
         print("✅ Successfully connected to local webcam")
+        cameras.append(build_camera("webcam", 0, "Local Webcam",
+                                    grabber=FrameGrabber(cap, name="webcam")))
 
     # First verify email settings before starting
     if not verify_email_settings():
         print("\n⚠️ Email settings verification failed!")
-        proceed = input("Do you want to proceed anyway? (y/n): ").lower()
-        if proceed != 'y':
+        if not args.interactive:
+            print("⚠️ Starting anyway, email alerts may fail until the settings are fixed")
+        elif input("Do you want to proceed anyway? (y/n): ").lower() != 'y':
             print("Exiting...")
             exit()
     
     print("\n🚀 Starting Fire Detection System...")
     
-    # Optional model evaluation
-    metrics = evaluate_model_metrics()
-    speed_metrics = analyze_detection_speed()
-    
-    fire_detected = False
-    frame_queue = []
-    recording = False
-    last_email_time = 0
-    EMAIL_COOLDOWN = 60
-    recording_start_time = None
-
-    print("Press 'q' to quit")
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("❌ Failed to grab frame. Retrying...")
-            # For IP camera, try to reconnect
-            if choice == "2":
-                time.sleep(1)  # Wait before retrying
-                cap, ip_address = connect_to_ip_camera()
-                continue
-            else:
-                break
+    # Optional model evaluation, cached between runs
+    metrics, speed_metrics, pending_key = run_startup_checks()
 
-        try:
-            results = model.predict(source=frame, conf=0.6, verbose=False)
-            fire_found = False
+    get_alert_dispatcher().start()
+    get_event_store()
 
-            for result in results:
-                if result.boxes is not None and result.boxes.cls.numel() > 0:
-                    classes = result.boxes.cls.cpu().numpy().astype(int)
-                    if 0 in classes:
-                        fire_found = True
-                        break
+    if SHARDING_ENABLED and choice == "7":
+        run_sharded(cameras)
+        get_alert_dispatcher().stop()
+        get_email_transport().stop()
+        get_event_store().stop()
+        exit()
 
-            current_time = time.time()
-            
-            # Always keep recent frames in queue for potential recording
-            frame_queue.append(frame.copy())
-            if len(frame_queue) > 20:
-                frame_queue.pop(0)
-
-            if fire_found:
-                if not fire_detected:
-                    print("🔥 Fire detected! Starting video recording and preparing alerts...")
-                    fire_detected = True
-                    recording = True
-                    recording_start_time = current_time
-                    
-                    # Start immediate alerts
-                    threading.Thread(target=play_alarm).start()
-                    threading.Thread(target=send_telegram_alert).start()
-                
-                # Check if we should stop recording
-                if recording and recording_start_time and (current_time - recording_start_time) >= RECORD_DURATION:
-                    print(f"📹 Recording complete after {RECORD_DURATION} seconds...")
-                    recording = False
-                    
-                if current_time - last_email_time >= EMAIL_COOLDOWN:
-                    print(f"💾 Saving video from {len(frame_queue)} frames...")
-                    video_path = record_video(frame_queue)
-                    if video_path:
-                        print("📧 Sending email with video...")
-                        try:
-                            msg = MIMEMultipart()
-                            msg['From'] = EMAIL_SENDER
-                            msg['To'] = EMAIL_RECEIVER
-                            msg['Subject'] = EMAIL_SUBJECT
-                            
-                            camera_type = "IP Camera" if choice == "2" else "Local Webcam"
-                            body = f"""
-                            🚨 FIRE DETECTION ALERT! 🔥
-                            
-                            A fire has been detected by the monitoring system.
-                            Camera: {camera_type}
-                            Please check the attached video recording immediately.
-                            
-                            Time of detection: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-                            """
-                            
-                            msg.attach(MIMEText(body, 'plain'))
-                            
-                            with open(video_path, 'rb') as f:
-                                video_attachment = MIMEApplication(f.read(), _subtype="mp4")
-                                video_attachment.add_header('Content-Disposition', 'attachment', 
-                                                         filename=os.path.basename(video_path))
-                                msg.attach(video_attachment)
-                            
-                            with smtplib.SMTP('smtp.gmail.com', 587) as server:
-                                server.starttls()
-                                server.login(EMAIL_SENDER, EMAIL_PASSWORD)
-                                server.send_message(msg)
-                            
-                            print("✅ Email alert sent successfully")
-                            last_email_time = current_time
-                        except Exception as e:
-                            print(f"❌ Error sending email: {str(e)}")
-                    else:
-                        print("❌ Failed to save video, email not sent")
-                else:
-                    print("⏳ Email cooldown active, skipping email alert")
-                
-                frame_queue = []  # Clear the queue after sending
-                
-            elif not fire_found and fire_detected:
-                print("✅ Fire no longer detected")
-                fire_detected = False
-                recording = False
-                recording_start_time = None
+    for state in cameras:
+        state.recorder = build_recorder(state)
+    engine = DetectionEngine(model, cameras, on_result=handle_detection, conf=0.6,
+                             capture_args=CAPTURE_ARGS, imgsz=MODEL_IMGSZ,
+                             max_batch=INFERENCE_BATCH or None).start()
+    start_metrics(engine)
+    start_preview()
 
-            # Show webcam feed
-            annotated_frame = results[0].plot()
-            cv2.imshow("Live Fire Detection", annotated_frame)
+    refresh_process = None
+    if pending_key is not None:
+        refresh_process = run_in_background(refresh_model_cache, pending_key)
+    last_stats_time = time.time()
 
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
+    print("Press Ctrl+C to quit" if HEADLESS else "Press 'q' to quit")
 
-        except Exception as e:
-            print(f"❌ Error processing frame: {str(e)}")
-            continue
+    try:
+        while True:
+            try:
+                engine.step()
+            except Exception as e:
+                print(f"❌ Error processing frame: {str(e)}")
+                continue
+
+            if time.time() - last_stats_time >= STATS_INTERVAL:
+                engine.print_stats()
+                get_alert_dispatcher().print_stats()
+                last_stats_time = time.time()
+
+            if not HEADLESS and cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping...")
 
-    cap.release()
-    cv2.destroyAllWindows()
+    engine.print_stats()
+    engine.stop()
+    get_alert_media().stop()
+    if refresh_process is not None and refresh_process.is_alive():
+        refresh_process.terminate()
+    get_alert_dispatcher().print_stats()
+    get_alert_dispatcher().stop()
+    get_email_transport().stop()
+    get_event_store().print_stats()
+    get_event_store().stop()
+    telemetry.stop()
+    if preview_server is not None:
+        preview_server.stop()
+    if not HEADLESS:
+        cv2.destroyAllWindows()
@@ -0,0 +1,358 @@
+"""
+Native MJPEG-over-HTTP camera source.
+
+IP Webcam and DroidCam serve /video and /mjpegfeed as a
+multipart/x-mixed-replace stream of JPEGs. cv2.VideoCapture decodes every
+one of them, even the frames FrameGrabber then drops. MjpegCapture reads
+the stream itself and splits it into JPEGs at the byte level, from each
+part's Content-Length header or, without one, the JPEG start/end markers.
+grab() only buffers the next JPEG's bytes; retrieve() decodes it, so
+skipped frames cost no decode at all. With reduce=2, 4 or 8 libjpeg scales
+the image down in the DCT domain while decoding, which is several times
+cheaper than a full decode followed by a resize.
+
+MjpegCapture has the parts of the cv2.VideoCapture interface the capture
+code uses, so a FrameGrabber can read from either. StubMjpegServer serves
+frames as an MJPEG stream for testing:
+
+    python mjpeg_stream.py                       # against a local stub server
+    python mjpeg_stream.py http://192.168.1.21:8080/video --every 5 --reduce 2
+"""
+
+import argparse
+import base64
+import http.client
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+import cv2
+import numpy as np
+
+REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+_SOI = b"\xff\xd8"
+_EOI = b"\xff\xd9"
+# Longest multipart part header kept while waiting for its JPEG
+_MAX_HEADER_BYTES = 4096
+
+
+def _content_length(header):
+    """
+    Content-Length from a multipart part header, or None
+    """
+    index = header.lower().rfind(b"content-length:")
+    if index < 0:
+        return None
+    value = header[index + len(b"content-length:"):].split(b"\r\n", 1)[0].strip()
+    return int(value) if value.isdigit() else None
+
+
+class MjpegCapture:
+    """
+    Read an MJPEG HTTP stream, decoding only the frames that are retrieved.
+    """
+
+    def __init__(self, url, timeout=5.0, reduce=1, chunk_size=65536):
+        if reduce not in REDUCED_DECODE_FLAGS:
+            raise ValueError(f"reduce must be one of {sorted(REDUCED_DECODE_FLAGS)}")
+        self.url = url
+        self.timeout = timeout
+        self.reduce = reduce
+        self.chunk_size = chunk_size
+        self._conn = None
+        self._response = None
+        self._buffer = bytearray()
+        self._jpeg = None
+        self._shape = None
+        self._last_frame_at = None
+        self._fps = 0.0
+        # Set when the host could not be reached at all (as opposed to not serving MJPEG)
+        self.connect_error = None
+
+        # Statistics
+        self.frames_received = 0
+        self.frames_decoded = 0
+        self.bytes_received = 0
+        self.decode_time = 0.0
+
+        self._open()
+
+    def _open(self):
+        parts = urlsplit(self.url)
+        connection = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        headers = {}
+        if parts.username:
+            credentials = f"{unquote(parts.username)}:{unquote(parts.password or '')}"
+            headers["Authorization"] = "Basic " + base64.b64encode(credentials.encode()).decode("ascii")
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        try:
+            self._conn = connection(parts.hostname, parts.port, timeout=self.timeout)
+            self._conn.request("GET", path, headers=headers)
+            response = self._conn.getresponse()
+        except (OSError, http.client.HTTPException) as e:
+            self.connect_error = str(e) or type(e).__name__
+            self.release()
+            return
+        content_type = response.getheader("Content-Type", "")
+        if response.status != 200 or not content_type.lower().startswith("multipart/"):
+            # Not an MJPEG stream, leave it to cv2.VideoCapture
+            self.release()
+            return
+        self._response = response
+
+    def isOpened(self):
+        return self._response is not None
+
+    def _fill(self, size=None):
+        try:
+            data = self._response.read1(size or self.chunk_size)
+        except (OSError, http.client.HTTPException, ValueError):
+            data = b""
+        if not data:
+            # Stream ended or timed out; fail fast from now on
+            self.release()
+            return False
+        self.bytes_received += len(data)
+        self._buffer += data
+        return True
+
+    def _next_jpeg(self):
+        buffer = self._buffer
+        start = -1
+        scanned = 0
+        while True:
+            if start < 0:
+                start = buffer.find(_SOI)
+                if start < 0 and len(buffer) > 1:
+                    # Keep the part headers from the last boundary on, for
+                    # their Content-Length, else a trailing 0xff that may
+                    # start the next marker
+                    boundary = buffer.rfind(b"--")
+                    if boundary < 0 or len(buffer) - boundary > _MAX_HEADER_BYTES:
+                        boundary = len(buffer) - 1
+                    del buffer[:boundary]
+            if start >= 0:
+                length = _content_length(bytes(buffer[:start]))
+                if length:
+                    end = start + length
+                    if len(buffer) >= end:
+                        jpeg = bytes(buffer[start:end])
+                        del buffer[:end]
+                        return jpeg
+                    if not self._fill(min(end - len(buffer), self.chunk_size)):
+                        return None
+                    continue
+                eoi = buffer.find(_EOI, max(start + 2, scanned - 1))
+                if eoi >= 0:
+                    jpeg = bytes(buffer[start:eoi + 2])
+                    del buffer[:eoi + 2]
+                    return jpeg
+                scanned = len(buffer)
+            if self._response is None or not self._fill():
+                return None
+
+    def grab(self):
+        """
+        Read the next JPEG from the stream without decoding it
+        """
+        if self._response is None:
+            return False
+        jpeg = self._next_jpeg()
+        if jpeg is None:
+            return False
+        self._jpeg = jpeg
+        self.frames_received += 1
+        now = time.time()
+        if self._last_frame_at is not None and now > self._last_frame_at:
+            fps = 1.0 / (now - self._last_frame_at)
+            self._fps = fps if not self._fps else 0.9 * self._fps + 0.1 * fps
+        self._last_frame_at = now
+        return True
+
+    def retrieve(self, image=None):
+        """
+        Decode the last grabbed JPEG, into image if it has the right shape
+        """
+        if self._jpeg is None:
+            return False, None
+        start = time.perf_counter()
+        frame = cv2.imdecode(np.frombuffer(self._jpeg, dtype=np.uint8), REDUCED_DECODE_FLAGS[self.reduce])
+        self.decode_time += time.perf_counter() - start
+        if frame is None:
+            return False, None
+        self.frames_decoded += 1
+        self._shape = frame.shape
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self._fps
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self._shape[1]) if self._shape else 0.0
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self._shape[0]) if self._shape else 0.0
+        return 0.0
+
+    def set(self, prop, value):
+        # Nothing is buffered beyond the current read, so there is nothing to tune
+        return False
+
+    def release(self):
+        self._response = None
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def stats(self):
+        return {
+            "url": self.url,
+            "frames_received": self.frames_received,
+            "frames_decoded": self.frames_decoded,
+            "bytes_received": self.bytes_received,
+            "avg_decode_ms": self.decode_time / self.frames_decoded * 1000 if self.frames_decoded else 0.0,
+        }
+
+
+class StubMjpegServer:
+    """
+    Serve a list of frames as a looping MJPEG stream on every path.
+    """
+
+    def __init__(self, frames, fps=10.0, host="127.0.0.1", port=0, quality=80, content_length=True):
+        self.jpegs = [cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+                      for frame in frames]
+        self.fps = fps
+        self.host = host
+        self.port = port
+        self.content_length = content_length
+        self.frames_sent = 0
+        self._server = None
+        self._thread = None
+        self._running = False
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/video"
+
+    def next_jpeg(self, index):
+        """
+        JPEG to send as a connection's index-th frame
+        """
+        return self.jpegs[index % len(self.jpegs)]
+
+    def _make_handler(self):
+        stub = self
+
+        class StubHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+                self.end_headers()
+                index = 0
+                next_at = time.time()
+                try:
+                    while stub._running:
+                        jpeg = stub.next_jpeg(index)
+                        self.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n")
+                        if stub.content_length:
+                            self.wfile.write(f"Content-Length: {len(jpeg)}\r\n".encode("ascii"))
+                        self.wfile.write(b"\r\n" + jpeg + b"\r\n")
+                        stub.frames_sent += 1
+                        index += 1
+                        next_at += 1.0 / stub.fps
+                        time.sleep(max(0.0, next_at - time.time()))
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return StubHandler
+
+    def start(self):
+        self._running = True
+        self._server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-mjpeg", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _synthetic_frames(count=30, width=1280, height=720):
+    frames = []
+    for i in range(count):
+        frame = np.full((height, width, 3), 40, dtype=np.uint8)
+        cv2.circle(frame, (int(width * (i + 1) / (count + 1)), height // 2), height // 8, (0, 80, 255), -1)
+        cv2.putText(frame, f"stub frame {i}", (40, 80), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+        frames.append(frame)
+    return frames
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure MJPEG stream decode cost with frame skipping")
+    parser.add_argument("url", nargs="?", help="MJPEG URL (default: a local stub server)")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--every", type=int, default=5, help="decode every Nth frame")
+    parser.add_argument("--reduce", type=int, choices=sorted(REDUCED_DECODE_FLAGS), default=1)
+    parser.add_argument("--fps", type=float, default=30.0, help="stub server frame rate")
+    args = parser.parse_args(argv)
+
+    stub = None
+    url = args.url
+    if not url:
+        stub = StubMjpegServer(_synthetic_frames(), fps=args.fps).start()
+        url = stub.url
+        print(f"🧪 Stub MJPEG server at {url}")
+
+    cap = MjpegCapture(url, reduce=args.reduce)
+    if not cap.isOpened():
+        print(f"❌ {url} is not an MJPEG stream")
+        return 1
+    deadline = time.time() + args.seconds
+    shape = None
+    try:
+        while time.time() < deadline and cap.grab():
+            if cap.frames_received % args.every == 0:
+                ret, frame = cap.retrieve()
+                if ret:
+                    shape = frame.shape
+    finally:
+        cap.release()
+        if stub is not None:
+            stub.stop()
+
+    s = cap.stats()
+    print(f"📊 {s['frames_received']} frames received ({s['frames_received'] / args.seconds:.1f} fps, "
+          f"{s['bytes_received'] / args.seconds / 1024:.0f} KiB/s), {s['frames_decoded']} decoded "
+          f"at {s['avg_decode_ms']:.2f}ms each" + (f", {shape[1]}x{shape[0]}" if shape else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,162 @@
+"""
+Persistent cache for the startup model evaluation and speed benchmark.
+
+Results are stored in a small JSON file keyed by a hash of the model
+weights, the dataset (data.yaml and the files it points to) and the
+hardware/torch configuration. They are only recomputed when that key
+changes, optionally in a low-priority background process so detection can
+start straight away.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import time
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """
+    SHA-256 of a file, read in chunks
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dataset_fingerprint(data_path):
+    """
+    Hash data.yaml plus the name, size and mtime of every file it references.
+    Returns None when there is no dataset.
+    """
+    if not data_path or not os.path.exists(data_path):
+        return None
+    digest = hashlib.sha256()
+    with open(data_path, "rb") as f:
+        digest.update(f.read())
+
+    try:
+        import yaml
+
+        with open(data_path) as f:
+            config = yaml.safe_load(f) or {}
+    except Exception:
+        config = {}
+
+    base = os.path.dirname(os.path.abspath(data_path))
+    root = os.path.join(base, str(config.get("path", "")))
+    for split in ("train", "val", "test"):
+        entries = config.get(split)
+        if not entries:
+            continue
+        for entry in entries if isinstance(entries, list) else [entries]:
+            split_path = os.path.normpath(os.path.join(root, str(entry)))
+            if not os.path.exists(split_path):
+                split_path = os.path.normpath(os.path.join(base, str(entry)))
+            for dirpath, dirnames, filenames in os.walk(split_path):
+                dirnames.sort()
+                for name in sorted(filenames):
+                    stat = os.stat(os.path.join(dirpath, name))
+                    digest.update(f"{os.path.relpath(os.path.join(dirpath, name), base)}"
+                                  f"|{stat.st_size}|{int(stat.st_mtime)}\n".encode())
+    return digest.hexdigest()
+
+
+def hardware_fingerprint():
+    """
+    Describe the hardware and torch setup the benchmark depends on
+    """
+    info = {
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+    try:
+        import torch
+
+        info["torch"] = torch.__version__
+        info["torch_threads"] = torch.get_num_threads()
+        info["cuda"] = torch.cuda.get_device_name(0) if torch.cuda.is_available() else None
+    except Exception:
+        info["torch"] = None
+    try:
+        import ultralytics
+
+        info["ultralytics"] = ultralytics.__version__
+    except Exception:
+        info["ultralytics"] = None
+    return info
+
+
+def startup_cache_key(model_path, data_path=None, backend=None):
+    """
+    Cache key for a model, dataset, hardware and inference backend combination
+    """
+    parts = {
+        "model": file_digest(model_path) if os.path.exists(model_path) else None,
+        "dataset": dataset_fingerprint(data_path),
+        "hardware": hardware_fingerprint(),
+    }
+    if backend is not None:
+        parts["backend"] = backend
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:32]
+
+
+def load_cached(cache_path, key):
+    """
+    Return the cached entry for key, or None
+    """
+    try:
+        with open(cache_path) as f:
+            return json.load(f).get(key)
+    except (OSError, ValueError):
+        return None
+
+
+def store_cached(cache_path, key, entry):
+    """
+    Save entry under key, keeping other keys. Written atomically so a crash
+    mid-write never leaves a corrupt cache.
+    """
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    entry = dict(entry, created=time.time())
+    cache[key] = entry
+
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp_path, cache_path)
+    return entry
+
+
+def _run_niced(target, args):
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+    target(*args)
+
+
+def run_in_background(target, *args):
+    """
+    Run target(*args) in a separate low-priority process.
+    target must be a module-level function; the process is spawned, not
+    forked, so it does not inherit the parent's torch threads. The caller
+    should terminate() it on shutdown if it is still running.
+    """
+    context = multiprocessing.get_context("spawn")
+    # Not a daemon: model.val() may start dataloader worker processes
+    process = context.Process(target=_run_niced, args=(target, args), name="model-cache-refresh")
+    process.start()
+    return process
@@ -0,0 +1,249 @@
+"""
+Cheap motion and fire-colour pre-filter in front of the YOLO model.
+
+Most camera time is a static field. MotionGate looks at a downscaled copy of
+each frame, diffs it against the previous one and builds an HSV fire/smoke
+colour mask. The model only runs when moving fire- or smoke-coloured pixels
+(or a large patch of fire colour) show up, with a forced full inference
+every force_interval seconds as a safety net.
+
+Run this file directly to measure how many true fire frames the gate would
+miss on sample images and recorded clips:
+
+    python motion_gate.py fire.33.png non_fire.png fire_recordings/clip.mp4
+"""
+
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+# HSV ranges (OpenCV hue is 0-179)
+FIRE_HSV_LOW = (0, 80, 150)
+FIRE_HSV_HIGH = (35, 255, 255)
+SMOKE_HSV_LOW = (0, 0, 90)
+SMOKE_HSV_HIGH = (179, 50, 230)
+
+
+class MotionGate:
+    """
+    Decide per frame whether the model needs to run.
+    """
+
+    def __init__(self, scale_width=160, motion_threshold=25, min_motion_fraction=0.002,
+                 min_fire_fraction=0.0005, min_smoke_fraction=0.002, static_fire_fraction=0.02,
+                 force_interval=5.0):
+        self.scale_width = scale_width
+        self.motion_threshold = motion_threshold
+        self.min_motion_fraction = min_motion_fraction
+        self.min_fire_fraction = min_fire_fraction
+        self.min_smoke_fraction = min_smoke_fraction
+        self.static_fire_fraction = static_fire_fraction
+        self.force_interval = force_interval
+
+        self._prev_gray = None
+        self._last_inference = 0.0
+        self._kernel = np.ones((3, 3), np.uint8)
+
+        # Statistics
+        self.frames_checked = 0
+        self.frames_skipped = 0
+        self.frames_forced = 0
+        self.gate_time = 0.0
+        self.saved_time = 0.0
+        self.last_reason = None
+
+    def _downscale(self, frame):
+        height, width = frame.shape[:2]
+        if width <= self.scale_width:
+            return frame
+        scale_height = max(1, int(height * self.scale_width / width))
+        return cv2.resize(frame, (self.scale_width, scale_height), interpolation=cv2.INTER_AREA)
+
+    def analyse(self, frame):
+        """
+        Return (motion, fire, moving_fire, moving_smoke) pixel fractions
+        for the downscaled frame and remember it as the new reference
+        """
+        small = self._downscale(frame)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (5, 5), 0)
+
+        if self._prev_gray is None or self._prev_gray.shape != gray.shape:
+            motion_mask = np.zeros_like(gray)
+        else:
+            diff = cv2.absdiff(gray, self._prev_gray)
+            _, motion_mask = cv2.threshold(diff, self.motion_threshold, 255, cv2.THRESH_BINARY)
+            motion_mask = cv2.dilate(motion_mask, self._kernel)
+        self._prev_gray = gray
+
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+        fire_mask = cv2.inRange(hsv, FIRE_HSV_LOW, FIRE_HSV_HIGH)
+        smoke_mask = cv2.inRange(hsv, SMOKE_HSV_LOW, SMOKE_HSV_HIGH)
+
+        total = float(gray.size)
+        motion = cv2.countNonZero(motion_mask) / total
+        fire = cv2.countNonZero(fire_mask) / total
+        moving_fire = cv2.countNonZero(cv2.bitwise_and(fire_mask, motion_mask)) / total
+        moving_smoke = cv2.countNonZero(cv2.bitwise_and(smoke_mask, motion_mask)) / total
+        return motion, fire, moving_fire, moving_smoke
+
+    def check(self, frame, now=None):
+        """
+        Return True if the model should run on this frame
+        """
+        now = time.time() if now is None else now
+        start = time.perf_counter()
+        motion, fire, moving_fire, moving_smoke = self.analyse(frame)
+        self.gate_time += time.perf_counter() - start
+        self.frames_checked += 1
+
+        if fire >= self.static_fire_fraction:
+            reason = "fire_colour"
+        elif motion >= self.min_motion_fraction and moving_fire >= self.min_fire_fraction:
+            reason = "moving_fire_colour"
+        elif motion >= self.min_motion_fraction and moving_smoke >= self.min_smoke_fraction:
+            reason = "moving_smoke_colour"
+        elif now - self._last_inference >= self.force_interval:
+            reason = "forced"
+            self.frames_forced += 1
+        else:
+            reason = None
+
+        self.last_reason = reason
+        if reason is None:
+            self.frames_skipped += 1
+            return False
+        self._last_inference = now
+        return True
+
+    def mark_inference(self, now=None):
+        """
+        Record that the model ran on this camera without going through check()
+        """
+        self._last_inference = time.time() if now is None else now
+
+    def prime(self, frame):
+        """
+        Use frame as the motion reference without counting it
+        """
+        self._prev_gray = None
+        self.analyse(frame)
+
+    def credit_skip(self, inference_time):
+        """
+        Add the estimated cost of an inference the gate avoided
+        """
+        self.saved_time += inference_time
+
+    def stats(self):
+        checked = self.frames_checked
+        return {
+            "frames_checked": checked,
+            "frames_skipped": self.frames_skipped,
+            "frames_forced": self.frames_forced,
+            "skip_rate": self.frames_skipped / checked if checked else 0.0,
+            "avg_gate_ms": self.gate_time / checked * 1000 if checked else 0.0,
+            "saved_ms": max(0.0, self.saved_time - self.gate_time) * 1000,
+        }
+
+    def print_stats(self, name="gate"):
+        s = self.stats()
+        print(f"📊 [{name}] gate skip rate: {s['skip_rate']*100:.1f}% "
+              f"({s['frames_skipped']}/{s['frames_checked']}), forced: {s['frames_forced']}, "
+              f"gate cost: {s['avg_gate_ms']:.2f}ms/frame, inference time saved: {s['saved_ms']/1000:.1f}s")
+
+
+def iter_sample_frames(path, max_frames=None):
+    """
+    Yield (frame, is_still_image) for an image or every frame of a video
+    """
+    image = cv2.imread(path)
+    if image is not None:
+        yield image, True
+        return
+    cap = cv2.VideoCapture(path)
+    count = 0
+    while cap.isOpened():
+        ret, frame = cap.read()
+        if not ret:
+            break
+        yield frame, False
+        count += 1
+        if max_frames and count >= max_frames:
+            break
+    cap.release()
+
+
+def evaluate_gate(model, paths, gate_settings=None, conf=0.6, fire_class=0, max_frames=None):
+    """
+    Run the model and the gate on every sample frame and count the fire
+    frames (according to the model) that the gate would have skipped.
+    Still images are judged on colour alone, since they have no motion.
+    """
+    gate_settings = dict(gate_settings or {})
+    # Never let the safety net hide a miss during evaluation
+    gate_settings["force_interval"] = float("inf")
+    report = {"sources": {}, "frames": 0, "fire_frames": 0, "missed_fire_frames": 0, "skipped": 0}
+
+    for path in paths:
+        gate = MotionGate(**gate_settings)
+        source = {"frames": 0, "fire_frames": 0, "missed_fire_frames": 0, "skipped": 0}
+        for frame, still in iter_sample_frames(path, max_frames=max_frames):
+            if still:
+                gate.prime(frame)
+            would_run = gate.check(frame, now=0.0)
+
+            results = model.predict(source=frame, conf=conf, verbose=False)
+            boxes = results[0].boxes
+            is_fire = boxes is not None and fire_class in boxes.cls.cpu().numpy().astype(int)
+
+            source["frames"] += 1
+            source["fire_frames"] += int(is_fire)
+            source["skipped"] += int(not would_run)
+            source["missed_fire_frames"] += int(is_fire and not would_run)
+
+        report["sources"][path] = source
+        for key in ("frames", "fire_frames", "missed_fire_frames", "skipped"):
+            report[key] += source[key]
+
+    report["miss_rate"] = (report["missed_fire_frames"] / report["fire_frames"]
+                           if report["fire_frames"] else 0.0)
+    report["skip_rate"] = report["skipped"] / report["frames"] if report["frames"] else 0.0
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure fire frames missed by the motion/colour gate")
+    parser.add_argument("paths", nargs="*", default=["fire.33.png", "non_fire.png"],
+                        help="images, videos or directories of clips")
+    parser.add_argument("--model", default="best.pt")
+    parser.add_argument("--conf", type=float, default=0.6)
+    parser.add_argument("--max-frames", type=int, default=None, help="frames per video")
+    parser.add_argument("--scale-width", type=int, default=160)
+    parser.add_argument("--motion-threshold", type=int, default=25)
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+
+    paths = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            paths.extend(os.path.join(path, name) for name in sorted(os.listdir(path)))
+        else:
+            paths.append(path)
+
+    report = evaluate_gate(YOLO(args.model), paths,
+                           gate_settings={"scale_width": args.scale_width,
+                                          "motion_threshold": args.motion_threshold},
+                           conf=args.conf, max_frames=args.max_frames)
+
+    print("\n=== Motion Gate Evaluation ===")
+    for path, source in report["sources"].items():
+        print(f"{path}: {source['frames']} frames, {source['fire_frames']} with fire, "
+              f"{source['missed_fire_frames']} missed, {source['skipped']} skipped")
+    print(f"Fire frames missed: {report['missed_fire_frames']}/{report['fire_frames']} "
+          f"({report['miss_rate']*100:.1f}%)")
+    print(f"Skip rate: {report['skip_rate']*100:.1f}%")
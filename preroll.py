@@ -0,0 +1,134 @@
+"""
+Compressed pre-roll buffer.
+
+Holding 30-60 seconds of raw 720p BGR frames before an ignition would take
+gigabytes per camera. CompressedPreRoll keeps the pre-roll JPEG-encoded
+instead, with timestamps and detections, in a ring bounded both by age
+(seconds) and by size (max_bytes): the oldest frames are evicted when
+either limit is reached. Frames are thinned to at most fps per second
+before encoding. Encoding runs on the caller's thread (the recorder's
+background thread, never the detection loop), and frames are only decoded,
+lazily and one at a time, when a clip is assembled from them.
+"""
+
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+class CompressedPreRoll:
+    """
+    Time- and memory-bounded ring of JPEG frames.
+    """
+
+    def __init__(self, seconds=30.0, max_bytes=64 * 1024 * 1024, fps=5.0, quality=80):
+        self.seconds = seconds
+        self.max_bytes = max_bytes
+        self.fps = fps
+        self.quality = quality
+
+        # (jpeg, timestamp, detections, shape)
+        self._frames = deque()
+        self._last_added = None
+        self.nbytes = 0
+
+        # Statistics
+        self.frames_encoded = 0
+        self.frames_skipped = 0
+        self.evicted_for_memory = 0
+        self.encode_time = 0.0
+
+    def __len__(self):
+        return len(self._frames)
+
+    @property
+    def duration(self):
+        """
+        Seconds of footage currently held
+        """
+        if len(self._frames) < 2:
+            return 0.0
+        return self._frames[-1][1] - self._frames[0][1]
+
+    def add(self, frame, timestamp, detections=None):
+        """
+        Encode and keep a frame unless it is within 1/fps of the last one.
+        Returns True if the frame was kept.
+        """
+        # A millisecond of slack so timestamp jitter does not skip every other frame
+        if self._last_added is not None and self.fps and timestamp - self._last_added < 1.0 / self.fps - 0.001:
+            self.frames_skipped += 1
+            return False
+        start = time.perf_counter()
+        ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        self.encode_time += time.perf_counter() - start
+        if not ok:
+            return False
+        jpeg = jpeg.tobytes()
+        self._frames.append((jpeg, timestamp, detections, frame.shape))
+        self.nbytes += _entry_bytes(jpeg, detections)
+        self._last_added = timestamp
+        self.frames_encoded += 1
+        self.trim(timestamp)
+        return True
+
+    def trim(self, now):
+        """
+        Evict frames older than seconds, then the oldest beyond max_bytes
+        """
+        while self._frames and now - self._frames[0][1] > self.seconds:
+            self._evict()
+        while len(self._frames) > 1 and self.nbytes > self.max_bytes:
+            self._evict()
+            self.evicted_for_memory += 1
+
+    def _evict(self):
+        jpeg, _, detections, _ = self._frames.popleft()
+        self.nbytes -= _entry_bytes(jpeg, detections)
+
+    def first_timestamp(self, shape=None):
+        """
+        Timestamp of the oldest frame (of the given shape), or None
+        """
+        for _, timestamp, _, frame_shape in self._frames:
+            if shape is None or frame_shape == shape:
+                return timestamp
+        return None
+
+    def drain(self, shape=None):
+        """
+        Yield (frame, timestamp, detections) oldest first, decoding each
+        frame only when it is reached, and empty the buffer. Frames of
+        another shape than shape are dropped.
+        """
+        while self._frames:
+            jpeg, timestamp, detections, frame_shape = self._frames.popleft()
+            self.nbytes -= _entry_bytes(jpeg, detections)
+            if shape is not None and frame_shape != shape:
+                continue
+            frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is not None:
+                yield frame, timestamp, detections
+        self._last_added = None
+
+    def clear(self):
+        self._frames.clear()
+        self.nbytes = 0
+        self._last_added = None
+
+    def stats(self):
+        return {
+            "frames": len(self._frames),
+            "bytes": self.nbytes,
+            "seconds": self.duration,
+            "frames_encoded": self.frames_encoded,
+            "frames_skipped": self.frames_skipped,
+            "evicted_for_memory": self.evicted_for_memory,
+            "avg_encode_ms": self.encode_time / self.frames_encoded * 1000 if self.frames_encoded else 0.0,
+        }
+
+
+def _entry_bytes(jpeg, detections):
+    return len(jpeg) + (detections.nbytes if detections is not None else 0)
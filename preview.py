@@ -0,0 +1,187 @@
+"""
+Optional live preview for headless installs.
+
+Instead of an OpenCV window, the latest frame of each camera is served as a
+low-rate, downscaled MJPEG stream over local HTTP:
+
+    http://127.0.0.1:8090/            index page with every camera
+    http://127.0.0.1:8090/<camera>    MJPEG stream of one camera
+
+The detection loop only calls publish(), which keeps a reference to the
+frame at most fps times per second. Resizing, drawing and JPEG encoding
+happen on the preview thread and only while somebody is watching.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+import cv2
+
+from annotation import draw_detections
+
+
+class PreviewServer:
+    """
+    Renders published frames at a fixed low rate and streams them as MJPEG.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8090, fps=2.0, width=480, quality=70, labels=None):
+        self.host = host
+        self.port = port
+        self.fps = fps
+        self.width = width
+        self.quality = quality
+        self.labels = labels
+
+        self._cameras = set()
+        self._pending = {}
+        self._last_published = {}
+        self._jpegs = {}
+        self._condition = threading.Condition()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._server = None
+        self._thread = None
+        self.clients = 0
+
+        # Statistics
+        self.frames_rendered = 0
+
+    def publish(self, camera, slot, detections=None, now=None):
+        """
+        Offer the camera's latest frame. Cheap and non-blocking; frames are
+        ignored while nobody is watching or faster than fps.
+        """
+        if camera not in self._cameras:
+            self._cameras.add(camera)
+        if self.clients == 0:
+            return
+        now = time.time() if now is None else now
+        if now - self._last_published.get(camera, 0.0) < 1.0 / self.fps:
+            return
+        self._last_published[camera] = now
+        with self._lock:
+            previous = self._pending.get(camera)
+            self._pending[camera] = (slot.acquire(), detections)
+        if previous is not None:
+            previous[0].release()
+
+    def _render(self, slot, detections):
+        frame = slot.array
+        height, width = frame.shape[:2]
+        scale = min(1.0, self.width / width)
+        if scale < 1.0:
+            frame = cv2.resize(frame, (self.width, int(height * scale)), interpolation=cv2.INTER_AREA)
+        else:
+            frame = frame.copy()
+        draw_detections(frame, detections, self.labels, scale=scale)
+        ok, data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return data.tobytes() if ok else None
+
+    def _run(self):
+        while not self._stop.wait(1.0 / self.fps):
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            for camera, (slot, detections) in pending.items():
+                try:
+                    jpeg = self._render(slot, detections)
+                except Exception as e:
+                    print(f"⚠️ [{camera}] Preview render error: {str(e)}")
+                    jpeg = None
+                finally:
+                    slot.release()
+                if jpeg is not None:
+                    with self._condition:
+                        self._jpegs[camera] = (time.time(), jpeg)
+                        self.frames_rendered += 1
+                        self._condition.notify_all()
+
+    def _wait_frame(self, camera, after, timeout=5.0):
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._stop.is_set() or self._jpegs.get(camera, (0.0, None))[0] > after, timeout)
+            return self._jpegs.get(camera, (0.0, None))
+
+    def _make_handler(self):
+        preview = self
+
+        class PreviewHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                camera = unquote(self.path.split("?")[0].strip("/"))
+                if not camera:
+                    self._send_index()
+                elif camera in preview._cameras:
+                    self._send_stream(camera)
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+
+            def _send_index(self):
+                cameras = sorted(preview._cameras)
+                images = "".join(f'<div><h3>{name}</h3><img src="/{name}"></div>' for name in cameras)
+                body = (f"<html><head><title>Fire Detection Preview</title></head>"
+                        f"<body>{images or 'No cameras yet, reload in a moment.'}</body></html>").encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_stream(self, camera):
+                self.send_response(200)
+                self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                with preview._condition:
+                    preview.clients += 1
+                try:
+                    last = 0.0
+                    while not preview._stop.is_set():
+                        stamp, jpeg = preview._wait_frame(camera, last)
+                        if jpeg is None or stamp <= last:
+                            continue
+                        last = stamp
+                        self.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n")
+                        self.wfile.write(f"Content-Length: {len(jpeg)}\r\n\r\n".encode("ascii"))
+                        self.wfile.write(jpeg + b"\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with preview._condition:
+                        preview.clients -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        return PreviewHandler
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="preview-http", daemon=True).start()
+        self._thread = threading.Thread(target=self._run, name="preview-render", daemon=True)
+        self._thread.start()
+        print(f"🖥️ Live preview at http://{self.host}:{self._server.server_port}/")
+        return self
+
+    def stats(self):
+        return {"clients": self.clients, "frames_rendered": self.frames_rendered,
+                "cameras": len(self._jpegs)}
+
+    def stop(self):
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for slot, _ in pending.values():
+            slot.release()
@@ -0,0 +1,275 @@
+"""
+Background clip recorder with pre-roll and post-roll.
+
+The detection thread hands every frame to ClipRecorder.add_frame(), which
+only takes a reference to the pooled slot and queues it. The recorder
+thread keeps the last pre_roll seconds of frames JPEG-compressed (see
+preroll.py, bounded by pre_roll_bytes), opens a clip the moment fire is
+reported, writes it incrementally and keeps writing until post_roll
+seconds after the last fire frame. Long incidents are split every
+max_duration seconds of fire. Frames are written at the
+measured capture rate and placed by their timestamps, so clip time
+matches wall time. Finished clips are passed to on_clip(path, info).
+
+Frames may carry their detections; boxes are drawn only on frames that are
+written to a clip, on the recorder thread. The annotated frame with the
+highest fire confidence is kept and handed on as info["peak_frame"].
+"""
+
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import cv2
+
+from annotation import draw_detections
+from preroll import CompressedPreRoll
+from telemetry import telemetry
+
+
+class ClipRecorder:
+    """
+    Per-camera recorder running on its own thread.
+    """
+
+    def __init__(self, name, output_dir, pre_roll=30.0, post_roll=10.0, max_duration=60.0,
+                 fourcc="mp4v", on_clip=None, queue_size=256, labels=None, fire_class=0,
+                 pre_roll_bytes=64 * 1024 * 1024, pre_roll_fps=5.0, pre_roll_quality=80):
+        self.name = name
+        self.output_dir = output_dir
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self.max_duration = max_duration
+        self.fourcc = fourcc
+        self.on_clip = on_clip
+        self.labels = labels
+        self.fire_class = fire_class
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._pre_roll = CompressedPreRoll(pre_roll, pre_roll_bytes, pre_roll_fps, pre_roll_quality)
+        self._thread = None
+        self._writer = None
+        self._clip = None
+        self._next_time = 0.0
+        self._last_timestamp = None
+        self._interval = None
+
+        # Statistics
+        self.frames_queued = 0
+        self.frames_dropped = 0
+        self.frames_written = 0
+        self.clips_written = 0
+
+    @property
+    def recording(self):
+        return self._clip is not None
+
+    @property
+    def fps(self):
+        """
+        Capture rate measured from the frames handed to the recorder
+        """
+        if not self._interval:
+            return 20.0
+        return min(60.0, max(1.0, 1.0 / self._interval))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"recorder-{self.name}", daemon=True)
+            self._thread.start()
+        return self
+
+    def add_frame(self, slot, timestamp, fire, detections=None):
+        """
+        Queue a frame for the recorder. Never blocks the caller; the frame is
+        dropped if the recorder has fallen behind. detections, an (N, 6)
+        array from annotation.detections_from_result(), are drawn on the
+        frame if it ends up in a clip.
+        """
+        try:
+            self._queue.put_nowait((slot.acquire(), timestamp, fire, detections))
+            self.frames_queued += 1
+        except queue.Full:
+            slot.release()
+            self.frames_dropped += 1
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                # No frames (camera stalled), still close the clip on time
+                if self._clip is not None and time.time() - self._clip["last_fire"] >= self.post_roll:
+                    self._finish_clip()
+                continue
+
+            if item is None:
+                if self._clip is not None:
+                    self._finish_clip()
+                self._clear_pre_roll()
+                return
+
+            slot, timestamp, fire, detections = item
+            self._update_rate(timestamp)
+            try:
+                self._handle(slot, timestamp, fire, detections)
+            except Exception as e:
+                print(f"❌ [{self.name}] Recorder error: {str(e)}")
+
+    def _update_rate(self, timestamp):
+        if self._last_timestamp is not None and timestamp > self._last_timestamp:
+            interval = timestamp - self._last_timestamp
+            self._interval = interval if self._interval is None else 0.9 * self._interval + 0.1 * interval
+        self._last_timestamp = timestamp
+
+    def _handle(self, slot, timestamp, fire, detections=None):
+        try:
+            if self._clip is not None:
+                if fire:
+                    self._clip["last_fire"] = timestamp
+                if slot.shape != self._clip["shape"]:
+                    # Resolution changed mid-clip, start a fresh file
+                    self._finish_clip()
+                else:
+                    self._write(slot.array, timestamp, detections)
+                    if timestamp - self._clip["last_fire"] >= self.post_roll:
+                        self._finish_clip()
+                    elif timestamp - self._clip["fire_start"] >= self.max_duration:
+                        # Long incident, hand over this clip and keep recording in a new one
+                        self._finish_clip()
+                        self._start_clip(slot.array, timestamp, detections)
+                    return
+
+            if fire:
+                self._start_clip(slot.array, timestamp, detections)
+            else:
+                with telemetry.timer("preroll", camera=self.name):
+                    self._pre_roll.add(slot.array, timestamp, detections)
+        finally:
+            # The pre-roll keeps its own JPEG copy, the slot goes back right away
+            slot.release()
+
+    def _start_clip(self, frame, timestamp, detections=None):
+        shape = frame.shape
+        height, width = shape[:2]
+        first_time = self._pre_roll.first_timestamp(shape)
+        if first_time is None:
+            first_time = timestamp
+        fps = round(self.fps, 1)
+        stamp = datetime.fromtimestamp(timestamp).strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.output_dir, f"fire_detection_{self.name}_{stamp}.mp4")
+
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*self.fourcc), fps, (width, height))
+        if not writer.isOpened():
+            print(f"❌ [{self.name}] Failed to create video writer")
+            self._pre_roll.add(frame, timestamp, detections)
+            return
+
+        print(f"📹 [{self.name}] Recording started ({len(self._pre_roll)} pre-roll frames, "
+              f"{timestamp - first_time:.0f}s, at {fps} fps)")
+        self._writer = writer
+        self._clip = {"path": path, "start": first_time, "fire_start": timestamp, "last_fire": timestamp,
+                      "fps": fps, "frames": 0, "shape": shape,
+                      "peak_confidence": 0.0, "peak_time": None, "peak_frame": None}
+        self._next_time = first_time
+
+        with telemetry.timer("preroll_decode", camera=self.name):
+            for pre_frame, frame_time, pre_detections in self._pre_roll.drain(shape):
+                self._write(pre_frame, frame_time, pre_detections)
+        self._write(frame, timestamp, detections)
+
+    def _write(self, frame, timestamp, detections=None):
+        step = 1.0 / self._clip["fps"]
+        peak = self._is_peak(detections)
+        if self._next_time > timestamp + step / 2 and not peak:
+            return
+        annotated = frame
+        if detections is not None and len(detections):
+            # Draw on a copy, the frame may still be shared with other readers
+            with telemetry.timer("plot", camera=self.name):
+                annotated = draw_detections(frame.copy(), detections, self.labels)
+        if peak:
+            self._clip["peak_frame"] = annotated if annotated is not frame else frame.copy()
+            self._clip["peak_time"] = timestamp
+        if self._next_time > timestamp + step / 2:
+            return
+        # Repeat or skip frames so the clip follows the capture timestamps
+        while self._next_time <= timestamp + step / 2:
+            with telemetry.timer("encode", camera=self.name):
+                self._writer.write(annotated)
+            self._next_time += step
+            self._clip["frames"] += 1
+            self.frames_written += 1
+
+    def _is_peak(self, detections):
+        """
+        Record a new peak fire confidence for the clip; True if this is one
+        """
+        if detections is None or not len(detections):
+            return False
+        fire = detections[detections[:, 5].astype(int) == self.fire_class]
+        if not len(fire) or fire[:, 4].max() <= self._clip["peak_confidence"]:
+            return False
+        self._clip["peak_confidence"] = float(fire[:, 4].max())
+        return True
+
+    def _finish_clip(self):
+        clip, self._clip = self._clip, None
+        self._writer.release()
+        self._writer = None
+
+        if clip["frames"] == 0 or not os.path.exists(clip["path"]):
+            print(f"❌ [{self.name}] No frames were written to video")
+            return
+        self.clips_written += 1
+        info = {
+            "camera": self.name,
+            "path": clip["path"],
+            "start": clip["start"],
+            "fire_start": clip["fire_start"],
+            "last_fire": clip["last_fire"],
+            "end": self._last_timestamp,
+            "frames": clip["frames"],
+            "fps": clip["fps"],
+            "size": os.path.getsize(clip["path"]),
+            "peak_confidence": clip["peak_confidence"],
+            "peak_time": clip["peak_time"],
+            "peak_frame": clip["peak_frame"],
+        }
+        print(f"✅ [{self.name}] Video saved: {clip['path']} "
+              f"({clip['frames']} frames, {info['size']/1024:.1f}KB)")
+        if self.on_clip is not None:
+            try:
+                self.on_clip(clip["path"], info)
+            except Exception as e:
+                print(f"❌ [{self.name}] Clip callback error: {str(e)}")
+
+    def _clear_pre_roll(self):
+        self._pre_roll.clear()
+
+    def stats(self):
+        return {
+            "camera": self.name,
+            "recording": self.recording,
+            "fps": self.fps,
+            "frames_queued": self.frames_queued,
+            "frames_dropped": self.frames_dropped,
+            "frames_written": self.frames_written,
+            "clips_written": self.clips_written,
+            "queue_depth": self._queue.qsize(),
+            "pre_roll_frames": len(self._pre_roll),
+            "pre_roll_bytes": self._pre_roll.nbytes,
+            "pre_roll_seconds": self._pre_roll.duration,
+        }
+
+    def stop(self, timeout=10.0):
+        """
+        Finish any open clip and stop the recorder thread
+        """
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
+        self._thread = None
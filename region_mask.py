@@ -0,0 +1,136 @@
+"""
+Static per-camera inference regions.
+
+Many views contain sky, buildings or road that never matter, and some have
+a spot of permanent sun glare that keeps producing false fire detections.
+A RegionMask describes the part of a camera's view the model should see:
+
+    crop      rectangle (x1, y1, x2, y2) the region is limited to
+    include   polygons of the area to watch (default: the whole frame)
+    exclude   polygons never inferred on (glare, sky, road)
+
+Coordinates are frame pixels, or fractions of the frame's width and height
+with normalized=True so one mask fits any resolution. Before predict() the
+frame is cut to the bounding box of the active region and the pixels of
+that box outside the region are zeroed, so the model works on fewer, more
+relevant pixels. Detections are moved back to full-frame coordinates with
+roi_tracker.offset_result() or offset_detections().
+
+The mask is built once per frame size.
+"""
+
+import cv2
+import numpy as np
+
+
+def offset_detections(detections, offset):
+    """
+    Return a copy of an (N, 6) detections array moved by offset=(x, y)
+    """
+    detections = detections.copy()
+    detections[:, [0, 2]] += offset[0]
+    detections[:, [1, 3]] += offset[1]
+    return detections
+
+
+class RegionMask:
+    """
+    Per-camera crop and polygon mask applied to frames before inference.
+    """
+
+    def __init__(self, crop=None, include=None, exclude=None, normalized=False):
+        if crop is None and not include and not exclude:
+            raise ValueError("RegionMask needs a crop, include or exclude region")
+        self.crop = crop
+        self.include = [np.asarray(polygon, dtype=np.float64).reshape(-1, 2) for polygon in include or []]
+        self.exclude = [np.asarray(polygon, dtype=np.float64).reshape(-1, 2) for polygon in exclude or []]
+        self.normalized = normalized
+
+        self._shape = None
+        self._window = None
+        self._mask = None
+
+        # Statistics
+        self.frames = 0
+        self.pixels_in = 0
+        self.pixels_out = 0
+
+    def _points(self, polygon, width, height):
+        if self.normalized:
+            polygon = polygon * (width, height)
+        return np.round(polygon).astype(np.int32)
+
+    def _build(self, shape):
+        height, width = shape[:2]
+        if self.include:
+            mask = np.zeros((height, width), dtype=np.uint8)
+            cv2.fillPoly(mask, [self._points(p, width, height) for p in self.include], 255)
+        else:
+            mask = np.full((height, width), 255, dtype=np.uint8)
+        if self.crop is not None:
+            x1, y1, x2, y2 = self._points(np.asarray(self.crop, dtype=np.float64).reshape(2, 2),
+                                          width, height).ravel()
+            x1, x2 = max(0, x1), min(width, x2)
+            y1, y2 = max(0, y1), min(height, y2)
+            cropped = np.zeros_like(mask)
+            cropped[y1:y2, x1:x2] = mask[y1:y2, x1:x2]
+            mask = cropped
+        if self.exclude:
+            cv2.fillPoly(mask, [self._points(p, width, height) for p in self.exclude], 0)
+
+        points = cv2.findNonZero(mask)
+        if points is None:
+            raise ValueError(f"Region leaves nothing of a {width}x{height} frame")
+        x, y, w, h = cv2.boundingRect(points)
+        self._window = (x, y, x + w, y + h)
+        window_mask = mask[y:y + h, x:x + w]
+        # A plain rectangle needs no zeroing, only slicing
+        self._mask = None if cv2.countNonZero(window_mask) == w * h else window_mask
+        self._shape = shape[:2]
+
+    def window(self, shape):
+        """
+        Bounding box (x1, y1, x2, y2) of the active region for a frame shape
+        """
+        if self._shape != tuple(shape[:2]):
+            self._build(shape)
+        return self._window
+
+    def apply(self, frame, roi=None):
+        """
+        Return (image, (x, y)): the part of frame to infer on, masked
+        pixels zeroed, and its offset in frame. roi=(x1, y1, x2, y2)
+        narrows it further, e.g. to an ROI tracker crop.
+        """
+        wx1, wy1, wx2, wy2 = self.window(frame.shape)
+        x1, y1, x2, y2 = wx1, wy1, wx2, wy2
+        if roi is not None:
+            rx1, ry1, rx2, ry2 = roi
+            if min(wx2, rx2) > max(wx1, rx1) and min(wy2, ry2) > max(wy1, ry1):
+                x1, y1, x2, y2 = max(wx1, rx1), max(wy1, ry1), min(wx2, rx2), min(wy2, ry2)
+        image = frame[y1:y2, x1:x2]
+        if self._mask is not None:
+            # The frame is shared with the recorder and preview, zero a copy
+            masked = np.zeros_like(image)
+            cv2.copyTo(image, self._mask[y1 - wy1:y2 - wy1, x1 - wx1:x2 - wx1], masked)
+            image = masked
+        self.frames += 1
+        self.pixels_in += frame.shape[0] * frame.shape[1]
+        self.pixels_out += image.shape[0] * image.shape[1]
+        return image, (x1, y1)
+
+    def stats(self):
+        return {
+            "window": self._window,
+            "masked": self._mask is not None,
+            "frames": self.frames,
+            "input_fraction": self.pixels_out / self.pixels_in if self.pixels_in else 1.0,
+        }
+
+    def print_stats(self, name):
+        s = self.stats()
+        if s["window"] is None:
+            return
+        x1, y1, x2, y2 = s["window"]
+        print(f"📊 [{name}] region: {x2 - x1}x{y2 - y1} at ({x1}, {y1})"
+              f"{' masked' if s['masked'] else ''}, {s['input_fraction']*100:.0f}% of frame pixels inferred")
@@ -0,0 +1,164 @@
+"""
+Detection-guided region-of-interest tracking.
+
+While a camera has fire in view, running the model on the full frame at
+full rate mostly re-confirms the same region. RoiTracker follows the fire
+boxes between frames (IoU matching with a constant-velocity prediction) and
+tells the engine to infer on a padded crop around them at a small input
+size instead. A full-frame pass still runs every full_frame_interval seconds
+so new ignition points elsewhere in the view are caught.
+
+Crop results are mapped back to full-frame coordinates with offset_result(),
+so the rest of the pipeline never sees crop coordinates.
+"""
+
+import numpy as np
+
+
+def offset_result(result, frame, offset):
+    """
+    Return a copy of an ultralytics result from a crop with its boxes moved
+    by offset=(x, y) onto the full frame
+    """
+    from ultralytics.engine.results import Results
+
+    data = None
+    if result.boxes is not None:
+        data = result.boxes.data.clone()
+        if len(data):
+            data[:, [0, 2]] += offset[0]
+            data[:, [1, 3]] += offset[1]
+    mapped = Results(frame, path=result.path, names=result.names, boxes=data)
+    mapped.speed = result.speed
+    return mapped
+
+
+def _iou_matrix(a, b):
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+class RoiTracker:
+    """
+    Per-camera tracker deciding between full-frame and crop inference.
+    """
+
+    def __init__(self, padding=0.5, min_size=256, crop_imgsz=320, full_frame_interval=1.0, max_misses=3,
+                 max_area_fraction=0.5, classes=(0,), iou_threshold=0.1, smoothing=0.5):
+        self.padding = padding
+        self.min_size = min_size
+        self.crop_imgsz = crop_imgsz
+        self.full_frame_interval = full_frame_interval
+        self.max_misses = max_misses
+        self.max_area_fraction = max_area_fraction
+        self.classes = tuple(classes)
+        self.iou_threshold = iou_threshold
+        self.smoothing = smoothing
+
+        # Each track: [box (4,), velocity (4,), misses]
+        self.tracks = []
+        self.last_full = 0.0
+
+        # Statistics
+        self.full_passes = 0
+        self.roi_passes = 0
+        self.roi_pixels = 0
+
+    @property
+    def active(self):
+        return bool(self.tracks)
+
+    def plan(self, frame_shape, now):
+        """
+        Return the (x1, y1, x2, y2) crop to infer on, or None for a full-frame pass
+        """
+        if not self.tracks or now - self.last_full >= self.full_frame_interval:
+            return None
+        height, width = frame_shape[:2]
+        boxes = np.array([box + velocity for box, velocity, _ in self.tracks])
+        x1, y1 = boxes[:, 0].min(), boxes[:, 1].min()
+        x2, y2 = boxes[:, 2].max(), boxes[:, 3].max()
+
+        pad = self.padding * max(x2 - x1, y2 - y1)
+        x1, y1, x2, y2 = x1 - pad, y1 - pad, x2 + pad, y2 + pad
+        # Grow small regions to min_size around their centre
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        half_w = max(x2 - x1, min(self.min_size, width)) / 2
+        half_h = max(y2 - y1, min(self.min_size, height)) / 2
+        x1, x2 = int(max(0, cx - half_w)), int(min(width, cx + half_w))
+        y1, y2 = int(max(0, cy - half_h)), int(min(height, cy + half_h))
+
+        if x2 <= x1 or y2 <= y1 or (x2 - x1) * (y2 - y1) > self.max_area_fraction * width * height:
+            return None
+        return x1, y1, x2, y2
+
+    def update(self, detections, now, roi=None):
+        """
+        Feed the full-frame detections ((N, 6) array) of the latest pass;
+        roi is the crop that was inferred, or None for a full-frame pass
+        """
+        if roi is None:
+            self.last_full = now
+            self.full_passes += 1
+        else:
+            self.roi_passes += 1
+            self.roi_pixels += (roi[2] - roi[0]) * (roi[3] - roi[1])
+
+        boxes = np.zeros((0, 4), dtype=np.float32)
+        if detections is not None and len(detections):
+            keep = np.isin(detections[:, 5].astype(int), self.classes)
+            boxes = detections[keep, :4]
+
+        matched_tracks, matched_boxes = set(), set()
+        if self.tracks and len(boxes):
+            predicted = np.array([box + velocity for box, velocity, _ in self.tracks])
+            ious = _iou_matrix(predicted, boxes)
+            # Greedy matching, best overlaps first
+            for index in np.argsort(-ious, axis=None):
+                t, b = divmod(int(index), len(boxes))
+                if ious[t, b] < self.iou_threshold:
+                    break
+                if t in matched_tracks or b in matched_boxes:
+                    continue
+                box, velocity, _ = self.tracks[t]
+                new_velocity = self.smoothing * (boxes[b] - box) + (1 - self.smoothing) * velocity
+                self.tracks[t] = [boxes[b].copy(), new_velocity, 0]
+                matched_tracks.add(t)
+                matched_boxes.add(b)
+
+        survivors = []
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                box, velocity, misses = track
+                track = [box + velocity, velocity, misses + 1]
+                if track[2] > self.max_misses:
+                    continue
+            survivors.append(track)
+        for b, box in enumerate(boxes):
+            if b not in matched_boxes:
+                survivors.append([box.copy(), np.zeros(4, dtype=np.float32), 0])
+        self.tracks = survivors
+
+    def reset(self):
+        self.tracks = []
+
+    def stats(self):
+        passes = self.full_passes + self.roi_passes
+        return {
+            "tracks": len(self.tracks),
+            "full_passes": self.full_passes,
+            "roi_passes": self.roi_passes,
+            "roi_fraction": self.roi_passes / passes if passes else 0.0,
+            "avg_roi_pixels": self.roi_pixels / self.roi_passes if self.roi_passes else 0.0,
+        }
+
+    def print_stats(self, name):
+        s = self.stats()
+        print(f"📊 [{name}] ROI tracker: {s['roi_passes']} crop passes, {s['full_passes']} full-frame passes "
+              f"({s['roi_fraction']*100:.0f}% crops), {s['tracks']} active tracks")
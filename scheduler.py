@@ -0,0 +1,107 @@
+"""
+Adaptive per-camera inference rate.
+
+Instead of inferring on every frame it reads, a camera with an
+InferenceScheduler is only sent to the model when it is due:
+
+    idle_rate    no fire (or fire evidence) for idle_after seconds
+    active_rate  while fire is detected, fire confidence below the alert
+                 threshold is rising, or fire was seen recently
+
+The rate is then capped by what the host can actually deliver: if the
+rolling p90 of measured inference latency for this camera's batches is
+longer than the frame budget (1 / rate), the camera backs off to
+headroom / p90. Frames between inferences are handed on with result=None,
+like gated frames, so recording is unaffected.
+"""
+
+from collections import deque
+
+import numpy as np
+
+
+class InferenceScheduler:
+    """
+    Decides per frame whether a camera is due for inference.
+    """
+
+    def __init__(self, idle_rate=1.0, active_rate=10.0, idle_after=30.0, watch_conf=0.25, fire_class=0,
+                 min_rate=0.2, headroom=0.9, latency_window=30):
+        self.idle_rate = idle_rate
+        self.active_rate = active_rate
+        self.idle_after = idle_after
+        self.watch_conf = watch_conf
+        self.fire_class = fire_class
+        self.min_rate = min_rate
+        self.headroom = headroom
+
+        self.rate = idle_rate
+        self.target_rate = idle_rate
+        self.backed_off = False
+        self._latencies = deque(maxlen=latency_window)
+        self._latency_p90 = 0.0
+        self._last_run = None
+        self._last_active = None
+        self._conf_ema = 0.0
+
+        # Statistics
+        self.frames_due = 0
+        self.frames_throttled = 0
+
+    def due(self, now):
+        """
+        Return True if the camera should be inferred on at time now
+        """
+        if self._last_run is None or now - self._last_run >= 1.0 / self.rate:
+            self._last_run = now
+            self.frames_due += 1
+            return True
+        self.frames_throttled += 1
+        return False
+
+    def observe(self, now, latency, detections=None, fire_detected=False):
+        """
+        Feed one inference: the batch latency in seconds, the (N, 6)
+        detections (at watch_conf or above) and the camera's fire state
+        """
+        self._latencies.append(latency)
+        self._latency_p90 = float(np.percentile(self._latencies, 90))
+
+        peak = 0.0
+        if detections is not None and len(detections):
+            fire = detections[detections[:, 5].astype(int) == self.fire_class]
+            if len(fire):
+                peak = float(fire[:, 4].max())
+        rising = peak >= self.watch_conf and peak > self._conf_ema
+        self._conf_ema = 0.7 * self._conf_ema + 0.3 * peak
+
+        if fire_detected or rising:
+            self._last_active = now
+        active = self._last_active is not None and now - self._last_active < self.idle_after
+        self.target_rate = self.active_rate if active else self.idle_rate
+        self._update_rate()
+
+    def _update_rate(self):
+        rate = self.target_rate
+        self.backed_off = False
+        if self._latency_p90 > 1.0 / rate:
+            # Inference cannot keep up with the frame budget, back off
+            rate = self.headroom / self._latency_p90
+            self.backed_off = True
+        self.rate = max(self.min_rate, rate)
+
+    def stats(self):
+        return {
+            "rate": self.rate,
+            "target_rate": self.target_rate,
+            "backed_off": self.backed_off,
+            "latency_p90_ms": self._latency_p90 * 1000,
+            "frames_due": self.frames_due,
+            "frames_throttled": self.frames_throttled,
+        }
+
+    def print_stats(self, name):
+        s = self.stats()
+        state = " (backed off)" if s["backed_off"] else ""
+        print(f"📊 [{name}] scheduler: {s['rate']:.1f}/{s['target_rate']:.1f} inferences/s{state}, "
+              f"p90 latency {s['latency_p90_ms']:.0f}ms, {s['frames_throttled']} frames throttled")
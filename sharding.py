@@ -0,0 +1,413 @@
+"""
+Process-per-core camera sharding.
+
+One Python process cannot keep many cameras busy: YOLO pre- and
+post-processing, decoding and encoding all contend for the GIL. The
+ShardSupervisor splits the pipeline into processes instead:
+
+    capture   one process per camera, writes frames into that camera's
+              SharedFrameRing
+    inference N worker processes, each owning a shard of the cameras; they
+              read the newest frame of every camera in their shard straight
+              from shared memory, run one batched predict and send back only
+              the detections
+    recorder  one process that follows every ring frame by frame, with a
+              short lag so detections have arrived, and feeds ClipRecorders
+
+Frames never go through a pickle: only detections, clip notifications and
+statistics travel over queues. The supervisor (the main process) owns the
+rings, aggregates detections and clips in one place for alerting, and
+restarts any process that dies, with exponential backoff.
+"""
+
+import multiprocessing
+import os
+import queue
+import random
+import time
+
+import numpy as np
+
+from shared_ring import SharedFrameRing
+
+# Set in the environment of every shard process, so main.py can skip its
+# import-time model load in processes that do not need it
+SHARD_CHILD_ENV = "FIRE_SHARD_CHILD"
+
+FIRE_CLASS = 0
+
+
+def _capture_main(name, source, ring_name, ring_args, stop_event):
+    import cv2
+
+    from engine import open_camera
+
+    cv2.setNumThreads(1)
+    ring = SharedFrameRing(ring_name, **ring_args)
+    cap = open_camera(source)
+    if cap is None:
+        raise SystemExit(f"[{name}] camera not available")
+    failures = 0
+    try:
+        while not stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret or frame is None:
+                failures += 1
+                if failures >= 50:
+                    raise SystemExit(f"[{name}] camera lost")
+                time.sleep(0.02)
+                continue
+            failures = 0
+            ring.write(frame, time.time())
+    finally:
+        cap.release()
+        ring.close()
+
+
+def _inference_main(worker_id, cameras, ring_args, model_args, conf, events, stop_event, threads, regions=None):
+    import cv2
+
+    from annotation import detections_from_result
+    from backends import load_model
+    from region_mask import RegionMask, offset_detections
+
+    cv2.setNumThreads(1)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    model = load_model(**model_args)
+    rings = {name: SharedFrameRing(ring_name, **ring_args) for name, ring_name in cameras}
+    masks = {name: RegionMask(**settings) for name, settings in (regions or {}).items() if name in rings}
+    last_seq = {name: -1 for name in rings}
+    buffers = {}
+    frames_inferred = 0
+    busy = 0.0
+    last_report = time.time()
+
+    try:
+        while not stop_event.is_set():
+            batch = []
+            for name, ring in rings.items():
+                seq = ring.head
+                if seq <= last_seq[name]:
+                    continue
+                shape = ring.frame_shape(seq)
+                if shape is None:
+                    continue
+                buffer = buffers.get(name)
+                if buffer is None or buffer.shape != shape:
+                    buffer = buffers[name] = np.empty(shape, dtype=np.uint8)
+                frame, timestamp = ring.read(seq, buffer)
+                if frame is not None:
+                    offset = None
+                    if name in masks:
+                        frame, offset = masks[name].apply(frame)
+                    batch.append((name, seq, timestamp, frame, offset))
+                    last_seq[name] = seq
+
+            if not batch:
+                time.sleep(0.005)
+            else:
+                start = time.perf_counter()
+                results = model.predict(source=[item[3] for item in batch], conf=conf, verbose=False)
+                busy += time.perf_counter() - start
+                frames_inferred += len(batch)
+                for (name, seq, timestamp, _, offset), result in zip(batch, results):
+                    detections = detections_from_result(result)
+                    if offset is not None:
+                        detections = offset_detections(detections, offset)
+                    events.put(("detection", name, seq, timestamp, detections))
+
+            now = time.time()
+            if now - last_report >= 5.0:
+                events.put(("stats", f"inference-{worker_id}", {
+                    "frames_inferred": frames_inferred,
+                    "fps": frames_inferred / (now - last_report),
+                    "busy": busy / (now - last_report),
+                }))
+                frames_inferred, busy, last_report = 0, 0.0, now
+    finally:
+        for ring in rings.values():
+            ring.close()
+
+
+def _recorder_main(cameras, ring_args, output_dir, recorder_args, labels, commands, events, stop_event, lag):
+    from frame_pool import FramePool
+    from recorder import ClipRecorder
+
+    rings = {name: SharedFrameRing(ring_name, **ring_args) for name, ring_name in cameras}
+    recorders, pools, cursors, detections = {}, {}, {}, {}
+    for name, ring in rings.items():
+        recorders[name] = ClipRecorder(
+            name, output_dir, labels=labels,
+            on_clip=lambda path, info, name=name: events.put(("clip", name, path, info)),
+            **recorder_args).start()
+        pools[name] = FramePool(size=64, name=f"recorder-{name}")
+        cursors[name] = ring.head + 1
+        detections[name] = {}
+    frames_lost = 0
+    last_report = time.time()
+
+    try:
+        while not stop_event.is_set():
+            while True:
+                try:
+                    _, name, seq, _, found = commands.get_nowait()
+                except queue.Empty:
+                    break
+                if name in detections:
+                    detections[name][seq] = found
+
+            cutoff = time.time() - lag
+            for name, ring in rings.items():
+                head = ring.head
+                cursor = cursors[name]
+                oldest = head - ring.slots + 2
+                if cursor < oldest:
+                    # Fell a whole ring behind, skip to what is still there
+                    frames_lost += oldest - cursor
+                    cursor = oldest
+                while cursor <= head:
+                    shape = ring.frame_shape(cursor)
+                    timestamp = ring.timestamp(cursor)
+                    if shape is None or timestamp is None:
+                        frames_lost += 1
+                        cursor += 1
+                        continue
+                    if timestamp > cutoff:
+                        # Too recent, its detections may still be on the way
+                        break
+                    pool = pools[name]
+                    if pool.shape != shape:
+                        pool.configure(shape)
+                    slot = pool.get()
+                    frame, timestamp = ring.read(cursor, slot.array)
+                    if frame is None:
+                        frames_lost += 1
+                    else:
+                        found = detections[name].pop(cursor, None)
+                        fire = found is not None and bool((found[:, 5].astype(int) == FIRE_CLASS).any())
+                        recorders[name].add_frame(slot, timestamp, fire, found)
+                    slot.release()
+                    cursor += 1
+                cursors[name] = cursor
+                if detections[name]:
+                    detections[name] = {seq: d for seq, d in detections[name].items() if seq >= cursor}
+
+            now = time.time()
+            if now - last_report >= 5.0:
+                events.put(("stats", "recorder", {
+                    "frames_lost": frames_lost,
+                    "queue_depth": sum(r.stats()["queue_depth"] for r in recorders.values()),
+                    "clips_written": sum(r.clips_written for r in recorders.values()),
+                }))
+                last_report = now
+            time.sleep(0.01)
+    finally:
+        for recorder in recorders.values():
+            recorder.stop()
+        for ring in rings.values():
+            ring.close()
+
+
+class _ManagedProcess:
+    def __init__(self, key, target, args):
+        self.key = key
+        self.target = target
+        self.args = args
+        self.process = None
+        self.started = 0.0
+        self.restarts = 0
+        self.delay = 0.0
+        self.restart_at = None
+
+
+class ShardSupervisor:
+    """
+    Runs capture, inference and recorder processes for a set of cameras
+    and aggregates their detections and clips in the calling process.
+
+    on_detection(camera, seq, timestamp, detections) and
+    on_clip(camera, path, info) are called from poll().
+    """
+
+    def __init__(self, cameras, model_path, workers=None, threads_per_worker=1, backend="pytorch", int8=False,
+                 conf=0.6, ring_slots=32, max_frame_size=(1280, 720), output_dir="fire_recordings",
+                 recorder_args=None, recorder_lag=0.5, labels=None, on_detection=None, on_clip=None,
+                 restart_delay=1.0, max_restart_delay=30.0, regions=None):
+        self.cameras = list(cameras)
+        self.model_args = {"model_path": model_path, "backend": backend, "int8": int8}
+        cores = os.cpu_count() or 1
+        self.workers = workers or max(1, min(len(self.cameras), cores // max(1, threads_per_worker)))
+        self.threads_per_worker = threads_per_worker
+        self.conf = conf
+        self.ring_args = {"slots": ring_slots, "max_width": max_frame_size[0], "max_height": max_frame_size[1]}
+        self.output_dir = output_dir
+        self.recorder_args = recorder_args or {}
+        self.recorder_lag = recorder_lag
+        # RegionMask settings per camera name, applied in the inference workers
+        self.regions = regions or {}
+        self.labels = labels
+        self.on_detection = on_detection
+        self.on_clip = on_clip
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self._rings = {}
+        self._processes = {}
+        self._events = None
+        self._commands = None
+        self._stop = None
+        self._running = False
+
+        # Statistics
+        self.detections = 0
+        self.commands_dropped = 0
+        self.process_stats = {}
+
+    def _ring_name(self, index):
+        # POSIX shared memory names are short on some platforms
+        return f"fd{os.getpid()}_{index}"
+
+    def start(self):
+        self._events = self._ctx.Queue()
+        self._commands = self._ctx.Queue(maxsize=10000)
+        self._stop = self._ctx.Event()
+
+        ring_names = []
+        for index, (name, _) in enumerate(self.cameras):
+            ring = SharedFrameRing(self._ring_name(index), create=True, **self.ring_args)
+            self._rings[name] = ring
+            ring_names.append((name, ring.name))
+
+        for (name, source), (_, ring_name) in zip(self.cameras, ring_names):
+            self._add(f"capture-{name}", _capture_main, (name, source, ring_name, self.ring_args, self._stop))
+        for worker_id in range(self.workers):
+            shard = ring_names[worker_id::self.workers]
+            if shard:
+                self._add(f"inference-{worker_id}", _inference_main,
+                          (worker_id, shard, self.ring_args, self.model_args, self.conf, self._events, self._stop,
+                           self.threads_per_worker, self.regions))
+        self._add("recorder", _recorder_main,
+                  (ring_names, self.ring_args, self.output_dir, self.recorder_args, self.labels, self._commands,
+                   self._events, self._stop, self.recorder_lag))
+
+        self._running = True
+        for managed in self._processes.values():
+            self._spawn(managed)
+        print(f"🧩 Sharding {len(self.cameras)} camera(s) over {self.workers} inference worker(s) "
+              f"x {self.threads_per_worker} thread(s)")
+        return self
+
+    def _add(self, key, target, args):
+        self._processes[key] = _ManagedProcess(key, target, args)
+
+    def _spawn(self, managed):
+        os.environ[SHARD_CHILD_ENV] = "1"
+        try:
+            process = self._ctx.Process(target=managed.target, args=managed.args, name=managed.key, daemon=True)
+            process.start()
+        finally:
+            os.environ.pop(SHARD_CHILD_ENV, None)
+        managed.process = process
+        managed.started = time.time()
+        managed.restart_at = None
+
+    def _check_processes(self):
+        now = time.time()
+        for managed in self._processes.values():
+            if managed.process is not None and managed.process.is_alive():
+                continue
+            if managed.restart_at is None:
+                if now - managed.started > 60.0:
+                    # It ran fine for a while, start over with a short delay
+                    managed.delay = 0.0
+                managed.delay = min(self.max_restart_delay, max(self.restart_delay, managed.delay * 2))
+                # Jitter keeps cameras lost together from reconnecting in lockstep
+                wait = managed.delay + random.uniform(0, managed.delay / 2)
+                managed.restart_at = now + wait
+                exitcode = managed.process.exitcode if managed.process is not None else None
+                print(f"⚠️ {managed.key} exited (code {exitcode}), restarting in {wait:.1f}s")
+            elif now >= managed.restart_at:
+                managed.restarts += 1
+                self._spawn(managed)
+
+    def poll(self, timeout=0.1):
+        """
+        Handle queued events, restart dead processes. Call regularly.
+        """
+        deadline = time.time() + timeout
+        while True:
+            try:
+                event = self._events.get(timeout=max(0.0, deadline - time.time()))
+            except queue.Empty:
+                break
+            kind = event[0]
+            if kind == "detection":
+                _, name, seq, timestamp, detections = event
+                self.detections += 1
+                if len(detections):
+                    try:
+                        self._commands.put_nowait(event)
+                    except queue.Full:
+                        self.commands_dropped += 1
+                if self.on_detection is not None:
+                    try:
+                        self.on_detection(name, seq, timestamp, detections)
+                    except Exception as e:
+                        print(f"❌ [{name}] Detection handler error: {str(e)}")
+            elif kind == "clip":
+                _, name, path, info = event
+                if self.on_clip is not None:
+                    try:
+                        self.on_clip(name, path, info)
+                    except Exception as e:
+                        print(f"❌ [{name}] Clip handler error: {str(e)}")
+            elif kind == "stats":
+                self.process_stats[event[1]] = event[2]
+        if self._running:
+            self._check_processes()
+
+    def stats(self):
+        heads = {name: ring.head + 1 for name, ring in self._rings.items()}
+        inference = [s for key, s in self.process_stats.items() if key.startswith("inference")]
+        return {
+            "workers": self.workers,
+            "frames_captured": heads,
+            "detections": self.detections,
+            "inference_fps": sum(s["fps"] for s in inference),
+            "restarts": {key: m.restarts for key, m in self._processes.items() if m.restarts},
+            "processes": dict(self.process_stats),
+            "commands_dropped": self.commands_dropped,
+        }
+
+    def print_stats(self):
+        s = self.stats()
+        print(f"📊 Shards: {s['workers']} workers, {s['inference_fps']:.1f} inferred frames/s total, "
+              f"{s['detections']} results, restarts: {s['restarts'] or 'none'}")
+        for key, stats in sorted(s["processes"].items()):
+            if key.startswith("inference"):
+                print(f"   {key}: {stats['fps']:.1f} fps, {stats['busy']*100:.0f}% busy")
+            else:
+                print(f"   {key}: {stats}")
+
+    def stop(self, timeout=10.0):
+        if not self._running:
+            return
+        self._running = False
+        self._stop.set()
+        deadline = time.time() + timeout
+        for managed in self._processes.values():
+            if managed.process is not None:
+                managed.process.join(timeout=max(0.1, deadline - time.time()))
+                if managed.process.is_alive():
+                    managed.process.terminate()
+        # Deliver the last clip notifications
+        self.poll(timeout=0.2)
+        for ring in self._rings.values():
+            ring.close()
+        self._rings = {}
@@ -0,0 +1,153 @@
+"""
+Shared-memory frame ring for passing frames between processes.
+
+One producer (a camera's capture process) writes frames into a fixed ring
+of slots inside a multiprocessing.shared_memory block; any number of
+consumers in other processes (inference workers, the recorder) read them
+by sequence number without pickling. Each slot is guarded by a sequence
+lock: the writer marks a slot as being written, copies the frame and then
+publishes its sequence number, and a reader only accepts a frame if the
+slot still carries the same sequence number after copying it out.
+
+Block layout:
+
+    int64  head                     last published sequence number (-1: none)
+    int64  meta[slots, 4]           seq_begin, seq_end, height, width
+    float64 timestamps[slots]
+    uint8  frames[slots, max_height, max_width, 3]
+"""
+
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+_META_FIELDS = 4
+
+
+def ring_bytes(slots, max_height, max_width):
+    return 8 + slots * _META_FIELDS * 8 + slots * 8 + slots * max_height * max_width * 3
+
+
+class SharedFrameRing:
+    """
+    Fixed-size ring of frames in shared memory.
+    """
+
+    def __init__(self, name, slots=32, max_height=720, max_width=1280, create=False):
+        self.name = name
+        self.slots = slots
+        self.max_height = max_height
+        self.max_width = max_width
+        self.created = create
+        if create:
+            self._shm = shared_memory.SharedMemory(name=name, create=True,
+                                                   size=ring_bytes(slots, max_height, max_width))
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+
+        buf = self._shm.buf
+        offset = 0
+        self._head = np.ndarray((1,), dtype=np.int64, buffer=buf, offset=offset)
+        offset += 8
+        self._meta = np.ndarray((slots, _META_FIELDS), dtype=np.int64, buffer=buf, offset=offset)
+        offset += slots * _META_FIELDS * 8
+        self._timestamps = np.ndarray((slots,), dtype=np.float64, buffer=buf, offset=offset)
+        offset += slots * 8
+        self._frames = np.ndarray((slots, max_height, max_width, 3), dtype=np.uint8, buffer=buf, offset=offset)
+
+        if create:
+            self._head[0] = -1
+            self._meta[:] = -1
+
+        # Statistics (per process)
+        self.frames_written = 0
+        self.frames_resized = 0
+        self.torn_reads = 0
+
+    @property
+    def head(self):
+        """
+        Sequence number of the newest frame, -1 before the first one
+        """
+        return int(self._head[0])
+
+    def fit(self, frame):
+        """
+        Downscale a frame that is larger than the ring's frame size
+        """
+        height, width = frame.shape[:2]
+        if height <= self.max_height and width <= self.max_width:
+            return frame
+        scale = min(self.max_height / height, self.max_width / width)
+        self.frames_resized += 1
+        return cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+
+    def write(self, frame, timestamp):
+        """
+        Publish a frame (single producer only); returns its sequence number
+        """
+        frame = self.fit(frame)
+        height, width = frame.shape[:2]
+        seq = self.head + 1
+        index = seq % self.slots
+        meta = self._meta[index]
+        meta[0] = seq
+        self._frames[index, :height, :width] = frame
+        self._timestamps[index] = timestamp
+        meta[2] = height
+        meta[3] = width
+        meta[1] = seq
+        self._head[0] = seq
+        self.frames_written += 1
+        return seq
+
+    def frame_shape(self, seq):
+        """
+        (height, width, 3) of frame seq, or None if it is no longer in the ring
+        """
+        meta = self._meta[seq % self.slots]
+        if meta[1] != seq:
+            return None
+        return int(meta[2]), int(meta[3]), 3
+
+    def timestamp(self, seq):
+        """
+        Capture time of frame seq, or None if it is no longer in the ring
+        """
+        index = seq % self.slots
+        if self._meta[index][1] != seq:
+            return None
+        return float(self._timestamps[index])
+
+    def read(self, seq, out=None):
+        """
+        Copy frame seq out of the ring. Returns (frame, timestamp), or
+        (None, None) if it was overwritten before or while it was copied.
+        out, if given, must have the frame's shape.
+        """
+        index = seq % self.slots
+        meta = self._meta[index]
+        if meta[1] != seq:
+            return None, None
+        height, width = int(meta[2]), int(meta[3])
+        timestamp = float(self._timestamps[index])
+        source = self._frames[index, :height, :width]
+        if out is None:
+            out = source.copy()
+        else:
+            np.copyto(out, source)
+        if meta[0] != seq or meta[1] != seq:
+            self.torn_reads += 1
+            return None, None
+        return out, timestamp
+
+    def close(self):
+        # Drop our views before closing the mapping
+        self._head = self._meta = self._timestamps = self._frames = None
+        self._shm.close()
+        if self.created:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,645 @@
+"""
+Simulation harness for end-to-end tests without real cameras or services.
+
+Stand-ins, all on localhost:
+
+    VirtualCamera     MJPEG camera replaying idle frames (non_fire.png or
+                      video files) and, from fire_at seconds after start,
+                      fire frames (fire.33.png), at a controlled frame rate
+    StubAlertServer   Telegram Bot API and Twilio REST API (sms and call)
+    StubSmtpServer    SMTP server for the email alerts
+
+Every stub records what it received and when, so the time from the first
+fire frame a camera sent to the alert arriving is measured end to end.
+
+serve starts the stand-ins and prints the settings that point main.py at
+them, so the menu options and the live loop can be tried safely:
+
+    python simulation.py serve --cameras 2 --fire-at 30
+
+load runs the detection engine, recorders, alert media, dispatcher and
+email transport against N virtual cameras at each scale point and reports
+throughput, dropped frames and fire-to-alert latency per channel as JSON:
+
+    python simulation.py load --scale 1 2 4 8 --duration 30 --output load.json
+
+Channel rate limits are off in the load test so every camera's alert counts.
+"""
+
+import argparse
+import email
+import json
+import os
+import shutil
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from email.header import decode_header, make_header
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import cv2
+
+from alert_media import AlertMediaBuilder
+from alerts import Alert, AlertDispatcher, TelegramChannel, TwilioChannel
+from benchmark import latency_stats
+from email_transport import EmailJob, EmailTransport
+from engine import CameraState, DetectionEngine, process_result
+from mjpeg_stream import StubMjpegServer
+from model_cache import hardware_fingerprint
+from recorder import ClipRecorder
+
+IDLE_SOURCES = ["non_fire.png"]
+FIRE_SOURCES = ["fire.33.png"]
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+ALERT_CHANNELS = ["telegram", "sms", "email"]
+
+
+def load_frames(paths, size=(1280, 720), max_frames=300):
+    """
+    Load images and video files as frames resized to size=(width, height).
+    Long videos are sampled evenly down to max_frames.
+    """
+    frames = []
+    for path in paths:
+        if path.lower().endswith(VIDEO_EXTENSIONS):
+            cap = cv2.VideoCapture(path)
+            total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+            step = max(1, total // max_frames)
+            index = 0
+            while len(frames) < max_frames:
+                ret = cap.grab()
+                if not ret:
+                    break
+                if index % step == 0:
+                    ret, frame = cap.retrieve()
+                    if ret:
+                        frames.append(cv2.resize(frame, size, interpolation=cv2.INTER_LINEAR))
+                index += 1
+            cap.release()
+        else:
+            image = cv2.imread(path)
+            if image is None:
+                print(f"⚠️ Could not read {path}")
+                continue
+            frames.append(cv2.resize(image, size, interpolation=cv2.INTER_LINEAR))
+    if not frames:
+        raise FileNotFoundError(f"No frames could be loaded from {paths}")
+    return frames
+
+
+class VirtualCamera(StubMjpegServer):
+    """
+    MJPEG camera showing idle frames, and fire frames from fire_at seconds
+    after start() for fire_duration seconds.
+    """
+
+    def __init__(self, name, idle_frames, fire_frames, fps=10.0, fire_at=None, fire_duration=10.0,
+                 host="127.0.0.1", port=0, quality=80):
+        super().__init__(idle_frames, fps=fps, host=host, port=port, quality=quality)
+        self.name = name
+        self.fire_jpegs = [cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+                           for frame in fire_frames]
+        self.fire_at = fire_at
+        self.fire_duration = fire_duration
+        self.started = None
+        # Wall time the first fire frame went out, the reference for alert latency
+        self.fire_sent_at = None
+        self.fire_frames_sent = 0
+
+    def start(self):
+        self.started = time.time()
+        return super().start()
+
+    def trigger(self, duration=None):
+        """
+        Show fire from now on, for duration seconds
+        """
+        self.fire_at = time.time() - self.started
+        if duration is not None:
+            self.fire_duration = duration
+
+    @property
+    def on_fire(self):
+        if self.fire_at is None or self.started is None:
+            return False
+        elapsed = time.time() - self.started
+        return self.fire_at <= elapsed < self.fire_at + self.fire_duration
+
+    def next_jpeg(self, index):
+        if not self.on_fire:
+            return super().next_jpeg(index)
+        if self.fire_sent_at is None:
+            self.fire_sent_at = time.time()
+        self.fire_frames_sent += 1
+        return self.fire_jpegs[index % len(self.fire_jpegs)]
+
+
+class _Inbox:
+    """
+    Thread-safe log of what a stub server received.
+    """
+
+    def __init__(self):
+        self.messages = []
+        self._lock = threading.Lock()
+
+    def record(self, channel, text, size, received=None, **extra):
+        message = dict(channel=channel, received=time.time() if received is None else received, text=text,
+                       bytes=size, **extra)
+        with self._lock:
+            self.messages.append(message)
+        return message
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.messages)
+
+    def clear(self):
+        with self._lock:
+            self.messages = []
+
+
+def _form_fields(content_type, body):
+    """
+    Text fields of a urlencoded or multipart/form-data request body
+    """
+    if content_type.lower().startswith("multipart/"):
+        message = email.message_from_bytes(f"Content-Type: {content_type}\r\n\r\n".encode("ascii") + body)
+        fields = {}
+        for part in message.get_payload() if message.is_multipart() else []:
+            name = part.get_param("name", header="content-disposition")
+            if name and part.get_filename() is None:
+                fields[name] = part.get_payload(decode=True).decode("utf-8", "replace")
+        return fields
+    return {key: values[0] for key, values in parse_qs(body.decode("utf-8", "replace")).items()}
+
+
+class StubAlertServer(_Inbox):
+    """
+    Local Telegram Bot API and Twilio REST API. Point TELEGRAM_API_URL and
+    TWILIO_API_URL at url; delay simulates a slow upstream service.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, delay=0.0):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def _make_handler(self):
+        stub = self
+
+        class AlertHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                received = time.time()
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                fields = _form_fields(self.headers.get("Content-Type", ""), body)
+                path = urlsplit(self.path).path
+                method = path.rsplit("/", 1)[-1]
+                if path.startswith("/bot") and method in ("sendMessage", "sendPhoto"):
+                    text = fields.get("text") or fields.get("caption", "")
+                    stub.record("telegram", text, len(body), received, photo=method == "sendPhoto")
+                    status, payload = 200, {"ok": True, "result": {"message_id": len(stub.messages)}}
+                elif path.endswith("/Messages.json"):
+                    stub.record("sms", fields.get("Body", ""), len(body), received)
+                    status, payload = 201, {"sid": f"SM{len(stub.messages):032d}", "status": "queued"}
+                elif path.endswith("/Calls.json"):
+                    stub.record("call", fields.get("Twiml", ""), len(body), received)
+                    status, payload = 201, {"sid": f"CA{len(stub.messages):032d}", "status": "queued"}
+                else:
+                    status, payload = 404, {"ok": False, "description": "Not Found"}
+                if stub.delay:
+                    time.sleep(stub.delay)
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return AlertHandler
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-alerts", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class StubSmtpServer(_Inbox):
+    """
+    Minimal SMTP server accepting any login and recording every message.
+    Use it with SMTP_USE_TLS = False. refuse maps recipient addresses to
+    the reply code RCPT gets for them (e.g. 450 or 550).
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, refuse=None):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.refuse = dict(refuse or {})
+        self._server = None
+        self._thread = None
+
+    def _make_handler(self):
+        stub = self
+
+        class SmtpHandler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(line.encode("ascii") + b"\r\n")
+
+            def handle(self):
+                self.reply("220 stub SMTP ready")
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode("ascii", "replace").strip()
+                    verb = command.split(" ", 1)[0].upper()
+                    if verb == "EHLO":
+                        self.reply("250-stub")
+                        self.reply("250-AUTH PLAIN LOGIN")
+                        self.reply("250 8BITMIME")
+                    elif verb == "AUTH":
+                        # One prompt per credential not already sent with the command
+                        words = command.split()
+                        prompts = (2 if words[1].upper() == "LOGIN" else 1) - (len(words) > 2)
+                        for _ in range(prompts):
+                            self.reply("334 ")
+                            self.rfile.readline()
+                        self.reply("235 Authentication successful")
+                    elif verb == "RCPT":
+                        address = command.split(":", 1)[-1].strip().strip("<>")
+                        code = stub.refuse.get(address)
+                        self.reply(f"{code} Recipient refused" if code else "250 OK")
+                    elif verb in ("HELO", "MAIL", "RSET", "NOOP"):
+                        self.reply("250 OK")
+                    elif verb == "DATA":
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        self.receive()
+                        self.reply("250 OK")
+                    elif verb == "QUIT":
+                        self.reply("221 Bye")
+                        return
+                    else:
+                        self.reply("502 Command not implemented")
+
+            def receive(self):
+                lines = []
+                while True:
+                    line = self.rfile.readline()
+                    if not line or line == b".\r\n":
+                        break
+                    lines.append(line[1:] if line.startswith(b"..") else line)
+                received = time.time()
+                message = email.message_from_bytes(b"".join(lines))
+                texts = [part.get_payload(decode=True).decode("utf-8", "replace") for part in message.walk()
+                         if part.get_content_type() == "text/plain"]
+                subject = str(make_header(decode_header(message.get("Subject", ""))))
+                stub.record("email", "\n".join([subject] + texts), sum(len(line) for line in lines), received,
+                            attachment=any(part.get_filename() for part in message.walk()))
+
+        return SmtpHandler
+
+    def start(self):
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer((self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-smtp", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def camera_of(text, names):
+    """
+    Camera named in an alert text (the longest name that appears), or None
+    """
+    found = [name for name in names if name in text]
+    return max(found, key=len) if found else None
+
+
+def _fire_message(camera):
+    return f"🚨🔥 Fire detected on {camera}! Immediate action required!"
+
+
+class SimulatedPipeline:
+    """
+    The live pipeline of main.py (engine, recorders, alert media,
+    dispatcher, email transport) wired to virtual cameras and stub services.
+    """
+
+    def __init__(self, model, cameras, alert_server, smtp_server, output_dir, conf=0.6, imgsz=None,
+                 max_batch=None, record=True, pre_roll=5.0, post_roll=3.0):
+        self.cameras = {camera.name: camera for camera in cameras}
+        self.dispatcher = AlertDispatcher(workers=4, verbose=False)
+        options = {"timeout": 5.0, "max_retries": 1, "backoff": 0.5}
+        self.dispatcher.add_channel(TelegramChannel("sim", "sim", base_url=alert_server.url, **options))
+        self.dispatcher.add_channel(TwilioChannel("sms", "ACsimulation", "sim", "+15550000000", "+15550000001",
+                                                  base_url=alert_server.url, **options))
+        self.transport = EmailTransport(smtp_server.host, smtp_server.port, "sim@localhost", "sim",
+                                        use_tls=False)
+        self.media = AlertMediaBuilder(os.path.join(output_dir, "alerts"), max_clip_bytes=2 * 1024 * 1024)
+        self.incidents = 0
+
+        states = []
+        for camera in cameras:
+            state = CameraState(camera.name, camera.url, camera_type="Virtual Camera")
+            if record:
+                state.recorder = ClipRecorder(camera.name, output_dir, pre_roll=pre_roll, post_roll=post_roll,
+                                              on_clip=lambda path, info, state=state: self._on_clip(state, path,
+                                                                                                    info))
+            states.append(state)
+        self.engine = DetectionEngine(model, states, on_result=self._on_result, conf=conf, imgsz=imgsz,
+                                      max_batch=max_batch)
+
+    def _on_result(self, state, result, slot, frame_time):
+        # The same recording and incident tracking as main.handle_detection()
+        _, change = process_result(state, result, slot, frame_time)
+        if change == "started":
+            self.incidents += 1
+            self.dispatcher.submit(Alert(state.incident_id, _fire_message(state.name), camera=state.name,
+                                         created=frame_time), channels=["telegram", "sms"])
+
+    def _on_clip(self, state, path, info):
+        self.media.submit(state.incident_id, state.name, path, info,
+                          on_ready=lambda media: self._send_media(state, media))
+
+    def _send_media(self, state, media):
+        if media.snapshot_path:
+            self.dispatcher.submit(Alert(media.incident_id, _fire_message(state.name), camera=state.name,
+                                         kind="media", photo=media.snapshot_path), channels=["telegram"])
+        self.transport.submit(EmailJob("alerts@localhost", f"🚨 Fire Detection Alert! ({state.name})",
+                                       _fire_message(state.name), attachment_path=media.clip_path,
+                                       attachment_type="video/mp4"))
+
+    def start(self, connect_timeout=10.0):
+        self.dispatcher.start()
+        self.transport.start()
+        self.engine.start()
+        deadline = time.time() + connect_timeout
+        while time.time() < deadline and not all(state.grabber.live for state in self.engine.cameras):
+            time.sleep(0.05)
+        return self
+
+    def run(self, duration):
+        start = time.perf_counter()
+        frames = self.engine.frames_inferred
+        while time.perf_counter() - start < duration:
+            self.engine.step()
+        return self.engine.frames_inferred - frames, time.perf_counter() - start
+
+    def capture_stats(self):
+        return [state.grabber.stats() for state in self.engine.cameras if state.grabber is not None]
+
+    def recorder_stats(self):
+        return [state.recorder.stats() for state in self.engine.cameras if state.recorder is not None]
+
+    def stop(self):
+        """
+        Stop the cameras' pipeline, then let clips, media and alerts drain
+        """
+        self.engine.stop()
+        self.media.stop()
+        self.dispatcher.stop()
+        self.transport.stop()
+
+
+def alert_latencies(cameras, messages, channels=ALERT_CHANNELS):
+    """
+    Seconds from each camera's first fire frame to the first alert about
+    it on every channel, and the cameras never alerted on each channel
+    """
+    names = [camera.name for camera in cameras]
+    fire_sent = {camera.name: camera.fire_sent_at for camera in cameras if camera.fire_sent_at}
+    first = {}
+    for message in messages:
+        name = camera_of(message["text"], names)
+        if name in fire_sent:
+            key = (message["channel"], name)
+            first[key] = min(first.get(key, message["received"]), message["received"])
+    report = {}
+    for channel in channels:
+        latencies = [first[(channel, name)] - sent for name, sent in fire_sent.items() if (channel, name) in first]
+        report[channel] = {
+            "latency_ms": latency_stats(latencies),
+            "missed": sorted(name for name in fire_sent if (channel, name) not in first),
+        }
+    return report
+
+
+def run_load_point(model, count, idle_frames, fire_frames, fps=10.0, duration=30.0, fire_at=5.0,
+                   fire_duration=10.0, conf=0.6, imgsz=None, max_batch=None, record=True, post_roll=3.0,
+                   stub_delay=0.0, work_dir=None):
+    """
+    Run the pipeline against count virtual cameras and measure it
+    """
+    output_dir = tempfile.mkdtemp(prefix="sim_clips_", dir=work_dir)
+    alert_server = StubAlertServer(delay=stub_delay).start()
+    smtp_server = StubSmtpServer().start()
+    cameras = [VirtualCamera(f"sim_cam_{i + 1:02d}", idle_frames, fire_frames, fps=fps, fire_at=fire_at,
+                             fire_duration=fire_duration) for i in range(count)]
+    pipeline = None
+    try:
+        for camera in cameras:
+            camera.start()
+        pipeline = SimulatedPipeline(model, cameras, alert_server, smtp_server, output_dir, conf=conf,
+                                     imgsz=imgsz, max_batch=max_batch, record=record, post_roll=post_roll)
+        pipeline.start()
+        frames, elapsed = pipeline.run(duration)
+        capture = pipeline.capture_stats()
+        recorders = pipeline.recorder_stats()
+        incidents = pipeline.incidents
+        pipeline.stop()
+        pipeline = None
+
+        frames_sent = sum(camera.frames_sent for camera in cameras)
+        frames_grabbed = sum(s["frames_grabbed"] for s in capture)
+        messages = alert_server.snapshot() + smtp_server.snapshot()
+        return {
+            "cameras": count,
+            "fps_per_camera": fps,
+            "duration_s": elapsed,
+            "frames_sent": frames_sent,
+            "frames_inferred": frames,
+            "throughput_fps": frames / elapsed if elapsed else 0.0,
+            # Share of the frames the cameras offered that were inferred
+            "coverage": frames / frames_sent if frames_sent else 0.0,
+            "dropped": {
+                # Sent but never read, e.g. still in socket buffers at the end
+                "transport": max(0, frames_sent - frames_grabbed),
+                # Read but superseded by a newer frame before inference
+                "capture": sum(s["frames_dropped"] for s in capture),
+                "recorder": sum(s["frames_dropped"] for s in recorders),
+            },
+            "reconnects": sum(s["reconnects"] for s in capture),
+            "fire_cameras": sum(1 for camera in cameras if camera.fire_sent_at),
+            "incidents": incidents,
+            # Email goes out with the recorded clip
+            "alerts": alert_latencies(cameras, messages, ALERT_CHANNELS if record else ["telegram", "sms"]),
+            "messages": {channel: sum(1 for message in messages if message["channel"] == channel)
+                         for channel in ALERT_CHANNELS + ["call"]},
+        }
+    finally:
+        if pipeline is not None:
+            pipeline.stop()
+        for camera in cameras:
+            camera.stop()
+        alert_server.stop()
+        smtp_server.stop()
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def run_load_test(model, scale_points=(1, 2, 4), idle_frames=None, fire_frames=None, model_name=None,
+                  **point_args):
+    """
+    Run run_load_point() at every scale point and collect a report
+    """
+    # Warm the model up so the first point does not pay for it
+    model.predict(source=[idle_frames[0]], imgsz=point_args.get("imgsz") or 640, verbose=False)
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "model": model_name,
+        "hardware": hardware_fingerprint(),
+        "settings": {k: v for k, v in point_args.items() if k != "work_dir"},
+        "points": [],
+    }
+    for count in scale_points:
+        print(f"⏱️ {count} virtual camera(s) for {point_args.get('duration', 30.0):.0f}s...", file=sys.stderr)
+        point = run_load_point(model, count, idle_frames, fire_frames, **point_args)
+        report["points"].append(point)
+        alerts = point["alerts"]
+        telegram = alerts["telegram"]["latency_ms"]
+        email_latency = alerts["email"]["latency_ms"] if "email" in alerts else None
+        print(f"📊 {count} camera(s): {point['throughput_fps']:.1f} fps inferred "
+              f"({point['coverage']:.0%} of offered), dropped {point['dropped']['capture']} in capture, "
+              f"{point['dropped']['recorder']} in recorders; fire -> telegram "
+              + (f"p50 {telegram['p50']:.0f}ms / max {telegram['max']:.0f}ms" if telegram else "never")
+              + ", email " + (f"p50 {email_latency['p50'] / 1000:.1f}s" if email_latency else "never")
+              + (f", missed {len(alerts['telegram']['missed'])}" if alerts["telegram"]["missed"] else ""),
+              file=sys.stderr)
+    return report
+
+
+def serve(cameras=1, idle=IDLE_SOURCES, fire=FIRE_SOURCES, size=(1280, 720), fps=10.0, fire_at=None,
+          fire_duration=15.0, stub_delay=0.0):
+    """
+    Run virtual cameras and stub services until Ctrl+C, printing the
+    main.py settings that use them and every message they receive
+    """
+    idle_frames, fire_frames = load_frames(idle, size), load_frames(fire, size)
+    alert_server = StubAlertServer(delay=stub_delay).start()
+    smtp_server = StubSmtpServer().start()
+    virtual = [VirtualCamera(f"sim_cam_{i + 1:02d}", idle_frames, fire_frames, fps=fps, fire_at=fire_at,
+                             fire_duration=fire_duration).start() for i in range(cameras)]
+    print("🧪 Simulation running. Settings for main.py:")
+    print(f"   CAMERA_SOURCES = {[camera.url for camera in virtual]!r}")
+    print(f'   TELEGRAM_API_URL = "{alert_server.url}"; TELEGRAM_BOT_TOKEN = "sim"; TELEGRAM_CHAT_ID = "sim"')
+    print(f'   TWILIO_API_URL = "{alert_server.url}"; TWILIO_ACCOUNT_SID = "ACsimulation"; '
+          f'TWILIO_AUTH_TOKEN = "sim"')
+    print(f'   SMTP_HOST = "{smtp_server.host}"; SMTP_PORT = {smtp_server.port}; SMTP_USE_TLS = False')
+    if fire_at is not None:
+        print(f"🔥 Cameras show fire {fire_at:.0f}s from now for {fire_duration:.0f}s")
+    print("Press Ctrl+C to quit")
+    seen = 0
+    try:
+        while True:
+            time.sleep(0.5)
+            messages = sorted(alert_server.snapshot() + smtp_server.snapshot(), key=lambda m: m["received"])
+            for message in messages[seen:]:
+                stamp = datetime.fromtimestamp(message["received"]).strftime("%H:%M:%S")
+                text = message["text"].strip().splitlines()[0] if message["text"].strip() else ""
+                print(f"📨 {stamp} {message['channel']}: {text[:80]} ({message['bytes'] / 1024:.0f}KB)")
+            seen = len(messages)
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping...")
+    for camera in virtual:
+        camera.stop()
+    alert_server.stop()
+    smtp_server.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Virtual cameras and stub alert services for end-to-end tests")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("serve", "load"):
+        command = commands.add_parser(name)
+        command.add_argument("--idle", nargs="+", default=IDLE_SOURCES, help="images or videos without fire")
+        command.add_argument("--fire", nargs="+", default=FIRE_SOURCES, help="images or videos with fire")
+        command.add_argument("--size", default="1280x720", help="frame size, WxH")
+        command.add_argument("--fps", type=float, default=10.0, help="frames per second per camera")
+        command.add_argument("--fire-duration", type=float, default=15.0)
+        command.add_argument("--stub-delay-ms", type=float, default=0.0, help="simulated service latency")
+    serve_parser = commands.choices["serve"]
+    serve_parser.add_argument("--cameras", type=int, default=1)
+    serve_parser.add_argument("--fire-at", type=float, default=None, help="seconds until the cameras show fire")
+    load_parser = commands.choices["load"]
+    load_parser.add_argument("--scale", nargs="+", type=int, default=[1, 2, 4], help="camera counts")
+    load_parser.add_argument("--duration", type=float, default=30.0, help="seconds per scale point")
+    load_parser.add_argument("--fire-at", type=float, default=5.0)
+    load_parser.add_argument("--post-roll", type=float, default=3.0)
+    load_parser.add_argument("--no-record", action="store_true", help="skip recording, clips and email")
+    load_parser.add_argument("--model", default="best.pt")
+    load_parser.add_argument("--backend", choices=["pytorch", "onnx", "openvino"], default="pytorch")
+    load_parser.add_argument("--int8", action="store_true")
+    load_parser.add_argument("--imgsz", type=int, default=640)
+    load_parser.add_argument("--batch", type=int, default=0, help="max frames per predict() call, 0 = all")
+    load_parser.add_argument("--conf", type=float, default=0.6)
+    load_parser.add_argument("--output", default=None, help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    if args.command == "serve":
+        serve(args.cameras, args.idle, args.fire, (width, height), args.fps, args.fire_at, args.fire_duration,
+              args.stub_delay_ms / 1000)
+        return 0
+
+    from backends import load_model
+
+    model = load_model(args.model, args.backend, imgsz=args.imgsz, int8=args.int8)
+    report = run_load_test(model, args.scale, load_frames(args.idle, (width, height)),
+                           load_frames(args.fire, (width, height)),
+                           model_name=f"{args.model} ({args.backend}{' int8' if args.int8 else ''})",
+                           fps=args.fps, duration=args.duration, fire_at=args.fire_at,
+                           fire_duration=args.fire_duration, conf=args.conf, imgsz=args.imgsz,
+                           max_batch=args.batch or None, record=not args.no_record, post_roll=args.post_roll,
+                           stub_delay=args.stub_delay_ms / 1000)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+        print(f"✅ Load test written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
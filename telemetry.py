@@ -0,0 +1,252 @@
+"""
+Per-stage latency instrumentation and a local metrics endpoint.
+
+Code on the detection and alert paths records stage timings with
+telemetry.observe(stage, seconds, camera=...) or the telemetry.timer()
+context manager. Counters and queue depths that other components already
+track are read at scrape time through collectors, so they cost nothing on
+the hot path.
+
+Everything is off until enable() is called; while disabled, observe() and
+timer() return immediately. When enabled, metrics can be served in
+Prometheus text format on a local HTTP port and/or written as a periodic
+JSON log line.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_METRIC = "fire_stage_latency_seconds"
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+
+    def quantile(self, q):
+        """
+        Estimate a quantile from the buckets (upper bound of its bucket)
+        """
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = q * self.count
+            running = 0
+            for i, count in enumerate(self.counts):
+                running += count
+                if running >= target:
+                    return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("registry", "name", "labels", "start")
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class Telemetry:
+    """
+    Registry of stage histograms plus scrape-time collectors.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._histograms = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._log_thread = None
+        self._log_stop = threading.Event()
+
+    def enable(self):
+        self.enabled = True
+        return self
+
+    def observe(self, stage, seconds, metric=STAGE_METRIC, **labels):
+        """
+        Record one duration for a stage
+        """
+        if not self.enabled:
+            return
+        key = (metric, (("stage", stage),) + tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram())
+        histogram.observe(seconds)
+
+    def timer(self, stage, **labels):
+        """
+        Context manager that times its block as stage
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage, labels)
+
+    def add_collector(self, collector):
+        """
+        Register collector() -> iterable of (name, type, labels_dict, value),
+        called on every scrape or log line
+        """
+        self._collectors.append(collector)
+
+    def collect(self):
+        samples = []
+        for collector in list(self._collectors):
+            try:
+                samples.extend(collector())
+            except Exception as e:
+                print(f"⚠️ Metrics collector error: {str(e)}")
+        return samples
+
+    def render(self):
+        """
+        Render all metrics in Prometheus text exposition format
+        """
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+        declared = set()
+        for (metric, labels), histogram in histograms:
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} histogram")
+                declared.add(metric)
+            with histogram._lock:
+                counts = list(histogram.counts)
+                total, count = histogram.total, histogram.count
+            running = 0
+            for bound, bucket_count in zip(histogram.buckets, counts):
+                running += bucket_count
+                lines.append(f"{metric}_bucket{_format_labels(labels + (('le', bound),))} {running}")
+            lines.append(f"{metric}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+
+        for name, metric_type, labels, value in sorted(self.collect(), key=lambda s: (s[0], sorted(s[2].items()))):
+            if name not in declared:
+                lines.append(f"# TYPE {name} {metric_type}")
+                declared.add(name)
+            lines.append(f"{name}{_format_labels(tuple(sorted(labels.items())))} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """
+        Compact dict of stage percentiles and collected values for logging
+        """
+        stages = {}
+        with self._lock:
+            histograms = list(self._histograms.items())
+        for (metric, labels), histogram in histograms:
+            name = ",".join(f"{k}={v}" for k, v in labels)
+            stages[name] = {
+                "count": histogram.count,
+                "avg_ms": histogram.total / histogram.count * 1000 if histogram.count else 0.0,
+                "p95_ms": histogram.quantile(0.95) * 1000,
+            }
+        values = {}
+        for name, _, labels, value in self.collect():
+            label_text = ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+            values[f"{name}{{{label_text}}}" if label_text else name] = value
+        return {"ts": time.time(), "stages": stages, "values": values}
+
+    def start_http_server(self, host="127.0.0.1", port=9108):
+        """
+        Serve /metrics in Prometheus text format on a background thread
+        """
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"📈 Metrics available at http://{host}:{self._server.server_port}/metrics")
+        return self._server
+
+    def start_log(self, interval=60.0):
+        """
+        Print a structured JSON metrics line every interval seconds
+        """
+        def run():
+            while not self._log_stop.wait(interval):
+                print("METRICS " + json.dumps(self.snapshot(), default=str))
+
+        self._log_thread = threading.Thread(target=run, name="metrics-log", daemon=True)
+        self._log_thread.start()
+
+    def stop(self):
+        self._log_stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+telemetry = Telemetry()
@@ -0,0 +1,48 @@
+import os
+import time
+
+import cv2
+import numpy as np
+
+from alert_media import AlertMediaBuilder
+
+
+def write_clip(path, frames=20, size=(320, 240)):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), 10.0, size)
+    for i in range(frames):
+        frame = np.full((size[1], size[0], 3), 40, dtype=np.uint8)
+        cv2.circle(frame, (10 + i * 10, size[1] // 2), 20, (0, 80, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return str(path)
+
+
+def test_build_creates_output_dir(tmp_path):
+    clip = write_clip(tmp_path / "fire_detection_cam_1.mp4")
+    builder = AlertMediaBuilder(str(tmp_path / "alerts"), max_width=160, ffmpeg="")
+
+    media = builder.build("cam-1", "cam", clip, {"fps": 10.0})
+
+    assert os.path.dirname(media.snapshot_path) == str(tmp_path / "alerts")
+    assert os.path.exists(media.snapshot_path)
+    assert media.clip_path == str(tmp_path / "alerts" / "fire_detection_cam_1_alert.mp4")
+    assert media.clip_size > 0
+
+
+def test_prune_keeps_newest_within_limits(tmp_path):
+    builder = AlertMediaBuilder(str(tmp_path), max_total_bytes=2500, max_age=3600.0)
+    now = time.time()
+    for i, age in enumerate([10, 20, 30, 40]):
+        path = tmp_path / f"clip{i}_alert.mp4"
+        path.write_bytes(b"x" * 1000)
+        os.utime(path, (now - age, now - age))
+    old = tmp_path / "old_peak.jpg"
+    old.write_bytes(b"x")
+    os.utime(old, (now - 7200, now - 7200))
+    other = tmp_path / "notes.txt"
+    other.write_bytes(b"x" * 5000)
+
+    assert builder.prune(keep=[str(tmp_path / "clip3_alert.mp4")]) == 2
+
+    assert sorted(os.listdir(tmp_path)) == ["clip0_alert.mp4", "clip1_alert.mp4", "clip3_alert.mp4", "notes.txt"]
+    assert builder.stats()["pruned"] == 2
@@ -0,0 +1,130 @@
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from alerts import Alert, AlertDispatcher, FunctionChannel, TelegramChannel
+from email_transport import EmailJob, EmailTransport
+from simulation import StubAlertServer, StubSmtpServer
+
+
+@pytest.fixture
+def stub():
+    server = StubAlertServer().start()
+    yield server
+    server.stop()
+
+
+def telegram(stub, **kwargs):
+    return TelegramChannel("TOKEN", "42", base_url=stub.url, timeout=5.0, backoff=0.05, **kwargs)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_delivers_and_deduplicates(stub):
+    dispatcher = AlertDispatcher(workers=2, verbose=False)
+    dispatcher.add_channel(telegram(stub))
+    dispatcher.start()
+    try:
+        assert dispatcher.submit(Alert("cam-1", "Fire on cam")) == ["telegram"]
+        assert dispatcher.submit(Alert("cam-1", "Fire on cam")) == []
+        assert dispatcher.submit(Alert("cam-1", "Clip ready", kind="media")) == ["telegram"]
+        assert wait_for(lambda: len(stub.snapshot()) == 2)
+    finally:
+        dispatcher.stop()
+
+    assert sorted(m["text"] for m in stub.snapshot()) == ["Clip ready", "Fire on cam"]
+    stats = dispatcher.get_stats()["channels"]["telegram"]
+    assert stats["sent"] == 2
+    assert stats["deduplicated"] == 1
+
+
+def test_sends_photo(stub, tmp_path):
+    photo = tmp_path / "peak.jpg"
+    cv2.imwrite(str(photo), np.zeros((32, 32, 3), dtype=np.uint8))
+    dispatcher = AlertDispatcher(workers=1, verbose=False)
+    dispatcher.add_channel(telegram(stub))
+    dispatcher.start()
+    try:
+        dispatcher.submit(Alert("cam-1", "Fire on cam", photo=str(photo)))
+        assert wait_for(lambda: len(stub.snapshot()) == 1)
+    finally:
+        dispatcher.stop()
+
+    message, = stub.snapshot()
+    assert message["photo"]
+    assert message["text"] == "Fire on cam"
+
+
+def test_rate_limit(stub):
+    dispatcher = AlertDispatcher(workers=1, verbose=False)
+    dispatcher.add_channel(telegram(stub, min_interval=60.0))
+    dispatcher.start()
+    try:
+        assert dispatcher.submit(Alert("cam-1", "Fire on cam 1")) == ["telegram"]
+        assert dispatcher.submit(Alert("cam-2", "Fire on cam 2")) == []
+    finally:
+        dispatcher.stop()
+
+    assert len(stub.snapshot()) == 1
+    assert dispatcher.get_stats()["channels"]["telegram"]["rate_limited"] == 1
+
+
+def test_full_queue_does_not_use_up_the_rate_limit(stub):
+    dispatcher = AlertDispatcher(workers=1, queue_size=1, verbose=False)
+    dispatcher.add_channel(telegram(stub, min_interval=60.0))
+    dispatcher.add_channel(telegram(stub, name="backup", min_interval=60.0))
+
+    # Workers not started yet: the second channel finds the queue full
+    assert dispatcher.submit(Alert("cam-1", "Fire on cam")) == ["telegram"]
+    assert dispatcher.dropped == 1
+
+    dispatcher.start()
+    try:
+        assert wait_for(lambda: dispatcher.queue_depth() == 0)
+        assert dispatcher.submit(Alert("cam-1", "Fire on cam"), channels=["backup"]) == ["backup"]
+        assert wait_for(lambda: len(stub.snapshot()) == 2)
+    finally:
+        dispatcher.stop()
+
+
+def test_retries_failed_delivery(stub):
+    stub.stop()
+    dispatcher = AlertDispatcher(workers=1, verbose=False)
+    dispatcher.add_channel(telegram(stub, max_retries=1))
+    dispatcher.start()
+    try:
+        dispatcher.submit(Alert("cam-1", "Fire on cam"))
+    finally:
+        dispatcher.stop()
+
+    stats = dispatcher.get_stats()["channels"]["telegram"]
+    assert stats["failed"] == 1
+    assert stats["retries"] == 1
+
+
+def test_email_channel():
+    smtp = StubSmtpServer().start()
+    transport = EmailTransport(smtp.host, smtp.port, "camera@example.com", "secret", use_tls=False).start()
+    dispatcher = AlertDispatcher(workers=1, verbose=False)
+    dispatcher.add_channel(FunctionChannel(
+        "email", lambda: transport.send(EmailJob("ops@example.com", "Fire alert", "Fire on cam"), timeout=10)))
+    dispatcher.start()
+    try:
+        assert dispatcher.submit(Alert("cam-1", "Fire on cam")) == ["email"]
+        assert wait_for(lambda: len(smtp.snapshot()) == 1)
+    finally:
+        dispatcher.stop()
+        transport.stop()
+        smtp.stop()
+
+    assert smtp.snapshot()[0]["text"] == "Fire alert\nFire on cam"
+    assert dispatcher.get_stats()["channels"]["email"]["sent"] == 1
@@ -0,0 +1,26 @@
+from autotune import select_config
+
+
+def run(imgsz, batch, p95, fps):
+    return {"imgsz": imgsz, "batch": batch, "latency_ms": {"p95": p95}, "throughput_fps": fps}
+
+
+RUNS = [
+    run(320, 1, 40.0, 25.0),
+    run(640, 1, 100.0, 10.0),
+    run(640, 4, 240.0, 16.0),
+]
+
+
+def test_latency_compares_batches_per_frame():
+    assert select_config(RUNS[1:], "latency") == RUNS[2]
+
+
+def test_target_keeps_largest_imgsz_within_it():
+    assert select_config(RUNS, "throughput", target_latency_ms=250) == RUNS[2]
+    assert select_config(RUNS, "latency", target_latency_ms=150) == RUNS[1]
+    assert select_config(RUNS, "throughput", target_latency_ms=50) == RUNS[0]
+
+
+def test_fastest_when_nothing_meets_target():
+    assert select_config(RUNS, "throughput", target_latency_ms=10) == RUNS[0]
@@ -0,0 +1,58 @@
+import smtplib
+
+import pytest
+
+from email_transport import EmailJob, EmailTransport
+from simulation import StubSmtpServer
+
+
+@pytest.fixture
+def smtp():
+    server = StubSmtpServer(refuse={"busy@example.com": 450, "gone@example.com": 550}).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def transport(smtp):
+    transport = EmailTransport(smtp.host, smtp.port, "camera@example.com", "secret", use_tls=False).start()
+    yield transport
+    transport.stop()
+
+
+def test_sends_over_one_connection(smtp, transport):
+    for i in range(3):
+        transport.send(EmailJob("ops@example.com", f"Fire {i}", "body"), timeout=10)
+
+    messages = smtp.snapshot()
+    assert [m["text"].splitlines()[0] for m in messages] == ["Fire 0", "Fire 1", "Fire 2"]
+    assert transport.connections == 1
+    assert transport.sent == 3
+
+
+def test_attachment(smtp, transport, tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(bytes(range(256)) * 1000)
+    transport.send(EmailJob("ops@example.com", "Clip", "see attached", attachment_path=str(path)), timeout=10)
+
+    message, = smtp.snapshot()
+    assert message["attachment"]
+    assert message["text"] == "Clip\nsee attached"
+
+
+def test_permanent_refusal_fails_without_retry(smtp, transport):
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        transport.send(EmailJob("gone@example.com", "Fire", "body", max_retries=2), timeout=10)
+    assert transport.connections == 1
+
+    # The session was reset and is reused for the next message
+    transport.send(EmailJob("ops@example.com", "Fire", "body"), timeout=10)
+    assert transport.connections == 1
+    assert len(smtp.snapshot()) == 1
+
+
+def test_transient_refusal_is_retried(smtp, transport):
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        transport.send(EmailJob("busy@example.com", "Fire", "body", max_retries=1), timeout=10)
+    assert transport.connections == 2
+    assert transport.failed == 1
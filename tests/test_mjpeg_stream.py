@@ -0,0 +1,82 @@
+import cv2
+import numpy as np
+import pytest
+
+from mjpeg_stream import MjpegCapture, StubMjpegServer, _synthetic_frames
+
+FRAMES = _synthetic_frames(count=4, width=160, height=120)
+
+
+@pytest.fixture(params=[True, False], ids=["content-length", "markers"])
+def server(request):
+    stub = StubMjpegServer(FRAMES, fps=200.0, content_length=request.param).start()
+    yield stub
+    stub.stop()
+
+
+def closest_frame(frame):
+    return int(np.argmin([np.abs(frame.astype(int) - f).mean() for f in FRAMES]))
+
+
+# Small chunks split part headers, SOI and EOI markers across reads
+@pytest.mark.parametrize("chunk_size", [7, 37, 500, 65536])
+def test_reads_every_frame_in_order(server, chunk_size):
+    cap = MjpegCapture(server.url, chunk_size=chunk_size)
+    assert cap.isOpened()
+    try:
+        frames = [cap.read() for _ in range(12)]
+    finally:
+        cap.release()
+
+    assert all(ok for ok, _ in frames)
+    assert [frame.shape for _, frame in frames] == [(120, 160, 3)] * 12
+    assert [closest_frame(frame) for _, frame in frames] == [i % len(FRAMES) for i in range(12)]
+    assert cap.frames_received == cap.frames_decoded == 12
+
+
+@pytest.mark.parametrize("chunk_size", [37, 65536])
+def test_reduced_decode(server, chunk_size):
+    cap = MjpegCapture(server.url, reduce=2, chunk_size=chunk_size)
+    try:
+        frames = [cap.read() for _ in range(6)]
+    finally:
+        cap.release()
+
+    assert [frame.shape for _, frame in frames] == [(60, 80, 3)] * 6
+    assert cap.get(cv2.CAP_PROP_FRAME_WIDTH) == 80.0
+    assert cap.get(cv2.CAP_PROP_FRAME_HEIGHT) == 60.0
+
+
+def test_skipped_frames_are_not_decoded(server):
+    cap = MjpegCapture(server.url, chunk_size=37)
+    try:
+        for _ in range(9):
+            assert cap.grab()
+        ok, frame = cap.retrieve()
+    finally:
+        cap.release()
+
+    assert ok
+    assert closest_frame(frame) == 8 % len(FRAMES)
+    assert cap.frames_received == 9
+    assert cap.frames_decoded == 1
+
+
+def test_retrieves_into_buffer(server):
+    cap = MjpegCapture(server.url)
+    image = np.zeros((120, 160, 3), dtype=np.uint8)
+    try:
+        ok, frame = cap.read(image)
+    finally:
+        cap.release()
+
+    assert ok
+    assert frame is image
+    assert image.any()
+
+
+def test_unreachable_host():
+    cap = MjpegCapture("http://127.0.0.1:1/video", timeout=1.0)
+    assert not cap.isOpened()
+    assert cap.connect_error
+    assert cap.read() == (False, None)
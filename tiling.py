@@ -0,0 +1,139 @@
+"""
+Tiled inference for high-resolution feeds.
+
+model.predict() letterboxes a whole 1280x720 (or larger) frame down to the
+model input size, so a small fire far from the camera shrinks to a few
+pixels. A Tiler splits the frame into overlapping tile_size windows, which
+are inferred at native resolution in one batch, optionally together with
+a coarse full-frame pass for large fires, and the boxes are merged back in
+full-frame coordinates with cross-tile NMS.
+"""
+
+import numpy as np
+
+from annotation import detections_from_result, result_from_detections
+
+
+def nms(detections, iou_threshold=0.5, ios_threshold=0.8):
+    """
+    Class-aware NMS over an (N, 6) detections array. A box is also
+    suppressed when most of it lies inside a higher-scoring box of the same
+    class (intersection over the smaller box >= ios_threshold), which
+    removes fragments of a fire cut by a tile border.
+    """
+    if len(detections) <= 1:
+        return detections
+    detections = detections[np.argsort(-detections[:, 4])]
+    boxes = detections[:, :4]
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    classes = detections[:, 5].astype(int)
+    suppressed = np.zeros(len(detections), dtype=bool)
+    keep = []
+    for i in range(len(detections)):
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        rest = np.flatnonzero(~suppressed & (classes == classes[i]))
+        rest = rest[rest > i]
+        if not len(rest):
+            continue
+        x1 = np.maximum(boxes[i, 0], boxes[rest, 0])
+        y1 = np.maximum(boxes[i, 1], boxes[rest, 1])
+        x2 = np.minimum(boxes[i, 2], boxes[rest, 2])
+        y2 = np.minimum(boxes[i, 3], boxes[rest, 3])
+        inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        ios = inter / np.maximum(np.minimum(areas[i], areas[rest]), 1e-9)
+        suppressed[rest[(iou >= iou_threshold) | (ios >= ios_threshold)]] = True
+    return detections[keep]
+
+
+def _starts(length, tile, stride):
+    if length <= tile:
+        return [0]
+    # Fewest tiles keeping at least the requested overlap, spread evenly
+    count = int(np.ceil((length - tile) / stride)) + 1
+    return [int(round(i * (length - tile) / (count - 1))) for i in range(count)]
+
+
+class Tiler:
+    """
+    Splits frames into overlapping tiles and merges the tile results.
+    """
+
+    def __init__(self, tile_size=640, overlap=0.2, full_frame=True, iou_threshold=0.5, ios_threshold=0.8):
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.full_frame = full_frame
+        self.iou_threshold = iou_threshold
+        self.ios_threshold = ios_threshold
+        self._windows = {}
+
+    def windows(self, shape):
+        """
+        Tile windows (x1, y1, x2, y2) covering a frame of the given shape
+        """
+        height, width = shape[:2]
+        windows = self._windows.get((height, width))
+        if windows is None:
+            stride = max(1, int(self.tile_size * (1 - self.overlap)))
+            windows = [(x, y, min(width, x + self.tile_size), min(height, y + self.tile_size))
+                       for y in _starts(height, self.tile_size, stride)
+                       for x in _starts(width, self.tile_size, stride)]
+            self._windows[(height, width)] = windows
+        return windows
+
+    def applies(self, shape):
+        """
+        Only frames larger than one tile benefit from tiling
+        """
+        return len(self.windows(shape)) > 1
+
+    def crops(self, frame):
+        return [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in self.windows(frame.shape)]
+
+    def merge(self, frame, tile_results, coarse=None, names=None):
+        """
+        Merge the results of frame's tiles (in windows() order) and the
+        optional coarse full-frame result into one full-frame result
+        """
+        parts = []
+        if coarse is not None:
+            parts.append(detections_from_result(coarse))
+            names = names or coarse.names
+        for (x1, y1, _, _), result in zip(self.windows(frame.shape), tile_results):
+            detections = detections_from_result(result).copy()
+            detections[:, [0, 2]] += x1
+            detections[:, [1, 3]] += y1
+            parts.append(detections)
+            names = names or result.names
+        merged = nms(np.concatenate(parts), self.iou_threshold, self.ios_threshold)
+        return result_from_detections(frame, merged, names)
+
+
+def predict_tiled(model, frames, tiler, conf=0.6, imgsz=None):
+    """
+    Tiled inference for a list of frames: one coarse batch (if enabled) and
+    one batch of all tiles. Frames too small to tile get a plain pass.
+    """
+    coarse = [None] * len(frames)
+    if tiler.full_frame or not all(tiler.applies(frame.shape) for frame in frames):
+        kwargs = {"imgsz": imgsz} if imgsz else {}
+        coarse = model.predict(source=frames, conf=conf, verbose=False, **kwargs)
+
+    tiles, owners = [], []
+    for index, frame in enumerate(frames):
+        if tiler.applies(frame.shape):
+            tiles.extend(tiler.crops(frame))
+            owners.extend([index] * len(tiler.windows(frame.shape)))
+    tile_results = model.predict(source=tiles, conf=conf, imgsz=tiler.tile_size, verbose=False) if tiles else []
+
+    results = []
+    for index, frame in enumerate(frames):
+        if not tiler.applies(frame.shape):
+            results.append(coarse[index])
+            continue
+        own = [r for owner, r in zip(owners, tile_results) if owner == index]
+        results.append(tiler.merge(frame, own, coarse[index] if tiler.full_frame else None,
+                                   names=getattr(model, "names", None)))
+    return results